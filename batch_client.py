@@ -0,0 +1,258 @@
+import argparse
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+from client import DOWNLOAD_DIR, FILE_REPLY_TIMEOUT, EVENT_DONE, FileSink, negotiate_capabilities
+from protocol import (
+    MSG_QUIT, MSG_FILE, MSG_FILE_RAW, FILE_REPLY_TYPES, CAP_STREAMS, CAP_SENDFILE, CAP_TRAILER, HASH_TRAILER,
+    TRANSFER_SENDFILE, MAX_STREAMS,
+    Message, FrameDecoder, send_message, encode_file_request, decode_stream_payload
+)
+
+DEFAULT_PORT = 5555
+CLOSE_TIMEOUT = 2
+
+
+def read_manifest(path):
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    return unique_filenames(line.strip() for line in lines if line.strip() and not line.strip().startswith('#'))
+
+
+def unique_filenames(filenames):
+    unique = []
+    targets = {}
+    for filename in filenames:
+        target = os.path.basename(filename)
+        if target in targets:
+            if targets[target] != filename:
+                raise ValueError(f"'{targets[target]}' e '{filename}' seriam salvos no mesmo arquivo '{target}'")
+            continue
+        targets[target] = filename
+        unique.append(filename)
+    return unique
+
+
+class BatchClient:
+
+    def __init__(self, host, port, download_dir=DOWNLOAD_DIR, window=MAX_STREAMS, timeout=FILE_REPLY_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.download_dir = download_dir
+        self.window = max(1, min(window, MAX_STREAMS))
+        self.timeout = timeout
+        self.socket = None
+        self.decoder = FrameDecoder()
+        self.capabilities = set()
+        self.events = queue.Queue()
+        self.sinks = {}
+        self.sinks_lock = threading.Lock()
+        self.requests = {}
+        self.next_stream_id = 1
+        self.receiver = None
+        self.connected = False
+
+    def connect(self):
+        self.socket = socket.create_connection((self.host, self.port))
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.capabilities = negotiate_capabilities(self.socket, self.decoder)
+        if CAP_STREAMS not in self.capabilities:
+            self.socket.close()
+            raise ConnectionError("Servidor não suporta transferências simultâneas")
+
+        self.connected = True
+        self.receiver = threading.Thread(target=self.receive_loop, daemon=True)
+        self.receiver.start()
+
+    def close(self):
+        if self.socket is None:
+            return
+        try:
+            send_message(self.socket, MSG_QUIT)
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.receiver.join(CLOSE_TIMEOUT)
+        self.socket.close()
+        self.socket = None
+
+    def receive_loop(self):
+        error = "Conexão encerrada pelo servidor"
+        try:
+            while True:
+                for msg_type, payload in self.decoder.frames():
+                    if msg_type == MSG_FILE_RAW:
+                        stream_id = self.decoder.read_stream_id(self.socket)
+                        with self.sinks_lock:
+                            sink = self.sinks.get(stream_id)
+                        if sink is not None:
+                            sink.receive_raw(self.decoder, self.socket)
+                        else:
+                            self.decoder.skip_raw(self.socket)
+                    elif msg_type in FILE_REPLY_TYPES:
+                        stream_id, payload = decode_stream_payload(payload)
+                        with self.sinks_lock:
+                            sink = self.sinks.get(stream_id)
+                        if sink is not None:
+                            sink.handle(msg_type, payload)
+
+                if self.decoder.recv_into(self.socket) == 0:
+                    break
+        except OSError as e:
+            error = f"Erro na conexão: {e}"
+        except Exception as e:
+            error = f"Erro de protocolo: {e}"
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        finally:
+            self.connected = False
+            with self.sinks_lock:
+                sinks = list(self.sinks.values())
+            for sink in sinks:
+                sink.fail(error)
+
+    def start_request(self, filename):
+        stream_id = self.next_stream_id
+        self.next_stream_id += 1
+        sink = FileSink(os.path.join(self.download_dir, os.path.basename(filename)), self.events)
+        with self.sinks_lock:
+            self.sinks[stream_id] = sink
+        self.requests[sink] = (stream_id, filename, time.perf_counter())
+
+        options = {'stream': stream_id}
+        if CAP_SENDFILE in self.capabilities:
+            options['mode'] = TRANSFER_SENDFILE
+        if CAP_TRAILER in self.capabilities:
+            options['hash'] = HASH_TRAILER
+        return Message(MSG_FILE, encode_file_request(filename, options)).serialize()
+
+    def finish_request(self, sink, info, error):
+        stream_id, filename, started = self.requests.pop(sink)
+        with self.sinks_lock:
+            self.sinks.pop(stream_id, None)
+        sink.abort()
+
+        if error is None and info['range_hash'] != info['file_hash']:
+            error = "Verificação de integridade falhou"
+        return {
+            'filename': filename,
+            'path': info['path'] if info else None,
+            'bytes': info['length'] if info else 0,
+            'seconds': time.perf_counter() - started,
+            'error': error,
+        }
+
+    def fetch(self, filenames, on_result=None):
+        os.makedirs(self.download_dir, exist_ok=True)
+        pending = iter(unique_filenames(filenames))
+        exhausted = False
+        results = []
+
+        while True:
+            frames = []
+            while not exhausted and len(self.requests) < self.window:
+                filename = next(pending, None)
+                if filename is None:
+                    exhausted = True
+                else:
+                    frames.append(self.start_request(filename))
+            if frames and not self.connected:
+                for sink in list(self.requests):
+                    sink.fail("Conexão encerrada pelo servidor")
+                exhausted = True
+            elif frames:
+                try:
+                    self.socket.sendall(b''.join(frames))
+                except OSError as e:
+                    for sink in list(self.requests):
+                        sink.fail(f"Erro ao enviar pedido: {e}")
+                    exhausted = True
+            if not self.requests:
+                return results
+
+            try:
+                events = [self.events.get(timeout=self.timeout)]
+                while not self.events.empty():
+                    events.append(self.events.get_nowait())
+            except queue.Empty:
+                for sink in list(self.requests):
+                    sink.fail("Timeout: servidor não respondeu a tempo")
+                continue
+
+            for event, sink, data in events:
+                if event == EVENT_DONE and sink in self.requests:
+                    result = self.finish_request(sink, *data)
+                    results.append(result)
+                    if on_result is not None:
+                        on_result(result)
+
+
+def format_result(result):
+    if result['error']:
+        return f"[ERRO] {result['filename']}: {result['error']} ({result['seconds']:.3f}s)"
+    rate = result['bytes'] / max(result['seconds'], 1e-9) / (1024 * 1024)
+    return f"[OK]   {result['filename']}: {result['bytes']} bytes em {result['seconds']:.3f}s ({rate:.1f} MB/s)"
+
+
+def print_summary(results, elapsed):
+    failed = [result for result in results if result['error']]
+    total_bytes = sum(result['bytes'] for result in results if not result['error'])
+    durations = sorted(result['seconds'] for result in results)
+
+    print("=" * 60)
+    print(f"Arquivos: {len(results)} ({len(results) - len(failed)} ok, {len(failed)} com erro)")
+    print(f"Recebido: {total_bytes} bytes em {elapsed:.2f}s "
+          f"({total_bytes / max(elapsed, 1e-9) / (1024 * 1024):.1f} MB/s, "
+          f"{len(results) / max(elapsed, 1e-9):.1f} arquivos/s)")
+    if durations:
+        print(f"Duração por arquivo: mín {durations[0]:.3f}s, mediana {durations[len(durations) // 2]:.3f}s, "
+              f"máx {durations[-1]:.3f}s")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Baixa em lote os arquivos listados em um manifesto')
+    parser.add_argument('manifest', help="arquivo com um nome por linha ('-' lê da entrada padrão)")
+    parser.add_argument('--host', default='localhost', help='endereço do servidor (padrão localhost)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'porta do servidor (padrão {DEFAULT_PORT})')
+    parser.add_argument('--dir', default=DOWNLOAD_DIR, help=f'diretório de destino (padrão {DOWNLOAD_DIR})')
+    parser.add_argument('--window', type=int, default=MAX_STREAMS,
+                        help=f'pedidos em andamento na mesma conexão (máximo {MAX_STREAMS})')
+    parser.add_argument('--timeout', type=float, default=FILE_REPLY_TIMEOUT,
+                        help='segundos sem resposta antes de desistir dos pedidos em andamento')
+    parser.add_argument('--quiet', action='store_true', help='mostra apenas o resumo final')
+    args = parser.parse_args()
+
+    try:
+        filenames = read_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Erro no manifesto: {e}")
+        sys.exit(1)
+    client = BatchClient(args.host, args.port, args.dir, args.window, args.timeout)
+    try:
+        client.connect()
+    except (OSError, ConnectionError) as e:
+        print(f"Erro ao conectar: {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    try:
+        results = client.fetch(filenames, None if args.quiet else lambda result: print(format_result(result)))
+    finally:
+        client.close()
+
+    print_summary(results, time.perf_counter() - start)
+    sys.exit(1 if any(result['error'] for result in results) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+
+from common import free_port, start_server, stop_server, make_test_file, percentile, format_table
+from protocol import (
+    MSG_CHAT, MSG_FILE, MSG_HELLO, MSG_QUIT, MSG_FILE_DATA, CAP_STREAMS, STREAM_ID_SIZE,
+    FrameDecoder, send_message, encode_capabilities, encode_file_request
+)
+
+
+class LatencyProbe:
+
+    def __init__(self, sock, decoder, rate, streams, file_size):
+        self.sock = sock
+        self.decoder = decoder
+        self.rate = rate
+        self.streams = streams
+        self.file_size = file_size
+        self.data_received = 0
+        self.sent = {}
+        self.latencies = []
+        self.data_started = threading.Event()
+        self.finished = threading.Event()
+
+    def run(self):
+        start = time.perf_counter()
+        received = 0
+        try:
+            while not self.finished.is_set():
+                for msg_type, payload in self.decoder.frames():
+                    self.handle(msg_type, payload)
+                n = self.decoder.recv_into(self.sock)
+                if n == 0:
+                    break
+                received += n
+                if self.rate:
+                    ahead = received / self.rate - (time.perf_counter() - start)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except OSError:
+            pass
+        self.finished.set()
+
+    def handle(self, msg_type, payload):
+        if msg_type == MSG_CHAT:
+            now = time.perf_counter()
+            text = bytes(payload).decode('utf-8')
+            seq = int(text.rsplit(' ', 1)[1])
+            if seq in self.sent:
+                self.latencies.append(now - self.sent[seq])
+        elif msg_type == MSG_FILE_DATA:
+            self.data_started.set()
+            self.data_received += len(payload) - (STREAM_ID_SIZE if self.streams else 0)
+            if self.data_received >= self.file_size:
+                self.finished.set()
+
+
+def measure(port, server, filename, file_size, streams, rate, interval, download):
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 256 * 1024)
+    decoder = FrameDecoder()
+    capabilities = {CAP_STREAMS} if streams else set()
+    send_message(sock, MSG_HELLO, encode_capabilities(capabilities))
+    while True:
+        frames = list(decoder.frames())
+        if any(msg_type == MSG_HELLO for msg_type, _ in frames):
+            break
+        decoder.recv_into(sock)
+
+    probe = LatencyProbe(sock, decoder, rate, streams, file_size)
+    thread = threading.Thread(target=probe.run, daemon=True)
+    thread.start()
+
+    if download:
+        options = {'stream': 1} if streams else {}
+        send_message(sock, MSG_FILE, encode_file_request(filename, options))
+        probe.data_started.wait(30)
+
+    seq = 0
+    deadline = time.perf_counter() + 30
+    while not probe.finished.is_set() and time.perf_counter() < deadline:
+        seq += 1
+        probe.sent[seq] = time.perf_counter()
+        server.stdin.write(f"ping {seq}\n".encode())
+        server.stdin.flush()
+        time.sleep(interval)
+        if not download and seq >= 100:
+            break
+
+    time.sleep(0.2)
+    probe.finished.set()
+    try:
+        send_message(sock, MSG_QUIT)
+    except OSError:
+        pass
+    sock.close()
+    thread.join(5)
+    return probe.latencies, seq
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latência de chat durante um download saturado')
+    parser.add_argument('--size-mb', type=int, default=256)
+    parser.add_argument('--rate-mb', type=float, default=100.0,
+                        help='vazão máxima de leitura do cliente em MB/s (0 = sem limite)')
+    parser.add_argument('--interval-ms', type=float, default=20.0)
+    parser.add_argument('--async', dest='use_async', action='store_true', help='usa o motor asyncio')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='chat_latency_bench_')
+    files_dir = os.path.join(workdir, 'server_files')
+    os.makedirs(files_dir)
+    filename = f'arquivo_{args.size_mb}mb.bin'
+    make_test_file(os.path.join(files_dir, filename), args.size_mb)
+
+    port = free_port()
+    server_args = ['--port', str(port), '--dir', files_dir, '--hash-cache-size', '0']
+    if args.use_async:
+        server_args.append('--async')
+    server = start_server('server_antigo.py', server_args, port, stdin=subprocess.PIPE)
+
+    rows = []
+    try:
+        cases = [('ocioso', False, False), ('download sem fluxos', False, True),
+                 ('download com fluxos', True, True)]
+        for name, streams, download in cases:
+            latencies, sent = measure(port, server, filename, args.size_mb * 1024 * 1024, streams,
+                                      args.rate_mb * 1024 * 1024, args.interval_ms / 1000, download)
+            ms = [value * 1000 for value in latencies]
+            rows.append((name, f"{len(ms)}/{sent}", f"{percentile(ms, 50):.1f}",
+                         f"{percentile(ms, 99):.1f}", f"{max(ms) if ms else 0:.1f}"))
+    finally:
+        server.stdin.close()
+        stop_server(server)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Arquivo de {args.size_mb} MB lido a {args.rate_mb:.0f} MB/s, chat a cada {args.interval_ms:.0f} ms")
+    print(format_table(['cenário', 'recebidas', 'p50 ms', 'p99 ms', 'máx ms'], rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from common import free_port, start_server, stop_server, make_test_file, format_table
+import client
+from protocol import CAP_STREAMS, CAP_SENDFILE
+
+MODES = {
+    'streams': set(),
+    'sendfile': {CAP_STREAMS},
+    'framed': {CAP_STREAMS, CAP_SENDFILE},
+}
+
+
+def download(port, filename, mode):
+    chat = client.ChatClient('127.0.0.1', port)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        if not chat.connect():
+            raise RuntimeError(output.getvalue())
+        chat.capabilities -= MODES[mode]
+        receiver = threading.Thread(target=chat.receive_messages_thread, daemon=True)
+        receiver.start()
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        chat.request_file(filename)
+        while chat.active_downloads:
+            time.sleep(0.01)
+        cpu = time.process_time() - cpu
+        wall = time.perf_counter() - wall
+        chat.disconnect()
+        receiver.join(1)
+
+    if 'sucesso' not in output.getvalue():
+        raise RuntimeError(output.getvalue()[-500:])
+    return wall, cpu, output.getvalue().count('\n') + output.getvalue().count('\r')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recepção de arquivos pelo ChatClient: tempo, CPU e saída')
+    parser.add_argument('--size-mb', type=int, default=1024)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--async', dest='use_async', action='store_true', help='usa o motor asyncio')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='client_receive_bench_')
+    files_dir = os.path.join(workdir, 'server_files')
+    os.makedirs(files_dir)
+    filename = f'arquivo_{args.size_mb}mb.bin'
+    make_test_file(os.path.join(files_dir, filename), args.size_mb)
+
+    port = free_port()
+    server_args = ['--port', str(port), '--dir', files_dir]
+    if args.use_async:
+        server_args.append('--async')
+    server = start_server('server_antigo.py', server_args, port)
+
+    rows = []
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for mode in args.modes.split(','):
+            for _ in range(args.runs):
+                shutil.rmtree(client.DOWNLOAD_DIR, ignore_errors=True)
+                wall, cpu, lines = download(port, filename, mode)
+                rows.append((mode, f"{wall:.2f}", f"{args.size_mb / wall:.0f}", f"{cpu:.2f}",
+                             f"{cpu / args.size_mb * 1000:.2f}", lines))
+    finally:
+        os.chdir(cwd)
+        stop_server(server)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Download de {args.size_mb} MB pelo ChatClient")
+    print(format_table(['modo', 'tempo s', 'MB/s', 'CPU cliente s', 'CPU ms/MB', 'linhas de saída'], rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import os
+import struct
+import tempfile
+import time
+
+from common import ROOT_DIR, format_table
+from compression import COMPRESS_CHUNK_SIZE, CODEC_PREFERENCE, available_codecs, decompress
+from protocol import HEADER_SIZE, MSG_FILE_DATA, COMPRESSED_FLAG, FrameCompressor, Message, file_codec
+
+
+def sample_files(tmpdir, size_mb):
+    files = [
+        ('texto', os.path.join(ROOT_DIR, 'server_files', 'arquivo_medio.txt')),
+        ('jpeg', os.path.join(ROOT_DIR, 'server_files', 'imagem.jpg')),
+    ]
+    log_path = os.path.join(tmpdir, 'servidor.log')
+    with open(log_path, 'w', encoding='utf-8') as f:
+        line = 0
+        while f.tell() < size_mb * 1024 * 1024:
+            f.write(f"2024-01-01 12:00:{line % 60:02d} [INFO] Cliente {line % 97} enviou {line * 31 % 8192} bytes\n")
+            line += 1
+    files.append(('log', log_path))
+    random_path = os.path.join(tmpdir, 'aleatorio.bin')
+    with open(random_path, 'wb') as f:
+        f.write(os.urandom(size_mb * 1024 * 1024))
+    files.append(('binário aleatório', random_path))
+    return files
+
+
+def encode(filepath, codec):
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    codec = file_codec(filepath, codec)
+    compressor = FrameCompressor(codec) if codec is not None else None
+    frames = []
+    start = time.process_time()
+    for offset in range(0, len(data), COMPRESS_CHUNK_SIZE):
+        chunk = data[offset:offset + COMPRESS_CHUNK_SIZE]
+        if compressor is None:
+            frames.append(Message(MSG_FILE_DATA, chunk).serialize())
+        else:
+            frames.append(compressor.frame(MSG_FILE_DATA, chunk))
+    return len(data), frames, time.process_time() - start, codec
+
+
+def decode(frames, codec):
+    total = 0
+    start = time.process_time()
+    for frame in frames:
+        payload_size = struct.unpack('!Q', frame[:8])[0]
+        payload = frame[HEADER_SIZE:]
+        if payload_size & COMPRESSED_FLAG:
+            payload = decompress(codec, payload, COMPRESS_CHUNK_SIZE)
+        total += len(payload)
+    return total, time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dos codecs de compressão por quadro')
+    parser.add_argument('--size-mb', type=int, default=16,
+                        help='tamanho dos arquivos gerados (log e binário aleatório)')
+    args = parser.parse_args()
+
+    codecs = [None] + [codec for codec in CODEC_PREFERENCE if codec in available_codecs()]
+    rows = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for label, filepath in sample_files(tmpdir, args.size_mb):
+            for codec in codecs:
+                size, frames, encode_cpu, used = encode(filepath, codec)
+                wire = sum(len(frame) for frame in frames)
+                decoded, decode_cpu = decode(frames, used)
+                if decoded != size:
+                    raise RuntimeError(f"{label}/{codec}: {decoded} de {size} bytes após descomprimir")
+                mb = size / (1 << 20)
+                rows.append((label, codec or 'nenhum', used or '-', f"{mb:.1f}",
+                             f"{wire / (1 << 20):.2f}", f"{wire / (size + HEADER_SIZE * len(frames)):.2f}",
+                             f"{encode_cpu:.3f}", f"{decode_cpu:.3f}",
+                             f"{mb / encode_cpu:.0f}" if encode_cpu else 'n/d'))
+
+    print(format_table(['arquivo', 'codec', 'aplicado', 'MB', 'MB no fio', 'razão',
+                        'CPU comp s', 'CPU desc s', 'MB/s comp'], rows))
+
+
+if __name__ == '__main__':
+    main()
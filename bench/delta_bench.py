@@ -0,0 +1,123 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from common import free_port, start_server, stop_server, format_table
+import client
+from metrics import Counter, CountingSocket
+from protocol import CAP_STREAMS
+
+CHANGE_SIZE = 64 * 1024
+MB = 1024 * 1024
+
+
+def make_random_file(path, size_mb):
+    with open(path, 'wb') as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(MB))
+
+
+def modify_file(path, percent, rng):
+    chunks = os.path.getsize(path) // CHANGE_SIZE
+    changed = sorted(rng.sample(range(chunks), max(1, round(chunks * percent / 100))))
+    with open(path, 'r+b') as f:
+        for chunk in changed:
+            f.seek(chunk * CHANGE_SIZE)
+            f.write(os.urandom(CHANGE_SIZE))
+    return len(changed) * CHANGE_SIZE
+
+
+def connect(port):
+    chat = client.ChatClient('127.0.0.1', port)
+    if not chat.connect():
+        raise RuntimeError('falha ao conectar')
+    received = Counter('received', 'bytes recebidos')
+    sent = Counter('sent', 'bytes enviados')
+    chat.socket = CountingSocket(chat.socket, received, sent)
+    receiver = threading.Thread(target=chat.receive_messages_thread, daemon=True)
+    receiver.start()
+    return chat, receiver, received, sent
+
+
+def transfer(port, filename, sync):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        chat, receiver, received, sent = connect(port)
+        start = time.perf_counter()
+        if sync:
+            success, message = chat.receive_delta(chat.file_channel, filename,
+                                                  os.path.join(client.DOWNLOAD_DIR, filename))
+        else:
+            chat.capabilities.discard(CAP_STREAMS)
+            success, message = chat.receive_file(chat.file_channel, filename)
+        elapsed = time.perf_counter() - start
+        chat.disconnect()
+        receiver.join(1)
+
+    if not success:
+        raise RuntimeError(message)
+    return elapsed, received.value(), sent.value()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sincronização por delta contra download completo')
+    parser.add_argument('--size-mb', type=int, default=1024)
+    parser.add_argument('--changes', default='1,10,50', help='percentuais do arquivo alterados')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--async', dest='use_async', action='store_true', help='usa o motor asyncio')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix='delta_bench_')
+    files_dir = os.path.join(workdir, 'server_files')
+    os.makedirs(files_dir)
+    base_path = os.path.join(workdir, 'base.bin')
+    make_random_file(base_path, args.size_mb)
+
+    port = free_port()
+    server_args = ['--port', str(port), '--dir', files_dir]
+    if args.use_async:
+        server_args.append('--async')
+    server = start_server('server_antigo.py', server_args, port)
+
+    rows = []
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        os.makedirs(client.DOWNLOAD_DIR)
+        size = args.size_mb * MB
+        for percent in [float(change) for change in args.changes.split(',')]:
+            filename = f'arquivo_{percent:g}pct.bin'
+            shutil.copyfile(base_path, os.path.join(files_dir, filename))
+            changed = modify_file(os.path.join(files_dir, filename), percent, rng)
+            local_path = os.path.join(client.DOWNLOAD_DIR, filename)
+
+            shutil.copyfile(base_path, local_path)
+            results = [('delta', *transfer(port, filename, sync=True))]
+            os.remove(local_path)
+            results.append(('completo', *transfer(port, filename, sync=False)))
+            os.remove(local_path)
+            os.remove(os.path.join(files_dir, filename))
+
+            for mode, elapsed, received, sent in results:
+                rows.append((f"{percent:g}%", f"{changed / MB:.1f}", mode, f"{elapsed:.2f}",
+                             f"{received / MB:.1f}", f"{sent / MB:.2f}", f"{received / size * 100:.1f}%"))
+    finally:
+        os.chdir(cwd)
+        stop_server(server)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Atualização de um arquivo de {args.size_mb} MB já presente no cliente "
+          f"({'asyncio' if args.use_async else 'threads'})")
+    print(format_table(['alterado', 'MB alterados', 'modo', 'tempo s', 'recebido MB', 'enviado MB',
+                        'recebido/arquivo'], rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import socket
+import subprocess
+import time
+import tracemalloc
+
+from common import free_port, start_server, stop_server, format_table, read_rss_kb
+from history import HistoryBuffer, PAGE_SIZE
+from protocol import (
+    MSG_HELLO, MSG_HISTORY, MSG_HISTORY_END, CAP_HISTORY,
+    FrameDecoder, ReceiveBuffer, send_message, encode_capabilities, encode_history_request, decode_history_end
+)
+
+ENGINES = {
+    'threads': [],
+    'async': ['--async'],
+}
+RETAINED = 100000
+POLL_TIMEOUT = 1.0
+
+
+def measure_memory(text_size, count=RETAINED):
+    text = 'x' * text_size
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    buffer = HistoryBuffer(count, count * (text_size + 64))
+    start = time.perf_counter()
+    for _ in range(count):
+        buffer.append('', text)
+    elapsed = time.perf_counter() - start
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, buffer.bytes, count / elapsed
+
+
+def connect(port):
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    send_message(sock, MSG_HELLO, encode_capabilities({CAP_HISTORY}))
+    ReceiveBuffer().receive_message(sock)
+    return sock
+
+
+def request_page(sock, decoder, since, limit):
+    send_message(sock, MSG_HISTORY, encode_history_request('', since, limit))
+    messages = 0
+    size = 0
+    while True:
+        for msg_type, payload in decoder.frames():
+            if msg_type == MSG_HISTORY_END:
+                return messages, size, decode_history_end(payload)
+            if msg_type == MSG_HISTORY:
+                messages += 1
+                size += len(payload)
+        if decoder.recv_into(sock) == 0:
+            raise ConnectionError('servidor encerrou a conexão')
+
+
+def fill_history(proc, port, messages, text_size, timeout):
+    text = 'x' * text_size
+    proc.stdin.write(''.join(f"{i} {text}\n" for i in range(messages)).encode())
+    proc.stdin.flush()
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        sock = connect(port)
+        sock.settimeout(POLL_TIMEOUT)
+        try:
+            _, _, (_, first, next_seq, _) = request_page(sock, FrameDecoder(), -1, 1)
+            if next_seq > messages:
+                return next_seq - first
+        except socket.timeout:
+            pass
+        finally:
+            sock.close()
+        time.sleep(0.1)
+    raise RuntimeError('histórico não foi preenchido a tempo')
+
+
+def replay(port, page_size):
+    sock = connect(port)
+    decoder = FrameDecoder()
+    messages = 0
+    size = 0
+    pages = 0
+    since = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            count, page_bytes, (_, _, since, more) = request_page(sock, decoder, since, page_size)
+            messages += count
+            size += page_bytes
+            pages += 1
+            if not more:
+                break
+    finally:
+        sock.close()
+    return messages, size, pages, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memória e velocidade de replay do histórico de chat')
+    parser.add_argument('--messages', type=int, default=RETAINED, help='mensagens guardadas no servidor')
+    parser.add_argument('--sizes', default='32,128,512', help='tamanhos de mensagem em bytes')
+    parser.add_argument('--page', type=int, default=PAGE_SIZE, help='mensagens por página de replay')
+    parser.add_argument('--rounds', type=int, default=3, help='replays completos por motor')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--engines', default=','.join(ENGINES))
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    rows = []
+    for text_size in sizes:
+        used, retained, rate = measure_memory(text_size)
+        rows.append((text_size, f"{used / 1024 / 1024:.1f}", f"{retained / 1024 / 1024:.1f}",
+                     f"{(used - retained) / RETAINED:.0f}", f"{rate:.0f}"))
+    print(f"Memória por {RETAINED} mensagens guardadas")
+    print(format_table(['bytes/msg', 'MB total', 'MB de frames', 'overhead B/msg', 'append/s'], rows))
+
+    rows = []
+    for engine in args.engines.split(','):
+        for text_size in sizes:
+            port = free_port()
+            proc = start_server('server_antigo.py',
+                                ['--port', str(port), '--history-messages', str(args.messages),
+                                 '--history-bytes', str(args.messages * (text_size + 128))] + ENGINES[engine],
+                                port, stdin=subprocess.PIPE)
+            try:
+                retained = fill_history(proc, port, args.messages, text_size, args.timeout)
+                rss = read_rss_kb(proc.pid)
+                for _ in range(args.rounds):
+                    messages, size, pages, elapsed = replay(port, args.page)
+                    rows.append((engine, text_size, retained, messages, pages, f"{messages / elapsed:.0f}",
+                                 f"{size / elapsed / 1024 / 1024:.1f}", f"{rss / 1024:.0f}"))
+            finally:
+                proc.stdin.close()
+                stop_server(proc)
+
+    print(f"\nReplay completo do histórico geral em páginas de {args.page}")
+    print(format_table(['motor', 'bytes/msg', 'guardadas', 'recebidas', 'páginas', 'msgs/s', 'MB/s', 'RSS MB'],
+                       rows))
+
+
+if __name__ == '__main__':
+    main()
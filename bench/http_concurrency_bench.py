@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import time
+
+from common import (
+    free_port, start_server, stop_server, format_table, percentile, raise_nofile_limit, read_rss_kb
+)
+
+ENGINES = {
+    'threads': [],
+    'event-loop': ['--event-loop'],
+}
+
+
+def read_threads(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('Threads:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+async def client(port, path, count, start_event, state, latencies, errors, timeout):
+    request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode('ascii')
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+        state['connected'] += 1
+        await start_event.wait()
+        for _ in range(count):
+            begin = time.perf_counter()
+            writer.write(request)
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+            length = 0
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await asyncio.wait_for(reader.readexactly(length), timeout)
+            latencies.append(time.perf_counter() - begin)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+        errors.append(type(e).__name__)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def sample(pid, peaks):
+    peaks['threads'] = max(peaks['threads'], read_threads(pid))
+    peaks['rss'] = max(peaks['rss'], read_rss_kb(pid))
+
+
+async def sample_server(pid, peaks, stop_event):
+    while not stop_event.is_set():
+        sample(pid, peaks)
+        await asyncio.sleep(0.2)
+
+
+async def run_case(port, connections, count, path, timeout, pid):
+    latencies = []
+    errors = []
+    state = {'connected': 0}
+    peaks = {'threads': 0, 'rss': 0}
+    start_event = asyncio.Event()
+    stop_event = asyncio.Event()
+    sampler = asyncio.create_task(sample_server(pid, peaks, stop_event))
+    tasks = [asyncio.create_task(client(port, path, count, start_event, state, latencies, errors, timeout))
+             for _ in range(connections)]
+
+    deadline = time.monotonic() + timeout
+    while state['connected'] + len(errors) < connections and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.2)
+    sample(pid, peaks)
+
+    start = time.perf_counter()
+    start_event.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    stop_event.set()
+    await sampler
+    return latencies, errors, elapsed, peaks['threads'], peaks['rss']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor HTTP: uma thread por conexão x laço de eventos')
+    parser.add_argument('--connections', default='100,1000,10000',
+                        help='números de conexões simultâneas, separados por vírgula')
+    parser.add_argument('--requests', type=int, default=5, help='requisições keep-alive por conexão')
+    parser.add_argument('--path', default='/index.html')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--engines', default=','.join(ENGINES))
+    args = parser.parse_args()
+
+    raise_nofile_limit()
+    rows = []
+    for engine in args.engines.split(','):
+        for connections in (int(n) for n in args.connections.split(',')):
+            port = free_port()
+            proc = start_server('server.py', [str(port), '--keepalive-timeout', str(args.timeout)] + ENGINES[engine],
+                                port)
+            try:
+                latencies, errors, elapsed, threads, rss = asyncio.run(
+                    run_case(port, connections, args.requests, args.path, args.timeout, proc.pid))
+            finally:
+                stop_server(proc)
+            rows.append((engine, connections, len(latencies), len(errors),
+                         f"{len(latencies) / elapsed:.0f}",
+                         f"{percentile(latencies, 50) * 1000:.1f}",
+                         f"{percentile(latencies, 99) * 1000:.1f}",
+                         threads, f"{rss / 1024:.0f}"))
+
+    print(format_table(['modelo', 'conexões', 'respostas', 'erros', 'req/s', 'p50 ms', 'p99 ms',
+                        'threads', 'RSS MB'], rows))
+
+
+if __name__ == '__main__':
+    main()
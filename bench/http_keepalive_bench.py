@@ -0,0 +1,131 @@
+import argparse
+import socket
+import threading
+import time
+
+from common import free_port, start_server, stop_server, format_table, raise_nofile_limit
+
+MAX_REQUESTS = 100
+
+
+class HTTPConnection:
+
+    def __init__(self, port):
+        self.sock = socket.create_connection(('127.0.0.1', port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = bytearray()
+
+    def read_response(self):
+        while b'\r\n\r\n' not in self.buffer:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError('conexão encerrada antes da resposta')
+            self.buffer += chunk
+        end = self.buffer.index(b'\r\n\r\n') + 4
+        head = bytes(self.buffer[:end]).decode('iso-8859-1')
+        del self.buffer[:end]
+        status = int(head.split(' ', 2)[1])
+        length = 0
+        for line in head.split('\r\n')[1:]:
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        while len(self.buffer) < length:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError('conexão encerrada durante o corpo')
+            self.buffer += chunk
+        del self.buffer[:length]
+        return status
+
+    def close(self):
+        self.sock.close()
+
+
+def request_bytes(path, keep_alive):
+    connection = 'keep-alive' if keep_alive else 'close'
+    return f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: {connection}\r\n\r\n".encode('ascii')
+
+
+def run_close(port, paths, count):
+    for i in range(count):
+        conn = HTTPConnection(port)
+        conn.sock.sendall(request_bytes(paths[i % len(paths)], False))
+        if conn.read_response() != 200:
+            raise RuntimeError('status inesperado')
+        conn.close()
+
+
+def run_keepalive(port, paths, count, depth):
+    conn = None
+    served = 0
+    done = 0
+    while done < count:
+        if conn is None:
+            conn = HTTPConnection(port)
+            served = 0
+        batch = min(depth, count - done)
+        conn.sock.sendall(b''.join(request_bytes(paths[(done + i) % len(paths)], True) for i in range(batch)))
+        for _ in range(batch):
+            if conn.read_response() != 200:
+                raise RuntimeError('status inesperado')
+        done += batch
+        served += batch
+        if served + depth > MAX_REQUESTS:
+            conn.close()
+            conn = None
+    if conn is not None:
+        conn.close()
+
+
+def run_case(port, clients, count, paths, mode, depth):
+    errors = []
+
+    def worker():
+        try:
+            if mode == 'close':
+                run_close(port, paths, count)
+            else:
+                run_keepalive(port, paths, count, depth)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise RuntimeError(f"{mode}: {errors[0]}")
+    return clients * count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Requisições/s do servidor HTTP: conexão por requisição x keep-alive')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500, help='requisições por cliente')
+    parser.add_argument('--depth', type=int, default=8, help='profundidade do pipelining')
+    parser.add_argument('--paths', default='/index.html,/teste_pequeno.txt,/imagem.jpg')
+    args = parser.parse_args()
+
+    raise_nofile_limit()
+    paths = args.paths.split(',')
+    port = free_port()
+    proc = start_server('server.py', [str(port), '--max-requests', str(MAX_REQUESTS)], port)
+    try:
+        rows = []
+        for label, mode, depth in (('fecha por requisição', 'close', 1),
+                                   ('keep-alive', 'keepalive', 1),
+                                   (f'pipelining x{args.depth}', 'keepalive', args.depth)):
+            rps = run_case(port, args.clients, args.requests, paths, mode, depth)
+            rows.append((label, args.clients, args.clients * args.requests, f"{rps:.0f}"))
+    finally:
+        stop_server(proc)
+
+    print(format_table(['modo', 'clientes', 'requisições', 'req/s'], rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import multiprocessing
+import os
+import time
+
+from common import free_port, start_server, stop_server, format_table, raise_nofile_limit
+from http_keepalive_bench import HTTPConnection, request_bytes
+
+
+def load_process(port, paths, connections, seconds, results):
+    conns = [HTTPConnection(port) for _ in range(connections)]
+    request = b''.join(request_bytes(path, True) for path in paths)
+    count = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for conn in conns:
+            conn.sock.sendall(request)
+        for conn in conns:
+            for _ in paths:
+                if conn.read_response() != 200:
+                    raise RuntimeError('status inesperado')
+            count += len(paths)
+    for conn in conns:
+        conn.close()
+    results.put(count)
+
+
+def run_case(port, processes, connections, paths, seconds):
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=load_process, args=(port, paths, connections, seconds, results))
+             for _ in range(processes)]
+    start = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    total = sum(results.get() for _ in procs)
+    for proc in procs:
+        proc.join()
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='Escalonamento do servidor HTTP com --workers')
+    parser.add_argument('--workers', default=','.join(str(n) for n in sorted({1, 2, 4, cores, cores * 2})),
+                        help='quantidades de workers a medir, separadas por vírgula')
+    parser.add_argument('--client-procs', type=int, default=cores, help='processos geradores de carga')
+    parser.add_argument('--connections', type=int, default=16, help='conexões keep-alive por processo de carga')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--paths', default='/index.html,/teste_pequeno.txt')
+    parser.add_argument('--event-loop', action='store_true', help='workers usam o laço de eventos')
+    args = parser.parse_args()
+
+    raise_nofile_limit()
+    paths = args.paths.split(',')
+    rows = []
+    baseline = None
+    for workers in (int(n) for n in args.workers.split(',')):
+        port = free_port()
+        extra = ['--workers', str(workers), '--max-requests', '1000000']
+        if args.event_loop:
+            extra.append('--event-loop')
+        proc = start_server('server.py', [str(port)] + extra, port)
+        try:
+            time.sleep(0.5)
+            rps = run_case(port, args.client_procs, args.connections, paths, args.seconds)
+        finally:
+            stop_server(proc)
+        baseline = baseline or rps
+        rows.append((workers, cores, f"{rps:.0f}", f"{rps / baseline:.2f}x"))
+
+    print(format_table(['workers', 'núcleos', 'req/s', 'vs 1 worker'], rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import socket
+import time
+
+from common import (
+    raise_nofile_limit, free_port, start_server, stop_server,
+    read_rss_kb, percentile, format_table
+)
+from protocol import (
+    MSG_QUIT, MSG_FILE, MSG_FILE_OK, MSG_FILE_META, MSG_FILE_HASH, MSG_FILE_DATA,
+    ReceiveBuffer, send_message
+)
+
+PROBE_FILE = 'teste_pequeno.txt'
+
+
+def open_idle_connections(port, count, sockets):
+    while len(sockets) < count:
+        s = socket.create_connection(('127.0.0.1', port), timeout=10)
+        sockets.append(s)
+
+
+def probe_latency(port):
+    start = time.perf_counter()
+    with socket.create_connection(('127.0.0.1', port), timeout=10) as s:
+        send_message(s, MSG_FILE, PROBE_FILE)
+        recv_buffer = ReceiveBuffer()
+        msg_type, _ = recv_buffer.receive_message(s)
+        if msg_type != MSG_FILE_OK:
+            raise RuntimeError(f"resposta inesperada: {msg_type}")
+        first_byte = time.perf_counter() - start
+
+        msg_type, metadata = recv_buffer.receive_message(s)
+        if msg_type != MSG_FILE_META:
+            raise RuntimeError("metadados não recebidos")
+        file_size = int.from_bytes(metadata[-8:], 'big')
+        received = 0
+        while received < file_size:
+            msg_type, payload = recv_buffer.receive_message(s)
+            if msg_type == MSG_FILE_DATA:
+                received += len(payload)
+            elif msg_type != MSG_FILE_HASH:
+                raise RuntimeError(f"mensagem inesperada: {msg_type}")
+        send_message(s, MSG_QUIT)
+    return first_byte, time.perf_counter() - start
+
+
+def run(engine, steps, probes):
+    port = free_port()
+    args = ['--port', str(port)]
+    if engine == 'async':
+        args.append('--async')
+
+    server = start_server('server_antigo.py', args, port)
+    sockets = []
+    rows = []
+    try:
+        time.sleep(0.5)
+        baseline_rss = read_rss_kb(server.pid)
+        for step in steps:
+            open_idle_connections(port, step, sockets)
+            time.sleep(1.0)
+            rss = read_rss_kb(server.pid)
+            totals = [probe_latency(port)[1] * 1000 for _ in range(probes)]
+            per_conn = (rss - baseline_rss) / step if step else 0
+            rows.append((
+                step, f"{rss / 1024:.1f}", f"{per_conn:.1f}",
+                f"{percentile(totals, 50):.2f}", f"{percentile(totals, 95):.2f}",
+                f"{percentile(totals, 99):.2f}",
+            ))
+    finally:
+        for s in sockets:
+            s.close()
+        stop_server(server)
+
+    print(f"\nMotor: {engine} (RSS inicial {baseline_rss / 1024:.1f} MB)")
+    print(format_table(
+        ['conexões', 'RSS MB', 'KB/conexão', 'p50 ms', 'p95 ms', 'p99 ms'], rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga de conexões ociosas no servidor de chat')
+    parser.add_argument('--engine', choices=['async', 'thread', 'both'], default='async',
+                        help="'thread' é lento para abrir milhares de conexões (listen(5) no servidor)")
+    parser.add_argument('--steps', default='100,1000,5000,10000',
+                        help='quantidade acumulada de conexões ociosas por etapa')
+    parser.add_argument('--probes', type=int, default=20,
+                        help='requisições FILE cronometradas por etapa')
+    args = parser.parse_args()
+
+    raise_nofile_limit()
+    steps = [int(s) for s in args.steps.split(',')]
+    engines = ['thread', 'async'] if args.engine == 'both' else [args.engine]
+    for engine in engines:
+        run(engine, steps, args.probes)
+
+
+if __name__ == '__main__':
+    main()
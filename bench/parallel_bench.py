@@ -0,0 +1,85 @@
+import argparse
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+from common import free_port, start_server, stop_server, make_test_file, format_table
+from protocol import HASH_BLOCK_SIZE, calculate_file_hash
+from client import DEFAULT_RANGE_SIZE, ByteCounter, block_ranges, fetch_ranges
+
+
+def download(port, filename, file_size, target, connections, range_size):
+    ranges = queue.Queue()
+    blocks = range((file_size + HASH_BLOCK_SIZE - 1) // HASH_BLOCK_SIZE)
+    for item in block_ranges(blocks, HASH_BLOCK_SIZE, file_size, range_size):
+        ranges.put(item)
+
+    counter = ByteCounter()
+    errors = []
+    fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    try:
+        os.ftruncate(fd, file_size)
+        start = time.perf_counter()
+        workers = [threading.Thread(target=fetch_ranges,
+                                    args=('127.0.0.1', port, filename, ranges, fd, counter, errors))
+                   for _ in range(connections)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        os.close(fd)
+
+    if errors or counter.value != file_size:
+        raise RuntimeError(errors[0] if errors else f"recebidos {counter.value} de {file_size} bytes")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Download paralelo por intervalos de bytes')
+    parser.add_argument('--size-mb', type=int, default=512)
+    parser.add_argument('--connections', default='1,2,4,8',
+                        help='lista de quantidades de conexões separadas por vírgula')
+    parser.add_argument('--range-mb', type=int, default=DEFAULT_RANGE_SIZE // (1024 * 1024))
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--async', dest='use_async', action='store_true', help='usa o motor asyncio')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='parallel_bench_')
+    files_dir = os.path.join(workdir, 'server_files')
+    os.makedirs(files_dir)
+    filename = f'arquivo_{args.size_mb}mb.bin'
+    source = make_test_file(os.path.join(files_dir, filename), args.size_mb)
+    target = os.path.join(workdir, 'download.bin')
+    file_size = os.path.getsize(source)
+    expected = calculate_file_hash(source)
+
+    port = free_port()
+    server_args = ['--port', str(port), '--dir', files_dir]
+    if args.use_async:
+        server_args.append('--async')
+    server = start_server('server_antigo.py', server_args, port)
+
+    rows = []
+    try:
+        for connections in (int(n) for n in args.connections.split(',')):
+            times = [download(port, filename, file_size, target, connections, args.range_mb * 1024 * 1024)
+                     for _ in range(args.runs)]
+            ok = calculate_file_hash(target) == expected
+            best = min(times)
+            rows.append((connections, f"{args.size_mb / best:.0f}", f"{best:.2f}",
+                         f"{sum(times) / len(times):.2f}", 'ok' if ok else 'FALHOU'))
+    finally:
+        stop_server(server)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Arquivo de {args.size_mb} MB em intervalos de {args.range_mb} MB, {args.runs} execuções")
+    print(format_table(['conexões', 'MB/s', 'melhor s', 'média s', 'hash'], rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import argparse
+import socket
+import struct
+import threading
+import time
+import tracemalloc
+
+from common import format_table
+from protocol import HEADER_SIZE, MSG_FILE_DATA, Message, ReceiveBuffer
+
+SIZES = {
+    '8KB': 8 * 1024,
+    '1MB': 1024 * 1024,
+    '100MB': 100 * 1024 * 1024,
+}
+
+
+def legacy_receive_exact(sock, num_bytes):
+    data = b''
+    while len(data) < num_bytes:
+        chunk = sock.recv(min(num_bytes - len(data), 4096))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def legacy_receive_message(sock):
+    header = legacy_receive_exact(sock, HEADER_SIZE)
+    if not header:
+        return None, None
+    payload_size, msg_type = Message.deserialize_header(header)
+    payload = legacy_receive_exact(sock, payload_size) if payload_size > 0 else b''
+    return msg_type, payload
+
+
+class CountingSocket:
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.calls = 0
+
+    def recv(self, size):
+        self.calls += 1
+        return self.sock.recv(size)
+
+    def recv_into(self, buffer, nbytes=0):
+        self.calls += 1
+        return self.sock.recv_into(buffer, nbytes)
+
+
+def sender(sock, payload, count):
+    header = struct.pack('!Q', len(payload)) + MSG_FILE_DATA
+    for _ in range(count):
+        sock.sendall(header)
+        sock.sendall(payload)
+
+
+def run_case(name, payload_size, count, trace):
+    a, b = socket.socketpair()
+    a.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+    b.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    payload = b'x' * payload_size
+    thread = threading.Thread(target=sender, args=(a, payload, count), daemon=True)
+    counting = CountingSocket(b)
+
+    if name == 'legacy':
+        receive = legacy_receive_message
+    else:
+        receive = ReceiveBuffer().receive_message
+
+    if trace:
+        tracemalloc.start()
+    thread.start()
+    start = time.perf_counter()
+    for _ in range(count):
+        msg_type, received = receive(counting)
+        if len(received) != payload_size:
+            raise RuntimeError(f"{name}: payload incompleto")
+        del received
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    thread.join()
+    a.close()
+    b.close()
+    return payload_size * count / elapsed / (1024 * 1024), counting.calls / count, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark do caminho de recepção')
+    parser.add_argument('--total-mb', type=int, default=256,
+                        help='volume transferido por caso (mínimo de 3 mensagens)')
+    parser.add_argument('--legacy-limit', type=int, default=8 * 1024 * 1024,
+                        help='maior payload medido com a implementação antiga (custo quadrático)')
+    args = parser.parse_args()
+
+    rows = []
+    for label, size in SIZES.items():
+        count = max(3, args.total_mb * 1024 * 1024 // size)
+        for name in ('legacy', 'ReceiveBuffer'):
+            if name == 'legacy' and size > args.legacy_limit:
+                rows.append((label, name, 'n/d', 'n/d', 'n/d'))
+                continue
+            mbps, calls, _ = run_case(name, size, count, trace=False)
+            _, _, peak = run_case(name, size, 3, trace=True)
+            rows.append((label, name, f"{mbps:.0f}", f"{calls:.1f}", f"{peak / size:.2f}x"))
+
+    print(format_table(['payload', 'implementação', 'MB/s', 'recv/msg', 'pico mem/payload'], rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import asyncio
+import subprocess
+import time
+
+from common import (
+    free_port, start_server, stop_server, format_table, percentile, raise_nofile_limit, read_cpu_seconds,
+    read_rss_kb
+)
+from protocol import (
+    MSG_CHAT, MSG_HELLO, MSG_JOIN, MSG_ROOM, CAP_ROOMS,
+    Message, FrameDecoder, encode_capabilities, encode_room_message, decode_room_message
+)
+
+ENGINES = {
+    'threads': [],
+    'async': ['--async'],
+}
+CONNECT_CONCURRENCY = 256
+
+
+class BenchClient:
+
+    def __init__(self, index, room):
+        self.index = index
+        self.room = room
+        self.reader = None
+        self.writer = None
+        self.decoder = FrameDecoder()
+
+    async def connect(self, port, semaphore, timeout):
+        async with semaphore:
+            self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+            self.writer.write(Message(MSG_HELLO, encode_capabilities({CAP_ROOMS})).serialize())
+            self.writer.write(Message(MSG_JOIN, encode_room_message(self.room)).serialize())
+            joined = False
+            while not joined:
+                data = await asyncio.wait_for(self.reader.read(65536), timeout)
+                if not data:
+                    raise ConnectionError('servidor encerrou a conexão')
+                self.decoder.feed(data)
+                joined = any(msg_type == MSG_JOIN for msg_type, _ in self.decoder.frames())
+
+    def send_room(self, text):
+        self.writer.write(Message(MSG_ROOM, encode_room_message(self.room, text)).serialize())
+
+    async def read_loop(self, recorder):
+        while True:
+            data = await self.reader.read(65536)
+            if not data:
+                return
+            self.decoder.feed(data)
+            now = time.monotonic_ns()
+            for msg_type, payload in self.decoder.frames():
+                if msg_type == MSG_ROOM:
+                    _, text = decode_room_message(payload)
+                elif msg_type == MSG_CHAT:
+                    text = bytes(payload).decode('utf-8')
+                else:
+                    continue
+                recorder.record(now, int(text.rsplit(' ', 1)[1]))
+
+
+class Phase:
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.latencies = []
+        self.last_ns = 0
+        self.done = asyncio.Event()
+
+    def record(self, now, sent_ns):
+        self.latencies.append((now - sent_ns) / 1e9)
+        self.last_ns = now
+        if len(self.latencies) >= self.expected:
+            self.done.set()
+
+
+class Recorder:
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def record(self, now, sent_ns):
+        self.phase.record(now, sent_ns)
+
+
+async def wait_phase(phase, timeout):
+    try:
+        await asyncio.wait_for(phase.done.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def run_case(proc, port, clients_count, rooms_count, rounds, broadcasts, interval, timeout):
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    clients = [BenchClient(i, f'sala{i % rooms_count}') for i in range(clients_count)]
+    await asyncio.gather(*(client.connect(port, semaphore, timeout) for client in clients))
+    senders = clients[:rooms_count]
+    members = [0] * rooms_count
+    for client in clients:
+        members[client.index % rooms_count] += 1
+    await asyncio.sleep(0.5)
+
+    results = []
+    room_phase = Phase(rounds * sum(count - 1 for count in members))
+    broadcast_phase = Phase(broadcasts * clients_count)
+    recorder = Recorder(room_phase)
+    readers = [asyncio.create_task(client.read_loop(recorder)) for client in clients]
+
+    for name, phase, sends in (('salas', room_phase, rounds), ('broadcast', broadcast_phase, broadcasts)):
+        if not sends:
+            continue
+        recorder.phase = phase
+        cpu_start = read_cpu_seconds(proc.pid)
+        start_ns = time.monotonic_ns()
+        for round_index in range(sends):
+            if phase is room_phase:
+                for sender in senders:
+                    sender.send_room(f"bench {time.monotonic_ns()}")
+            else:
+                proc.stdin.write(f"bench {time.monotonic_ns()}\n".encode())
+                proc.stdin.flush()
+            await asyncio.sleep(interval)
+        await wait_phase(phase, timeout)
+        elapsed = max(phase.last_ns - start_ns, 1) / 1e9
+        results.append((name, sends * (len(senders) if phase is room_phase else 1), phase.expected,
+                        len(phase.latencies), len(phase.latencies) / elapsed, phase.latencies,
+                        read_cpu_seconds(proc.pid) - cpu_start, read_rss_kb(proc.pid)))
+
+    for task in readers:
+        task.cancel()
+    for client in clients:
+        client.writer.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fan-out em salas x broadcast global no servidor de chat')
+    parser.add_argument('--clients', type=int, default=10000)
+    parser.add_argument('--rooms', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=5, help='mensagens enviadas por sala')
+    parser.add_argument('--broadcasts', type=int, default=5, help='mensagens difundidas a todos os clientes')
+    parser.add_argument('--interval', type=float, default=0.2, help='segundos entre rodadas de envio')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--engines', default=','.join(ENGINES))
+    args = parser.parse_args()
+
+    raise_nofile_limit()
+    rows = []
+    for engine in args.engines.split(','):
+        port = free_port()
+        proc = start_server('server_antigo.py', ['--port', str(port)] + ENGINES[engine], port,
+                            stdin=subprocess.PIPE)
+        try:
+            results = asyncio.run(run_case(proc, port, args.clients, args.rooms, args.rounds, args.broadcasts,
+                                           args.interval, args.timeout))
+        finally:
+            proc.stdin.close()
+            stop_server(proc)
+        for name, messages, expected, delivered, rate, latencies, cpu, rss in results:
+            rows.append((engine, name, messages, expected, delivered, f"{rate:.0f}",
+                         f"{percentile(latencies, 50) * 1000:.1f}", f"{percentile(latencies, 99) * 1000:.1f}",
+                         f"{cpu:.1f}", f"{rss / 1024:.0f}"))
+
+    print(f"{args.clients} clientes em {args.rooms} salas")
+    print(format_table(['motor', 'envio', 'mensagens', 'entregas esperadas', 'entregues', 'entregas/s',
+                        'p50 ms', 'p99 ms', 'CPU s', 'RSS MB'], rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from common import format_table
+from protocol import (
+    CHUNK_SIZE, MSG_CHAT, MSG_FILE_OK, MSG_FILE_META, MSG_FILE_HASH, MSG_FILE_DATA,
+    Message, FrameWriter, send_message, send_file, calculate_file_hash
+)
+
+
+class CountingSocket:
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.calls = 0
+
+    def sendall(self, data):
+        self.calls += 1
+        return self.sock.sendall(data)
+
+    def sendmsg(self, buffers):
+        self.calls += 1
+        return self.sock.sendmsg(buffers)
+
+
+def legacy_send_message(sock, msg_type, payload=b''):
+    sock.sendall(Message(msg_type, payload).serialize())
+
+
+def legacy_send_file(sock, filepath):
+    legacy_send_message(sock, MSG_FILE_OK)
+    file_hash = calculate_file_hash(filepath)
+    file_size = os.path.getsize(filepath)
+    legacy_send_message(sock, MSG_FILE_META, b'\x00' * 12)
+    legacy_send_message(sock, MSG_FILE_HASH, file_hash)
+    with open(filepath, 'rb') as f:
+        bytes_sent = 0
+        while bytes_sent < file_size:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            legacy_send_message(sock, MSG_FILE_DATA, chunk)
+            bytes_sent += len(chunk)
+
+
+def drain(sock, result):
+    buffer = bytearray(1 << 20)
+    total = 0
+    while True:
+        n = sock.recv_into(buffer)
+        if not n:
+            break
+        total += n
+    result.append(total)
+
+
+def measure(send):
+    a, b = socket.socketpair()
+    result = []
+    thread = threading.Thread(target=drain, args=(b, result), daemon=True)
+    thread.start()
+    counting = CountingSocket(a)
+    start = time.perf_counter()
+    send(counting)
+    a.shutdown(socket.SHUT_WR)
+    thread.join()
+    elapsed = time.perf_counter() - start
+    a.close()
+    b.close()
+    return result[0], elapsed, counting.calls
+
+
+def chat_burst_cases(count, message):
+    def legacy(sock):
+        for _ in range(count):
+            legacy_send_message(sock, MSG_CHAT, message)
+
+    def sendmsg(sock):
+        for _ in range(count):
+            send_message(sock, MSG_CHAT, message)
+
+    def coalesced(sock):
+        writer = FrameWriter(sock)
+        for _ in range(count):
+            writer.write(MSG_CHAT, message)
+        writer.flush()
+
+    return [('sendall por frame', legacy), ('send_message', sendmsg), ('FrameWriter', coalesced)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do caminho de envio')
+    parser.add_argument('--file-mb', type=int, default=256)
+    parser.add_argument('--chat-frames', type=int, default=100000)
+    parser.add_argument('--chat-size', type=int, default=64)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.NamedTemporaryFile(suffix='.bin') as tmp:
+        tmp.write(os.urandom(1024 * 1024) * args.file_mb)
+        tmp.flush()
+        cases = [('send_file antigo', lambda s: legacy_send_file(s, tmp.name)),
+                 ('send_file', lambda s: send_file(s, tmp.name))]
+        for name, send in cases:
+            total, elapsed, calls = measure(send)
+            rows.append((f'arquivo {args.file_mb} MB', name, f"{total / elapsed / (1 << 20):.0f} MB/s",
+                         calls, f"{elapsed:.2f}"))
+
+    message = 'x' * args.chat_size
+    for name, send in chat_burst_cases(args.chat_frames, message):
+        total, elapsed, calls = measure(send)
+        rows.append((f'{args.chat_frames} CHAT', name, f"{args.chat_frames / elapsed:.0f} msg/s",
+                     calls, f"{elapsed:.2f}"))
+
+    print(format_table(['cenário', 'implementação', 'vazão', 'syscalls', 'tempo s'], rows))
+
+
+if __name__ == '__main__':
+    main()
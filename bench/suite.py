@@ -0,0 +1,421 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from common import (
+    ROOT_DIR, free_port, start_server, stop_server, read_cpu_seconds, read_rss_kb,
+    make_test_file, percentile, format_table, raise_nofile_limit
+)
+from http_keepalive_bench import HTTPConnection, request_bytes
+from protocol import (
+    MSG_CHAT, MSG_ECHO, MSG_FILE, MSG_HELLO, MSG_QUIT, CAP_ECHO, CAP_SENDFILE,
+    FrameDecoder, ReceiveBuffer, send_message, receive_file,
+    encode_capabilities, decode_capabilities, encode_file_request
+)
+
+WORKLOADS = ('chat-fanout', 'echo', 'download', 'http-keepalive', 'http-close')
+CHAT_WORKLOADS = ('chat-fanout', 'echo', 'download')
+HTTP_WORKLOADS = ('http-keepalive', 'http-close')
+REGRESSION_THRESHOLD = 0.10
+
+
+class ServerMonitor:
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss_kb = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.peak_rss_kb = max(self.peak_rss_kb, read_rss_kb(self.pid))
+            self.stop_event.wait(self.interval)
+
+    def __enter__(self):
+        self.cpu_start = read_cpu_seconds(self.pid)
+        self.wall_start = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+        self.cpu = read_cpu_seconds(self.pid) - self.cpu_start
+        self.wall = time.perf_counter() - self.wall_start
+
+
+def run_clients(count, target):
+    errors = []
+
+    def wrapper(index):
+        try:
+            target(index)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+
+    threads = [threading.Thread(target=wrapper, args=(i,), daemon=True) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def make_result(workload, server, engine, clients, monitor, ops, latencies, errors, unit, volume=None):
+    result = {
+        'workload': workload,
+        'server': server,
+        'engine': engine,
+        'clients': clients,
+        'ops': ops,
+        'errors': len(errors),
+        'duration_s': round(monitor.wall, 3),
+        'throughput': round(ops / monitor.wall, 1) if monitor.wall else 0.0,
+        'unit': unit,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'server_cpu_s': round(monitor.cpu, 3),
+        'server_cpu_pct': round(100 * monitor.cpu / monitor.wall, 1) if monitor.wall else 0.0,
+        'server_rss_mb': round(monitor.peak_rss_kb / 1024, 1),
+    }
+    if volume is not None:
+        result['mb_per_s'] = round(volume / monitor.wall / (1 << 20), 1) if monitor.wall else 0.0
+    if errors:
+        result['first_error'] = errors[0]
+    return result
+
+
+def connect_chat(port, capabilities):
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    send_message(sock, MSG_HELLO, encode_capabilities(capabilities))
+    msg_type, payload = ReceiveBuffer().receive_message(sock)
+    if msg_type != MSG_HELLO or not capabilities <= decode_capabilities(payload):
+        sock.close()
+        raise RuntimeError(f"servidor não negociou {encode_capabilities(capabilities)}")
+    return sock
+
+
+def close_chat(sock):
+    try:
+        send_message(sock, MSG_QUIT)
+    except OSError:
+        pass
+    sock.close()
+
+
+def chat_fanout(server, port, engine, args):
+    socks = [connect_chat(port, set()) for _ in range(args.clients)]
+    latencies = []
+    lock = threading.Lock()
+    total = args.fanout_messages
+
+    def reader(index):
+        sock = socks[index]
+        decoder = FrameDecoder()
+        received = 0
+        sock.settimeout(args.duration + 10)
+        while received < total:
+            for msg_type, payload in decoder.frames():
+                if msg_type == MSG_CHAT:
+                    now = time.monotonic_ns()
+                    sent_ns = int(bytes(payload).decode('utf-8').rsplit(' ', 1)[1])
+                    with lock:
+                        latencies.append((now - sent_ns) / 1e9)
+                    received += 1
+            if received < total and decoder.recv_into(sock) == 0:
+                raise ConnectionError('servidor encerrou a conexão')
+
+    time.sleep(0.5)
+    with ServerMonitor(server.pid) as monitor:
+        readers = threading.Thread(target=lambda: errors.extend(run_clients(args.clients, reader)))
+        errors = []
+        readers.start()
+        interval = args.duration / total
+        start = time.perf_counter()
+        for seq in range(total):
+            delay = start + seq * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            server.stdin.write(f"bench {seq} {time.monotonic_ns()}\n".encode())
+            server.stdin.flush()
+        readers.join()
+
+    for sock in socks:
+        close_chat(sock)
+    return make_result('chat-fanout', 'server_antigo', engine, args.clients, monitor,
+                       len(latencies), latencies, errors, 'entregas/s')
+
+
+def echo(server, port, engine, args):
+    payload = b'x' * args.echo_size
+    latencies = []
+    lock = threading.Lock()
+    deadline = [0.0]
+
+    def client(index):
+        sock = connect_chat(port, {CAP_ECHO})
+        decoder = FrameDecoder()
+        local = []
+        try:
+            while time.perf_counter() < deadline[0]:
+                begin = time.perf_counter()
+                send_message(sock, MSG_ECHO, payload)
+                replied = False
+                while not replied:
+                    for msg_type, reply in decoder.frames():
+                        if msg_type == MSG_ECHO:
+                            replied = True
+                    if not replied and decoder.recv_into(sock) == 0:
+                        raise ConnectionError('servidor encerrou a conexão')
+                local.append(time.perf_counter() - begin)
+        finally:
+            close_chat(sock)
+            with lock:
+                latencies.extend(local)
+
+    with ServerMonitor(server.pid) as monitor:
+        deadline[0] = time.perf_counter() + args.duration
+        errors = run_clients(args.clients, client)
+
+    return make_result('echo', 'server_antigo', engine, args.clients, monitor,
+                       len(latencies), latencies, errors, 'msg/s')
+
+
+def download(server, port, engine, args, filename, file_size, workdir):
+    latencies = []
+    lock = threading.Lock()
+    deadline = [0.0]
+
+    def client(index):
+        save_dir = os.path.join(workdir, f'cliente_{index}')
+        sock = connect_chat(port, {CAP_SENDFILE})
+        local = []
+        try:
+            while time.perf_counter() < deadline[0]:
+                begin = time.perf_counter()
+                send_message(sock, MSG_FILE, encode_file_request(filename, {'mode': args.download_mode}))
+                ok, message = receive_file(sock, save_dir, progress=False)
+                if not ok:
+                    raise RuntimeError(message)
+                local.append(time.perf_counter() - begin)
+        finally:
+            close_chat(sock)
+            with lock:
+                latencies.extend(local)
+
+    with ServerMonitor(server.pid) as monitor:
+        deadline[0] = time.perf_counter() + args.duration
+        errors = run_clients(args.clients, client)
+
+    result = make_result(f'download:{filename}', 'server_antigo', engine, args.clients, monitor,
+                         len(latencies), latencies, errors, 'arquivos/s', volume=len(latencies) * file_size)
+    result['file_size'] = file_size
+    return result
+
+
+def http_load(server, port, engine, args, keep_alive):
+    paths = args.http_paths.split(',')
+    latencies = []
+    lock = threading.Lock()
+    deadline = [0.0]
+
+    def client(index):
+        local = []
+        conn = None
+        try:
+            i = index
+            while time.perf_counter() < deadline[0]:
+                begin = time.perf_counter()
+                if conn is None:
+                    conn = HTTPConnection(port)
+                conn.sock.sendall(request_bytes(paths[i % len(paths)], keep_alive))
+                status = conn.read_response()
+                if status != 200:
+                    raise RuntimeError(f"status {status}")
+                if not keep_alive:
+                    conn.close()
+                    conn = None
+                local.append(time.perf_counter() - begin)
+                i += 1
+        finally:
+            if conn is not None:
+                conn.close()
+            with lock:
+                latencies.extend(local)
+
+    with ServerMonitor(server.pid) as monitor:
+        deadline[0] = time.perf_counter() + args.duration
+        errors = run_clients(args.clients, client)
+
+    name = 'http-keepalive' if keep_alive else 'http-close'
+    return make_result(name, 'server', engine, args.clients, monitor, len(latencies), latencies, errors, 'req/s')
+
+
+def prepare_files(workdir, args):
+    files_dir = os.path.join(workdir, 'server_files')
+    shutil.copytree(os.path.join(ROOT_DIR, 'server_files'), files_dir)
+    for size_mb in args.download_mb:
+        make_test_file(os.path.join(files_dir, f'grande_{size_mb}mb.bin'), size_mb)
+    return files_dir
+
+
+def download_files(files_dir, args):
+    names = args.download_files.split(',') + [f'grande_{size_mb}mb.bin' for size_mb in args.download_mb]
+    return [(name, os.path.getsize(os.path.join(files_dir, name))) for name in names]
+
+
+def run_chat_workloads(selected, workdir, files_dir, args):
+    results = []
+    port = free_port()
+    server_args = ['--port', str(port), '--dir', files_dir]
+    if args.chat_engine == 'async':
+        server_args.append('--async')
+    server = start_server('server_antigo.py', server_args, port, stdin=subprocess.PIPE)
+    try:
+        if 'chat-fanout' in selected:
+            results.append(chat_fanout(server, port, args.chat_engine, args))
+        if 'echo' in selected:
+            results.append(echo(server, port, args.chat_engine, args))
+        if 'download' in selected:
+            for filename, file_size in download_files(files_dir, args):
+                results.append(download(server, port, args.chat_engine, args, filename, file_size, workdir))
+    finally:
+        server.stdin.close()
+        stop_server(server)
+    return results
+
+
+def run_http_workloads(selected, workdir, args):
+    results = []
+    port = free_port()
+    server_args = [str(port), '--max-requests', '1000000']
+    if args.http_engine == 'event-loop':
+        server_args.append('--event-loop')
+    if args.http_workers > 1:
+        server_args += ['--workers', str(args.http_workers)]
+    server = start_server('server.py', server_args, port, cwd=workdir)
+    try:
+        for workload in HTTP_WORKLOADS:
+            if workload in selected:
+                results.append(http_load(server, port, args.http_engine, args, workload == 'http-keepalive'))
+    finally:
+        stop_server(server)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result):
+    return (result['workload'], result['engine'], result['clients'])
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {result_key(r): r for r in json.load(f)['results']}
+
+    rows = []
+    regressions = 0
+    for result in results:
+        old = baseline.get(result_key(result))
+        if old is None:
+            rows.append((result['workload'], result['engine'], '-', result['throughput'], '-', '-', 'novo'))
+            continue
+        throughput_delta = result['throughput'] / old['throughput'] - 1 if old['throughput'] else 0.0
+        p99_delta = result['p99_ms'] / old['p99_ms'] - 1 if old['p99_ms'] else 0.0
+        regressed = throughput_delta < -threshold or p99_delta > threshold
+        regressions += regressed
+        rows.append((result['workload'], result['engine'], old['throughput'], result['throughput'],
+                     f"{throughput_delta:+.1%}", f"{p99_delta:+.1%}", 'REGRESSÃO' if regressed else 'ok'))
+
+    print()
+    print(f"Comparação com {baseline_path} (limite {threshold:.0%})")
+    print(format_table(['carga', 'motor', 'antes', 'depois', 'vazão', 'p99', 'status'], rows))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Suíte de benchmarks do servidor HTTP e do servidor de chat/arquivos')
+    parser.add_argument('--workloads', default=','.join(WORKLOADS),
+                        help=f"cargas separadas por vírgula: {', '.join(WORKLOADS)}")
+    parser.add_argument('--clients', type=int, default=16, help='clientes simultâneos por carga')
+    parser.add_argument('--duration', type=float, default=5.0, help='segundos por carga')
+    parser.add_argument('--chat-engine', choices=('threads', 'async'), default='threads')
+    parser.add_argument('--http-engine', choices=('threads', 'event-loop'), default='threads')
+    parser.add_argument('--http-workers', type=int, default=1)
+    parser.add_argument('--http-paths', default='/index.html,/teste_pequeno.txt,/imagem.jpg')
+    parser.add_argument('--fanout-messages', type=int, default=500,
+                        help='mensagens difundidas pelo console durante a carga chat-fanout')
+    parser.add_argument('--echo-size', type=int, default=64)
+    parser.add_argument('--download-files', default='teste_pequeno.txt,imagem.jpg,arquivo_medio.txt')
+    parser.add_argument('--download-mb', type=lambda v: [int(n) for n in v.split(',') if n], default=[16],
+                        help='tamanhos extras gerados para download, em MB, separados por vírgula')
+    parser.add_argument('--download-mode', choices=('framed', 'sendfile'), default='sendfile')
+    parser.add_argument('--json', help='grava os resultados em JSON neste caminho')
+    parser.add_argument('--compare', help='JSON de uma execução anterior para detectar regressões')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='variação relativa de vazão ou p99 considerada regressão')
+    args = parser.parse_args()
+
+    selected = set(args.workloads.split(','))
+    unknown = selected - set(WORKLOADS)
+    if unknown:
+        parser.error(f"cargas desconhecidas: {', '.join(sorted(unknown))}")
+
+    raise_nofile_limit()
+    workdir = tempfile.mkdtemp(prefix='bench_suite_')
+    results = []
+    try:
+        files_dir = prepare_files(workdir, args)
+        if selected & set(CHAT_WORKLOADS):
+            results += run_chat_workloads(selected, workdir, files_dir, args)
+        if selected & set(HTTP_WORKLOADS):
+            results += run_http_workloads(selected, workdir, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    rows = [(r['workload'], r['engine'], r['clients'], r['ops'], r['errors'], f"{r['throughput']} {r['unit']}",
+             r['p50_ms'], r['p95_ms'], r['p99_ms'], r['server_cpu_pct'], r['server_rss_mb']) for r in results]
+    print(format_table(['carga', 'motor', 'clientes', 'ops', 'erros', 'vazão', 'p50 ms', 'p95 ms', 'p99 ms',
+                        'CPU %', 'RSS MB'], rows))
+
+    if args.json:
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'args': {k: v for k, v in vars(args).items() if k not in ('json', 'compare')},
+            },
+            'results': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados gravados em {args.json}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
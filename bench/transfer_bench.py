@@ -0,0 +1,76 @@
+import argparse
+import os
+import shutil
+import socket
+import tempfile
+import time
+
+from common import (
+    free_port, start_server, stop_server, read_cpu_seconds, make_test_file, format_table
+)
+from protocol import (
+    MSG_FILE, MSG_HELLO, MSG_QUIT, CAP_SENDFILE, TRANSFER_FRAMED, TRANSFER_SENDFILE,
+    ReceiveBuffer, send_message, receive_file, encode_capabilities, decode_capabilities,
+    encode_file_request
+)
+
+
+def download(port, filename, mode, save_dir):
+    with socket.create_connection(('127.0.0.1', port)) as sock:
+        send_message(sock, MSG_HELLO, encode_capabilities({CAP_SENDFILE}))
+        msg_type, payload = ReceiveBuffer().receive_message(sock)
+        if msg_type != MSG_HELLO or CAP_SENDFILE not in decode_capabilities(payload):
+            raise RuntimeError("servidor não negociou sendfile")
+
+        start = time.perf_counter()
+        send_message(sock, MSG_FILE, encode_file_request(filename, {'mode': mode}))
+        ok, message = receive_file(sock, save_dir, progress=False)
+        elapsed = time.perf_counter() - start
+        if not ok:
+            raise RuntimeError(message)
+        send_message(sock, MSG_QUIT)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Modo FDAT enquadrado x sendfile no loopback')
+    parser.add_argument('--size-mb', type=int, default=1024)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--async', dest='use_async', action='store_true', help='usa o motor asyncio')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='transfer_bench_')
+    files_dir = os.path.join(workdir, 'server_files')
+    save_dir = os.path.join(workdir, 'downloads')
+    os.makedirs(files_dir)
+    filename = f'arquivo_{args.size_mb}mb.bin'
+    make_test_file(os.path.join(files_dir, filename), args.size_mb)
+
+    port = free_port()
+    server_args = ['--port', str(port), '--dir', files_dir]
+    if args.use_async:
+        server_args.append('--async')
+    server = start_server('server_antigo.py', server_args, port)
+
+    rows = []
+    try:
+        download(port, filename, TRANSFER_FRAMED, save_dir)
+        for mode in (TRANSFER_FRAMED, TRANSFER_SENDFILE):
+            times = []
+            cpu_before = read_cpu_seconds(server.pid)
+            for _ in range(args.runs):
+                times.append(download(port, filename, mode, save_dir))
+            cpu = (read_cpu_seconds(server.pid) - cpu_before) / args.runs
+            best = min(times)
+            rows.append((mode, f"{args.size_mb / best:.0f}", f"{best:.2f}",
+                         f"{sum(times) / len(times):.2f}", f"{cpu:.2f}"))
+    finally:
+        stop_server(server)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Arquivo de {args.size_mb} MB, {args.runs} execuções por modo (page cache quente)")
+    print(format_table(['modo', 'MB/s', 'melhor s', 'média s', 'CPU servidor s'], rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import hashlib
+import os
+import shutil
+import socket
+import tempfile
+import time
+
+from common import (
+    free_port, start_server, stop_server, make_test_file, drop_file_cache, format_table
+)
+from protocol import (
+    MSG_FILE, MSG_HELLO, MSG_QUIT, MSG_FILE_OK, MSG_FILE_META, MSG_FILE_HASH,
+    MSG_FILE_DATA, MSG_FILE_RAW, CAP_SENDFILE, CAP_TRAILER,
+    HASH_UPFRONT, HASH_TRAILER, TRANSFER_FRAMED, TRANSFER_SENDFILE,
+    ReceiveBuffer, send_message, encode_capabilities, encode_file_request
+)
+
+
+def timed_download(sock, filename, mode, hash_mode):
+    recv_buffer = ReceiveBuffer()
+    sha256 = hashlib.sha256()
+    start = time.perf_counter()
+    send_message(sock, MSG_FILE, encode_file_request(filename, {'mode': mode, 'hash': hash_mode}))
+
+    msg_type, _ = recv_buffer.receive_message(sock)
+    if msg_type != MSG_FILE_OK:
+        raise RuntimeError(f"resposta inesperada: {msg_type}")
+    msg_type, metadata = recv_buffer.receive_message(sock)
+    if msg_type != MSG_FILE_META:
+        raise RuntimeError("metadados não recebidos")
+    file_size = int.from_bytes(metadata[-8:], 'big')
+
+    first_byte = None
+    received = 0
+    file_hash = None
+    while received < file_size or file_hash is None:
+        payload_size, msg_type = recv_buffer.receive_header(sock)
+        if msg_type == MSG_FILE_HASH:
+            file_hash = bytes(recv_buffer.receive_exact(sock, payload_size))
+            continue
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        if msg_type == MSG_FILE_RAW:
+            chunks = recv_buffer.receive_stream(sock, payload_size)
+        elif msg_type == MSG_FILE_DATA:
+            chunks = [recv_buffer.receive_exact(sock, payload_size)]
+        else:
+            raise RuntimeError(f"mensagem inesperada: {msg_type}")
+        for chunk in chunks:
+            sha256.update(chunk)
+            received += len(chunk)
+
+    if sha256.digest() != file_hash:
+        raise RuntimeError("hash divergente")
+    return first_byte, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tempo até o primeiro byte: hash antecipado x trailer')
+    parser.add_argument('--size-mb', type=int, default=1024)
+    parser.add_argument('--runs', type=int, default=2)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ttfb_bench_')
+    files_dir = os.path.join(workdir, 'server_files')
+    os.makedirs(files_dir)
+    filename = f'arquivo_{args.size_mb}mb.bin'
+    filepath = make_test_file(os.path.join(files_dir, filename), args.size_mb)
+
+    port = free_port()
+    server = start_server('server_antigo.py',
+                          ['--port', str(port), '--dir', files_dir, '--hash-cache-size', '0'], port)
+    rows = []
+    try:
+        with socket.create_connection(('127.0.0.1', port)) as sock:
+            send_message(sock, MSG_HELLO, encode_capabilities({CAP_SENDFILE, CAP_TRAILER}))
+            ReceiveBuffer().receive_message(sock)
+
+            for mode in (TRANSFER_FRAMED, TRANSFER_SENDFILE):
+                for hash_mode in (HASH_UPFRONT, HASH_TRAILER):
+                    results = []
+                    for _ in range(args.runs):
+                        drop_file_cache(filepath)
+                        results.append(timed_download(sock, filename, mode, hash_mode))
+                    ttfb = sum(r[0] for r in results) / len(results)
+                    total = sum(r[1] for r in results) / len(results)
+                    rows.append((mode, hash_mode, f"{ttfb * 1000:.1f}", f"{total:.2f}",
+                                 f"{args.size_mb / total:.0f}"))
+            send_message(sock, MSG_QUIT)
+    finally:
+        stop_server(server)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Arquivo de {args.size_mb} MB fora do page cache (posix_fadvise DONTNEED) a cada execução")
+    print(format_table(['transferência', 'hash', 'TTFB ms', 'total s', 'MB/s'], rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,15 +3,363 @@ import threading
 import os
 import sys
 import queue
-import struct
 import hashlib
+import io
+import time
+from compression import available_codecs, choose_codec
+from delta import choose_block_size, file_signatures, unpack_delta_copy
 from protocol import (
-    MSG_QUIT, MSG_FILE, MSG_CHAT,
-    MSG_FILE_OK, MSG_FILE_ERROR, MSG_FILE_META, MSG_FILE_DATA, MSG_FILE_HASH,
-    send_message, receive_message, CHUNK_SIZE
+    MSG_QUIT, MSG_FILE, MSG_CHAT, MSG_HELLO, MSG_STATS, MSG_JOIN, MSG_LEAVE, MSG_ROOM, MSG_HISTORY, MSG_HISTORY_END,
+    MSG_FILE_OK, MSG_FILE_ERROR, MSG_FILE_META, MSG_FILE_DATA, MSG_FILE_HASH, MSG_FILE_RAW,
+    MSG_DELTA_REQUEST, MSG_DELTA_META, MSG_DELTA_COPY, MSG_DELTA_DATA, MSG_DELTA_END,
+    FILE_REPLY_TYPES, DELTA_REPLY_TYPES, CAP_SENDFILE, CAP_TRAILER, CAP_RANGE, CAP_BLOCKS, CAP_STREAMS, CAP_STATS,
+    CAP_ROOMS, CAP_HISTORY, CAP_DELTA,
+    HASH_TRAILER, HASH_NONE, TRANSFER_SENDFILE, RAW_READ_SIZE, RANGE_ERROR,
+    FrameDecoder, send_message, encode_capabilities, decode_capabilities, encode_file_request,
+    decode_stream_payload, unpack_file_meta, unpack_file_hash, verify_file_blocks,
+    encode_room_message, decode_room_message, encode_history_request, decode_history_end, decode_history_entry,
+    encode_delta_request, decode_delta_end
 )
 
 DOWNLOAD_DIR = 'client_downloads'
+HANDSHAKE_TIMEOUT = 2
+PARTIAL_SUFFIX = '.part'
+DELTA_SUFFIX = '.delta'
+MAX_BLOCK_RETRIES = 3
+DEFAULT_PARALLEL_CONNECTIONS = 4
+DEFAULT_RANGE_SIZE = 8 * 1024 * 1024
+HISTORY_ON_JOIN = 20
+FILE_REPLY_TIMEOUT = 10
+SINK_BUFFER_SIZE = 1024 * 1024
+PROGRESS_INTERVAL = 0.25
+
+EVENT_START = 'inicio'
+EVENT_PROGRESS = 'progresso'
+EVENT_DONE = 'fim'
+
+CLIENT_CAPABILITIES = {
+    CAP_SENDFILE, CAP_TRAILER, CAP_RANGE, CAP_BLOCKS, CAP_STREAMS, CAP_STATS, CAP_ROOMS, CAP_HISTORY, CAP_DELTA
+}
+
+
+def negotiate_capabilities(sock, decoder, handle_message=None):
+    send_message(sock, MSG_HELLO, encode_capabilities(CLIENT_CAPABILITIES | available_codecs()))
+    sock.settimeout(HANDSHAKE_TIMEOUT)
+    try:
+        while True:
+            for msg_type, payload in decoder.frames():
+                if msg_type == MSG_HELLO:
+                    capabilities = decode_capabilities(payload)
+                    decoder.codec = choose_codec(capabilities)
+                    return capabilities
+                if handle_message is not None:
+                    handle_message(msg_type, payload)
+            
+            if decoder.recv_into(sock) == 0:
+                return set()
+    except socket.timeout:
+        return set()
+    finally:
+        sock.settimeout(None)
+
+
+def block_ranges(blocks, block_size, file_size, range_size=DEFAULT_RANGE_SIZE):
+    blocks_per_range = max(1, range_size // block_size)
+    runs = []
+    for index in blocks:
+        if runs and index == runs[-1][-1] + 1 and len(runs[-1]) < blocks_per_range:
+            runs[-1].append(index)
+        else:
+            runs.append([index])
+    
+    ranges = []
+    for run in runs:
+        offset = run[0] * block_size
+        ranges.append((offset, min((run[-1] + 1) * block_size, file_size) - offset))
+    return ranges
+
+
+class ByteCounter:
+    
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+    
+    def add(self, amount):
+        with self.lock:
+            self.value += amount
+
+
+def receive_range_into(sock, decoder, fd, offset, length, buffer, counter):
+    position = offset
+    end = offset + length
+    while True:
+        for msg_type, payload in decoder.frames():
+            if msg_type == MSG_FILE_ERROR:
+                raise ConnectionError(bytes(payload).decode('utf-8'))
+            
+            if msg_type == MSG_FILE_DATA:
+                position += os.pwrite(fd, payload, position)
+                counter.add(len(payload))
+            
+            elif msg_type == MSG_FILE_RAW:
+                while decoder.raw_remaining:
+                    n = decoder.read_raw(sock, buffer)
+                    position += os.pwrite(fd, buffer[:n], position)
+                    counter.add(n)
+            
+            if position >= end:
+                return
+        
+        if decoder.recv_into(sock) == 0:
+            raise ConnectionError("Conexão encerrada durante a transferência")
+
+
+def fetch_ranges(host, port, filename, ranges, fd, counter, errors):
+    current = None
+    try:
+        with socket.create_connection((host, port)) as sock:
+            decoder = FrameDecoder()
+            capabilities = negotiate_capabilities(sock, decoder)
+            if CAP_RANGE not in capabilities:
+                raise ConnectionError("Servidor não suporta intervalos de bytes")
+            
+            options = {'hash': HASH_NONE}
+            if CAP_SENDFILE in capabilities:
+                options['mode'] = TRANSFER_SENDFILE
+            
+            buffer = memoryview(bytearray(RAW_READ_SIZE))
+            while True:
+                try:
+                    current = ranges.get_nowait()
+                except queue.Empty:
+                    break
+                
+                offset, length = current
+                options.update(offset=offset, length=length)
+                send_message(sock, MSG_FILE, encode_file_request(filename, options))
+                receive_range_into(sock, decoder, fd, offset, length, buffer, counter)
+                current = None
+            
+            send_message(sock, MSG_QUIT)
+    
+    except Exception as e:
+        if current is not None:
+            ranges.put(current)
+        errors.append(str(e))
+
+
+class FileChannel:
+    
+    def __init__(self, stream_id=None):
+        self.stream_id = stream_id
+        self.sink = None
+        self.progress = stream_id is None
+        self.error_code = None
+
+
+class FileSink:
+    
+    def __init__(self, target_path=None, events=None, expect_hash=True):
+        self.target_path = target_path
+        self.expect_hash = expect_hash
+        self.events = queue.Queue() if events is None else events
+        self.lock = threading.Lock()
+        self.file = None
+        self.sha256 = hashlib.sha256()
+        self.accepted = False
+        self.existing = False
+        self.info = None
+        self.received = 0
+        self.file_hash = None
+        self.error_code = None
+        self.done = False
+        self.last_progress = 0.0
+    
+    def handle(self, msg_type, payload):
+        with self.lock:
+            if self.done:
+                return
+            try:
+                self.dispatch(msg_type, payload)
+                self.check_complete()
+            except Exception as e:
+                self.finish(None, f"Erro ao receber arquivo: {e}")
+    
+    def dispatch(self, msg_type, payload):
+        if msg_type == MSG_FILE_ERROR:
+            self.error_code = bytes(payload).decode('utf-8')
+            self.finish(None, f"Erro: {self.error_code}")
+        elif not self.accepted:
+            if msg_type != MSG_FILE_OK:
+                self.finish(None, "Resposta inválida do servidor")
+            else:
+                self.accepted = True
+        elif self.info is None:
+            if msg_type != MSG_FILE_META:
+                self.finish(None, "Metadados não recebidos")
+            else:
+                self.open(*unpack_file_meta(payload))
+        elif msg_type == MSG_FILE_HASH:
+            self.file_hash = bytes(payload)
+        elif msg_type == MSG_FILE_DATA:
+            self.write(payload)
+        else:
+            self.finish(None, "Dados do arquivo não recebidos corretamente")
+    
+    def receive_raw(self, decoder, sock):
+        buffer = memoryview(bytearray(RAW_READ_SIZE))
+        with self.lock:
+            try:
+                while decoder.raw_remaining and self.info is not None and not self.done:
+                    n = decoder.read_raw(sock, buffer)
+                    self.write(buffer[:n])
+                self.check_complete()
+            except Exception as e:
+                self.finish(None, f"Erro ao receber arquivo: {e}")
+            finally:
+                decoder.skip_raw(sock)
+    
+    def open(self, filename, file_size, offset, length):
+        if self.target_path is None:
+            os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+            self.target_path = os.path.join(DOWNLOAD_DIR, filename)
+            file_mode = 'wb'
+        else:
+            file_mode = 'r+b' if os.path.exists(self.target_path) else 'wb'
+        self.existing = file_mode == 'r+b'
+        
+        buffer_size = max(min(length, SINK_BUFFER_SIZE), io.DEFAULT_BUFFER_SIZE)
+        self.file = open(self.target_path, file_mode, buffering=buffer_size)
+        preallocate = not self.existing and offset == 0 and length == file_size > SINK_BUFFER_SIZE
+        if preallocate and hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(self.file.fileno(), 0, file_size)
+            except OSError:
+                pass
+        self.file.seek(offset)
+        self.last_progress = time.monotonic()
+        
+        self.info = {
+            'filename': filename,
+            'path': self.target_path,
+            'file_size': file_size,
+            'offset': offset,
+            'length': length,
+        }
+        self.events.put((EVENT_START, self, dict(self.info)))
+    
+    def write(self, data):
+        self.file.write(data)
+        self.sha256.update(data)
+        self.received += len(data)
+        
+        now = time.monotonic()
+        if now - self.last_progress >= PROGRESS_INTERVAL:
+            self.last_progress = now
+            self.events.put((EVENT_PROGRESS, self, (self.received, self.info['length'])))
+    
+    def check_complete(self):
+        if self.done or self.info is None or self.received < self.info['length']:
+            return
+        if self.expect_hash and self.file_hash is None:
+            return
+        
+        info = self.info
+        if self.existing and info['offset'] + info['length'] == info['file_size']:
+            self.file.truncate(info['file_size'])
+        file_hash, block_size, block_hashes = None, None, None
+        if self.file_hash is not None:
+            file_hash, block_size, block_hashes = unpack_file_hash(self.file_hash)
+        info.update(file_hash=file_hash, block_size=block_size, block_hashes=block_hashes,
+                    range_hash=self.sha256.digest())
+        self.finish(info, None)
+    
+    def finish(self, info, error):
+        self.done = True
+        if self.file is not None:
+            try:
+                self.file.close()
+            except OSError as e:
+                info, error = None, f"Erro ao gravar arquivo: {e}"
+        self.events.put((EVENT_DONE, self, (info, error)))
+    
+    def fail(self, error):
+        with self.lock:
+            if not self.done:
+                self.finish(None, error)
+    
+    def abort(self):
+        with self.lock:
+            if not self.done:
+                self.done = True
+                if self.file is not None:
+                    try:
+                        self.file.close()
+                    except OSError:
+                        pass
+
+
+class DeltaSink(FileSink):
+    
+    def __init__(self, basis_path, target_path, block_size, events=None):
+        super().__init__(target_path, events)
+        self.basis_path = basis_path
+        self.block_size = block_size
+        self.basis = None
+        self.copied = 0
+        self.literal = 0
+    
+    def dispatch(self, msg_type, payload):
+        if msg_type == MSG_DELTA_END:
+            _, file_hash, error = decode_delta_end(payload)
+            if error is not None:
+                self.finish(None, f"Erro: {error}")
+            elif self.info is None:
+                self.finish(None, "Metadados não recebidos")
+            elif self.received != self.info['length']:
+                self.finish(None, "Delta incompleto: arquivo reconstruído com tamanho diferente")
+            else:
+                self.file_hash = file_hash
+        elif self.info is None:
+            if msg_type != MSG_DELTA_META:
+                self.finish(None, "Metadados não recebidos")
+            else:
+                self.open(*unpack_file_meta(payload))
+                self.basis = open(self.basis_path, 'rb')
+        elif msg_type == MSG_DELTA_COPY:
+            self.copy_blocks(*unpack_delta_copy(payload))
+        elif msg_type == MSG_DELTA_DATA:
+            self.literal += len(payload)
+            self.write(payload)
+        else:
+            self.finish(None, "Resposta inválida do servidor")
+    
+    def copy_blocks(self, index, count):
+        self.basis.seek(index * self.block_size)
+        remaining = count * self.block_size
+        while remaining:
+            data = self.basis.read(min(remaining, RAW_READ_SIZE))
+            if not data:
+                break
+            self.write(data)
+            self.copied += len(data)
+            remaining -= len(data)
+    
+    def finish(self, info, error):
+        self.close_basis()
+        if info is not None:
+            info.update(copied=self.copied, literal=self.literal)
+        super().finish(info, error)
+    
+    def abort(self):
+        super().abort()
+        self.close_basis()
+    
+    def close_basis(self):
+        if self.basis is not None:
+            self.basis.close()
+            self.basis = None
 
 
 class ChatClient:
@@ -22,8 +370,14 @@ class ChatClient:
         self.socket = None
         self.connected = False
         self.running = True
-        self.file_message_queue = queue.Queue()
-        self.waiting_for_file = False
+        self.file_channel = FileChannel()
+        self.channels = {}
+        self.channels_lock = threading.Lock()
+        self.next_stream_id = 1
+        self.active_downloads = set()
+        self.decoder = FrameDecoder()
+        self.capabilities = set()
+        self.send_lock = threading.Lock()
         
     def connect(self):
         try:
@@ -36,16 +390,27 @@ class ChatClient:
             self.connected = True
             print("Conectado com sucesso!\n")
             
+            self.negotiate()
+            if CAP_HISTORY in self.capabilities:
+                self.request_history('', -HISTORY_ON_JOIN)
+            
             return True
             
         except Exception as e:
             print(f"Erro ao conectar: {e}")
             return False
     
+    def negotiate(self):
+        self.capabilities = negotiate_capabilities(self.socket, self.decoder, self.handle_message)
+    
+    def send(self, msg_type, payload=b'', codec=None):
+        with self.send_lock:
+            send_message(self.socket, msg_type, payload, codec)
+    
     def disconnect(self):
         if self.connected:
             try:
-                send_message(self.socket, MSG_QUIT)
+                self.send(MSG_QUIT)
             except:
                 pass
             
@@ -60,107 +425,395 @@ class ChatClient:
     
     def send_chat_message(self, message):
         try:
-            send_message(self.socket, MSG_CHAT, message)
+            self.send(MSG_CHAT, message, self.decoder.codec)
             print(f"[Você]: {message}")
         except Exception as e:
             print(f"Erro ao enviar mensagem: {e}")
     
-    def request_file(self, filename):
+    def send_room_command(self, msg_type, room, message=''):
+        if CAP_ROOMS not in self.capabilities:
+            print("O servidor não oferece salas")
+            return
         try:
-            print(f"\nSolicitando arquivo: {filename}")
-            
-            self.waiting_for_file = True
-            while not self.file_message_queue.empty():
-                self.file_message_queue.get()
-            
-            send_message(self.socket, MSG_FILE, filename)
-            
-            success, message = self.receive_file_from_queue()
-            print(message)
+            self.send(msg_type, encode_room_message(room, message), self.decoder.codec)
+            if msg_type == MSG_ROOM:
+                print(f"[{room}] [Você]: {message}")
+        except Exception as e:
+            print(f"Erro ao enviar para a sala: {e}")
+    
+    def request_history(self, channel, since=0):
+        if CAP_HISTORY not in self.capabilities:
+            print("O servidor não oferece histórico")
+            return
+        try:
+            self.send(MSG_HISTORY, encode_history_request(channel, since), self.decoder.codec)
+        except Exception as e:
+            print(f"Erro ao solicitar histórico: {e}")
+    
+    def request_stats(self):
+        if CAP_STATS not in self.capabilities:
+            print("O servidor não oferece estatísticas")
+            return
+        try:
+            self.send(MSG_STATS)
+        except Exception as e:
+            print(f"Erro ao solicitar estatísticas: {e}")
+    
+    def request_file(self, filename, connections=None, range_size=DEFAULT_RANGE_SIZE):
+        if CAP_STREAMS in self.capabilities:
+            with self.channels_lock:
+                if filename in self.active_downloads:
+                    print(f"Download de '{filename}' já está em andamento")
+                    return
+                self.active_downloads.add(filename)
+            channel = self.open_channel()
+            print(f"\nSolicitando arquivo: {filename} (fluxo {channel.stream_id}, em segundo plano)")
+            threading.Thread(target=self.download, args=(channel, filename, connections, range_size),
+                             daemon=True).start()
+            return
+        
+        print(f"\nSolicitando arquivo: {filename}")
+        self.download(self.file_channel, filename, connections, range_size)
+    
+    def open_channel(self):
+        with self.channels_lock:
+            channel = FileChannel(self.next_stream_id)
+            self.channels[channel.stream_id] = channel
+            self.next_stream_id += 1
+        return channel
+    
+    def close_channel(self, channel, filename):
+        with self.channels_lock:
+            self.channels.pop(channel.stream_id, None)
+            self.active_downloads.discard(filename)
+    
+    def download(self, channel, filename, connections, range_size):
+        try:
+            resumable = CAP_RANGE in self.capabilities and CAP_BLOCKS in self.capabilities
+            if connections and resumable:
+                success, message = self.download_parallel(channel, filename, connections, range_size)
+            elif connections:
+                success, message = False, "Servidor não suporta download paralelo"
+            elif resumable:
+                success, message = self.download_resumable(channel, filename)
+            else:
+                success, message = self.receive_file(channel, filename)
+            print(message if channel.progress else f"\n{message}")
             
         except Exception as e:
             print(f"Erro ao solicitar arquivo: {e}")
         finally:
-            self.waiting_for_file = False
+            if channel.stream_id is not None:
+                self.close_channel(channel, filename)
+                self.show_prompt()
+    
+    def send_file_request(self, channel, filename, **extra_options):
+        options = {}
+        if channel.stream_id is not None:
+            options['stream'] = channel.stream_id
+        if CAP_SENDFILE in self.capabilities:
+            options['mode'] = TRANSFER_SENDFILE
+        if CAP_TRAILER in self.capabilities:
+            options['hash'] = HASH_TRAILER
+        options.update(extra_options)
+        
+        self.send(MSG_FILE, encode_file_request(filename, options))
     
-    def receive_file_from_queue(self):
+    def download_resumable(self, channel, filename):
+        os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+        part_path = os.path.join(DOWNLOAD_DIR, os.path.basename(filename) + PARTIAL_SUFFIX)
+        
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset:
+            print(f"Retomando download a partir do byte {offset}")
+        
+        info, error = self.request_range(channel, filename, part_path, offset=offset, blocks=1)
+        
+        if channel.error_code == RANGE_ERROR and offset:
+            os.remove(part_path)
+            return self.download_resumable(channel, filename)
+        if error:
+            return False, error
+        if info['block_hashes'] is None:
+            return False, "Servidor não enviou os hashes por bloco"
+        
+        def fetch(bad_blocks):
+            return self.fetch_blocks(channel, filename, info, bad_blocks)
+        
+        return self.finish_download(part_path, info, fetch)
+    
+    def download_parallel(self, channel, filename, connections, range_size):
+        os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+        part_path = os.path.join(DOWNLOAD_DIR, os.path.basename(filename) + PARTIAL_SUFFIX)
+        resume = os.path.exists(part_path) and os.path.getsize(part_path) > 0
+        
+        info, error = self.request_range(channel, filename, part_path, length=0, blocks=1)
+        if error:
+            return False, error
+        if info['block_hashes'] is None:
+            return False, "Servidor não enviou os hashes por bloco"
+        
+        with open(part_path, 'r+b') as f:
+            f.truncate(info['file_size'])
+            if hasattr(os, 'posix_fallocate') and info['file_size']:
+                os.posix_fallocate(f.fileno(), 0, info['file_size'])
+        
+        if resume:
+            print("Verificando blocos do download parcial...")
+            _, bad_blocks = verify_file_blocks(part_path, info['block_size'], info['block_hashes'])
+        else:
+            bad_blocks = list(range(len(info['block_hashes'])))
+        
+        def fetch(bad_blocks):
+            return self.fetch_blocks_parallel(channel, filename, part_path, info, bad_blocks,
+                                              connections, range_size)
+        
+        start = time.perf_counter()
+        error = fetch(bad_blocks)
+        if error:
+            return False, error
+        
+        elapsed = time.perf_counter() - start
+        fetched = sum(length for _, length in block_ranges(bad_blocks, info['block_size'], info['file_size']))
+        print(f"{fetched} bytes em {elapsed:.2f}s com {connections} conexões "
+              f"({fetched / max(elapsed, 1e-9) / (1024 * 1024):.1f} MB/s)")
+        
+        return self.finish_download(part_path, info, fetch)
+    
+    def fetch_blocks(self, channel, filename, info, bad_blocks):
+        for offset, length in block_ranges(bad_blocks, info['block_size'], info['file_size']):
+            _, error = self.request_range(channel, filename, info['path'],
+                                          offset=offset, length=length, hash=HASH_NONE)
+            if error:
+                return error
+        return None
+    
+    def fetch_blocks_parallel(self, channel, filename, part_path, info, bad_blocks, connections, range_size):
+        ranges = queue.Queue()
+        total = 0
+        for offset, length in block_ranges(bad_blocks, info['block_size'], info['file_size'], range_size):
+            ranges.put((offset, length))
+            total += length
+        
+        counter = ByteCounter()
+        errors = []
+        fd = os.open(part_path, os.O_WRONLY)
         try:
-            msg_type, payload = self.file_message_queue.get(timeout=10)
-            
-            if msg_type == MSG_FILE_ERROR:
-                error_msg = payload.decode('utf-8')
-                return False, f"Erro: {error_msg}"
-            
-            if msg_type != MSG_FILE_OK:
-                return False, "Resposta inválida do servidor"
-            
-            msg_type, metadata = self.file_message_queue.get(timeout=10)
-            if msg_type != MSG_FILE_META:
-                return False, "Metadados não recebidos"
-            
-            filename_size = struct.unpack('!I', metadata[:4])[0]
-            filename = metadata[4:4+filename_size].decode('utf-8')
-            file_size = struct.unpack('!Q', metadata[4+filename_size:])[0]
+            workers = [threading.Thread(target=fetch_ranges,
+                                        args=(self.server_host, self.server_port, filename,
+                                              ranges, fd, counter, errors),
+                                        daemon=True)
+                       for _ in range(max(1, min(connections, ranges.qsize())))]
+            for worker in workers:
+                worker.start()
             
-            print(f"Recebendo arquivo: {filename} ({file_size} bytes)")
-            
-            msg_type, file_hash_received = self.file_message_queue.get(timeout=10)
-            if msg_type != MSG_FILE_HASH:
-                return False, "Hash não recebido"
-            
-            os.makedirs(DOWNLOAD_DIR, exist_ok=True)
-            filepath = os.path.join(DOWNLOAD_DIR, filename)
-            
-            bytes_received = 0
-            sha256 = hashlib.sha256()
-            
-            with open(filepath, 'wb') as f:
-                while bytes_received < file_size:
-                    msg_type, chunk = self.file_message_queue.get(timeout=10)
-                    if msg_type != MSG_FILE_DATA:
-                        return False, "Dados do arquivo não recebidos corretamente"
-                    
-                    f.write(chunk)
-                    sha256.update(chunk)
-                    bytes_received += len(chunk)
-                    
-                    progress = (bytes_received / file_size) * 100
-                    print(f"\rProgresso: {progress:.1f}%", end='', flush=True)
-            
-            print()
-            
-            file_hash_calculated = sha256.digest()
-            
-            if file_hash_calculated == file_hash_received:
-                return True, f"Arquivo '{filename}' recebido com sucesso. Integridade verificada"
-            else:
-                return False, f"Arquivo '{filename}' recebido, mas a verificação de integridade FALHOU"
+            for worker in workers:
+                while worker.is_alive():
+                    worker.join(0.2)
+                    if total and channel.progress:
+                        self.print_progress(counter.value, total)
+            if channel.progress:
+                print()
+        finally:
+            os.close(fd)
+        
+        if not ranges.empty():
+            return f"Erro no download paralelo: {errors[0] if errors else 'intervalos pendentes'}"
+        return None
+    
+    def finish_download(self, part_path, info, fetch_blocks):
+        block_size = info['block_size']
+        for attempt in range(MAX_BLOCK_RETRIES + 1):
+            file_hash, bad_blocks = verify_file_blocks(part_path, block_size, info['block_hashes'])
+            if not bad_blocks:
+                break
+            if attempt == MAX_BLOCK_RETRIES:
+                return False, f"{len(bad_blocks)} bloco(s) continuam corrompidos, download parcial mantido em '{part_path}'"
             
-        except queue.Empty:
-            return False, "Timeout: servidor não respondeu a tempo"
+            print(f"{len(bad_blocks)} bloco(s) com hash divergente, buscando novamente...")
+            error = fetch_blocks(bad_blocks)
+            if error:
+                return False, error
+        
+        if file_hash != info['file_hash']:
+            return False, f"Arquivo '{info['filename']}' recebido, mas a verificação de integridade FALHOU"
+        
+        os.replace(part_path, os.path.join(DOWNLOAD_DIR, info['filename']))
+        return True, f"Arquivo '{info['filename']}' recebido com sucesso. Integridade verificada"
+    
+    def sync_file(self, filename):
+        basis_path = os.path.join(DOWNLOAD_DIR, os.path.basename(filename))
+        if CAP_DELTA not in self.capabilities or not os.path.isfile(basis_path):
+            self.request_file(filename)
+            return
+        
+        print(f"\nSincronizando arquivo: {filename}")
+        try:
+            success, message = self.receive_delta(self.file_channel, filename, basis_path)
+            print(message)
         except Exception as e:
-            return False, f"Erro ao receber arquivo: {e}"
+            print(f"Erro ao sincronizar arquivo: {e}")
+    
+    def receive_delta(self, channel, filename, basis_path):
+        basis_size = os.path.getsize(basis_path)
+        block_size = choose_block_size(basis_size)
+        signatures = file_signatures(basis_path, block_size)
+        temp_path = basis_path + DELTA_SUFFIX
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        
+        sink = channel.sink = DeltaSink(basis_path, temp_path, block_size)
+        try:
+            self.send(MSG_DELTA_REQUEST,
+                      encode_delta_request(filename, basis_size, block_size, signatures))
+            info, error = self.wait_range(sink, channel.progress)
+        finally:
+            sink.abort()
+            channel.sink = None
+        
+        if error is None and info['range_hash'] != info['file_hash']:
+            error = f"Arquivo '{info['filename']}' sincronizado, mas a verificação de integridade FALHOU"
+        if error:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False, error
+        
+        os.replace(temp_path, basis_path)
+        return True, (f"Arquivo '{info['filename']}' sincronizado com sucesso: {info['copied']} bytes reaproveitados, "
+                      f"{info['literal']} bytes recebidos. Integridade verificada")
+    
+    def receive_file(self, channel, filename):
+        info, error = self.request_range(channel, filename)
+        if error:
+            return False, error
+        
+        if info['range_hash'] == info['file_hash']:
+            return True, f"Arquivo '{info['filename']}' recebido com sucesso. Integridade verificada"
+        else:
+            return False, f"Arquivo '{info['filename']}' recebido, mas a verificação de integridade FALHOU"
+    
+    def request_range(self, channel, filename, target_path=None, **extra_options):
+        sink = channel.sink = FileSink(target_path, expect_hash=extra_options.get('hash') != HASH_NONE)
+        try:
+            self.send_file_request(channel, filename, **extra_options)
+            return self.wait_range(sink, channel.progress)
+        finally:
+            sink.abort()
+            channel.sink = None
+            channel.error_code = sink.error_code
+    
+    def wait_range(self, sink, show_progress):
+        shown = False
+        try:
+            while True:
+                event, _, data = sink.events.get(timeout=FILE_REPLY_TIMEOUT)
+                
+                if event == EVENT_START:
+                    if data['length'] == data['file_size']:
+                        print(f"Recebendo arquivo: {data['filename']} ({data['file_size']} bytes)")
+                    elif data['length']:
+                        print(f"Recebendo arquivo: {data['filename']} (bytes {data['offset']}-"
+                              f"{data['offset'] + data['length']} de {data['file_size']})")
+                
+                elif event == EVENT_PROGRESS:
+                    if show_progress and data[1]:
+                        self.print_progress(*data)
+                        shown = True
+                
+                elif event == EVENT_DONE:
+                    info, error = data
+                    if shown and info is not None:
+                        self.print_progress(info['length'], info['length'])
+                    if shown:
+                        print()
+                    return info, error
+        
+        except queue.Empty:
+            return None, "Timeout: servidor não respondeu a tempo"
+    
+    def print_progress(self, bytes_received, file_size):
+        progress = (bytes_received / file_size) * 100
+        print(f"\rProgresso: {progress:.1f}%", end='', flush=True)
+    
+    def handle_message(self, msg_type, payload):
+        if msg_type == MSG_FILE_RAW:
+            sink = self.file_channel.sink
+            if CAP_STREAMS in self.capabilities:
+                stream_id = self.decoder.read_stream_id(self.socket)
+                with self.channels_lock:
+                    channel = self.channels.get(stream_id)
+                sink = channel.sink if channel is not None else None
+            if sink is not None:
+                sink.receive_raw(self.decoder, self.socket)
+            else:
+                self.decoder.skip_raw(self.socket)
+        
+        elif msg_type in FILE_REPLY_TYPES and CAP_STREAMS in self.capabilities:
+            stream_id, payload = decode_stream_payload(payload)
+            with self.channels_lock:
+                channel = self.channels.get(stream_id)
+            sink = channel.sink if channel is not None else None
+            if sink is not None:
+                sink.handle(msg_type, payload)
+        
+        elif msg_type in FILE_REPLY_TYPES or msg_type in DELTA_REPLY_TYPES:
+            sink = self.file_channel.sink
+            if sink is not None:
+                sink.handle(msg_type, payload)
+        
+        elif msg_type == MSG_CHAT:
+            message = bytes(payload).decode('utf-8')
+            print(f"\n{message}")
+            self.show_prompt()
+        
+        elif msg_type == MSG_ROOM:
+            room, message = decode_room_message(payload)
+            print(f"\n[{room}] {message}")
+            self.show_prompt()
+        
+        elif msg_type == MSG_HISTORY:
+            _, channel, message = decode_history_entry(payload)
+            print(f"\n[{channel}] {message}" if channel else f"\n{message}")
+            self.show_prompt()
+        
+        elif msg_type == MSG_HISTORY_END:
+            channel, first, next_seq, more = decode_history_end(payload)
+            name = f"da sala '{channel}'" if channel else "do chat geral"
+            if next_seq > first:
+                print(f"\n[Sistema] Histórico {name}: mensagens #{first} a #{next_seq - 1} guardadas")
+            else:
+                print(f"\n[Sistema] Histórico {name}: nenhuma mensagem guardada")
+            if more:
+                print(f"[Sistema] Há mais mensagens: historico {channel or '-'} {next_seq}")
+            self.show_prompt()
+        
+        elif msg_type == MSG_JOIN:
+            room, members = decode_room_message(payload)
+            print(f"\n[Sistema] Você entrou na sala '{room}' ({members} membros)")
+            if CAP_HISTORY in self.capabilities:
+                self.request_history(room, -HISTORY_ON_JOIN)
+            self.show_prompt()
+        
+        elif msg_type == MSG_LEAVE:
+            room, _ = decode_room_message(payload)
+            print(f"\n[Sistema] Você saiu da sala '{room}'")
+            self.show_prompt()
+        
+        elif msg_type == MSG_STATS:
+            print(f"\n{bytes(payload).decode('utf-8')}", end='')
+            self.show_prompt()
+        
     
     def receive_messages_thread(self):
         while self.running and self.connected:
             try:
-                msg_type, payload = receive_message(self.socket)
+                for msg_type, payload in self.decoder.frames():
+                    self.handle_message(msg_type, payload)
                 
-                if msg_type is None:
+                if self.decoder.recv_into(self.socket) == 0:
                     print("\n[Sistema] Conexão encerrada pelo servidor")
                     self.connected = False
                     break
-                
-                if self.waiting_for_file and msg_type in [MSG_FILE_OK, MSG_FILE_ERROR, MSG_FILE_META, MSG_FILE_DATA, MSG_FILE_HASH]:
-                    self.file_message_queue.put((msg_type, payload))
-                
-                elif msg_type == MSG_CHAT:
-                    message = payload.decode('utf-8')
-                    print(f"\n{message}")
-                    self.show_prompt()
-                
-                elif msg_type in [MSG_FILE_OK, MSG_FILE_ERROR, MSG_FILE_META, MSG_FILE_DATA, MSG_FILE_HASH]:
-                    pass
                     
             except Exception as e:
                 if self.running:
@@ -170,7 +823,7 @@ class ChatClient:
         self.running = False
     
     def show_prompt(self):
-        print("\nComandos: [chat] [arquivo] [sair]", end='\n> ', flush=True)
+        print("\nComandos: [chat] [entrar] [deixar] [sala] [historico] [arquivo] [sincronizar] [paralelo] [stats] [sair]", end='\n> ', flush=True)
     
     def run(self):
         os.makedirs(DOWNLOAD_DIR, exist_ok=True)
@@ -184,7 +837,16 @@ class ChatClient:
         print("="*60)
         print("COMANDOS DISPONÍVEIS:")
         print("  chat <mensagem>    - Envia mensagem para o servidor")
+        print("  entrar <sala>      - Entra em uma sala de chat")
+        print("  deixar <sala>      - Sai de uma sala de chat")
+        print("  sala <sala> <msg>  - Envia mensagem aos membros da sala")
+        print("  historico [sala|-] [desde]")
+        print("                     - Mostra mensagens guardadas a partir do número 'desde'")
         print("  arquivo <nome>     - Solicita arquivo do servidor")
+        print("  sincronizar <nome> - Atualiza o arquivo já baixado recebendo só as diferenças")
+        print("  paralelo <nome> [conexões] [intervalo_MB]")
+        print("                     - Baixa o arquivo por várias conexões simultâneas")
+        print("  stats              - Mostra as métricas do servidor")
         print("  sair               - Desconecta do servidor")
         print("="*60)
         
@@ -210,15 +872,62 @@ class ChatClient:
                     else:
                         self.send_chat_message(parts[1])
                         
+                elif cmd == 'entrar' or cmd == 'join':
+                    if len(parts) < 2:
+                        print("Uso: entrar <sala>")
+                    else:
+                        self.send_room_command(MSG_JOIN, parts[1].strip())
+                
+                elif cmd == 'deixar' or cmd == 'leave':
+                    if len(parts) < 2:
+                        print("Uso: deixar <sala>")
+                    else:
+                        self.send_room_command(MSG_LEAVE, parts[1].strip())
+                
+                elif cmd == 'sala' or cmd == 'room':
+                    args = parts[1].split(maxsplit=1) if len(parts) > 1 else []
+                    if len(args) < 2:
+                        print("Uso: sala <sala> <mensagem>")
+                    else:
+                        self.send_room_command(MSG_ROOM, args[0], args[1])
+                
+                elif cmd == 'historico' or cmd == 'history':
+                    args = parts[1].split() if len(parts) > 1 else []
+                    channel = args[0] if args and args[0] != '-' else ''
+                    try:
+                        since = int(args[1]) if len(args) > 1 else -HISTORY_ON_JOIN
+                    except ValueError:
+                        print("Uso: historico [sala|-] [desde]")
+                    else:
+                        self.request_history(channel, since)
+                
                 elif cmd == 'arquivo' or cmd == 'file':
                     if len(parts) < 2:
                         print("Uso: arquivo <nome_do_arquivo>")
                     else:
                         self.request_file(parts[1])
+                
+                elif cmd == 'sincronizar' or cmd == 'sync':
+                    if len(parts) < 2:
+                        print("Uso: sincronizar <nome_do_arquivo>")
+                    else:
+                        self.sync_file(parts[1])
+                
+                elif cmd == 'paralelo' or cmd == 'parallel':
+                    args = parts[1].split() if len(parts) > 1 else []
+                    if not args or len(args) > 3:
+                        print("Uso: paralelo <nome_do_arquivo> [conexões] [intervalo_MB]")
+                    else:
+                        connections = int(args[1]) if len(args) > 1 else DEFAULT_PARALLEL_CONNECTIONS
+                        range_size = int(args[2]) * 1024 * 1024 if len(args) > 2 else DEFAULT_RANGE_SIZE
+                        self.request_file(args[0], connections, range_size)
+                
+                elif cmd == 'stats':
+                    self.request_stats()
                         
                 else:
                     print(f"Comando desconhecido: '{cmd}'")
-                    print("Use: chat, arquivo, ou sair")
+                    print("Use: chat, entrar, deixar, sala, historico, arquivo, sincronizar, paralelo, stats ou sair")
                     
             except EOFError:
                 print("\nDesconectando...")
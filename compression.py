@@ -0,0 +1,88 @@
+import lzma
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODEC_ZSTD = 'zstd'
+CODEC_ZLIB = 'zlib'
+CODEC_LZMA = 'lzma'
+CODEC_PREFERENCE = (CODEC_ZSTD, CODEC_ZLIB, CODEC_LZMA)
+
+ZLIB_LEVEL = 6
+LZMA_PRESET = 1
+ZSTD_LEVEL = 3
+
+MIN_COMPRESS_SIZE = 256
+COMPRESS_CHUNK_SIZE = 64 * 1024
+INCOMPRESSIBLE_BACKOFF = 16
+
+INCOMPRESSIBLE_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic',
+    '.mp3', '.mp4', '.mkv', '.avi', '.mov', '.ogg', '.flac', '.webm',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.7z', '.rar', '.lz4',
+    '.pdf', '.docx', '.xlsx', '.pptx', '.jar', '.apk',
+}
+
+
+def available_codecs():
+    codecs = {CODEC_ZLIB, CODEC_LZMA}
+    if zstandard is not None:
+        codecs.add(CODEC_ZSTD)
+    return codecs
+
+
+def choose_codec(offered):
+    for codec in CODEC_PREFERENCE:
+        if codec in offered and codec in available_codecs():
+            return codec
+    return None
+
+
+def is_compressible(filename):
+    return os.path.splitext(filename)[1].lower() not in INCOMPRESSIBLE_EXTENSIONS
+
+
+def compress(codec, data):
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, ZLIB_LEVEL)
+    if codec == CODEC_LZMA:
+        return lzma.compress(data, preset=LZMA_PRESET)
+    if codec == CODEC_ZSTD and zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    raise ValueError(f"Codec desconhecido: {codec}")
+
+
+def decompress(codec, data, max_size):
+    if codec == CODEC_ZLIB:
+        decompressor = zlib.decompressobj()
+        result = decompressor.decompress(data, max_size)
+        if decompressor.unconsumed_tail or not decompressor.eof:
+            raise ValueError(f"Payload descomprimido excede {max_size} bytes ou está truncado")
+        return result
+
+    if codec == CODEC_LZMA:
+        decompressor = lzma.LZMADecompressor()
+        result = decompressor.decompress(data, max_size)
+        if not decompressor.eof:
+            raise ValueError(f"Payload descomprimido excede {max_size} bytes ou está truncado")
+        return result
+
+    if codec == CODEC_ZSTD and zstandard is not None:
+        chunks = []
+        total = 0
+        with zstandard.ZstdDecompressor().stream_reader(bytes(data)) as reader:
+            while True:
+                chunk = reader.read(COMPRESS_CHUNK_SIZE)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > max_size:
+                    raise ValueError(f"Payload descomprimido excede {max_size} bytes")
+                chunks.append(chunk)
+        return b''.join(chunks)
+
+    raise ValueError(f"Codec desconhecido: {codec}")
@@ -0,0 +1,231 @@
+import hashlib
+import mmap
+import os
+import struct
+import zlib
+
+from protocol import (
+    MSG_DELTA_META, MSG_DELTA_COPY, MSG_DELTA_DATA, MSG_DELTA_END,
+    Message, serialize_frame, file_codec, pack_file_meta, file_hash_payload, encode_delta_end
+)
+
+MIN_BLOCK_SIZE = 2 * 1024
+MAX_BLOCK_SIZE = 16 * 1024 * 1024
+MAX_BLOCKS = 256 * 1024
+STRONG_SIZE = 16
+SIGNATURE = struct.Struct('!I16s')
+COPY = struct.Struct('!QI')
+ADLER_MOD = 65521
+MAX_PROBES = 8
+MAX_ROLL_BACKOFF = 64
+LITERAL_CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 1024 * 1024
+
+
+def choose_block_size(file_size):
+    block_size = MIN_BLOCK_SIZE
+    while block_size < MAX_BLOCK_SIZE and (block_size * block_size < file_size or
+                                           file_size // block_size >= MAX_BLOCKS):
+        block_size *= 2
+    return block_size
+
+
+def strong_hash(data):
+    return hashlib.sha256(data).digest()[:STRONG_SIZE]
+
+
+def file_signatures(filepath, block_size):
+    signatures = []
+    with open(filepath, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            signatures.append(SIGNATURE.pack(zlib.adler32(block), strong_hash(block)))
+    return b''.join(signatures)
+
+
+def unpack_signatures(data, basis_size, block_size):
+    if not MIN_BLOCK_SIZE <= block_size <= MAX_BLOCK_SIZE or block_size & (block_size - 1) or basis_size < 0:
+        raise ValueError("Tamanho de bloco inválido")
+    if len(data) != SIGNATURE.size * -(-basis_size // block_size):
+        raise ValueError("Assinaturas não correspondem ao tamanho do arquivo")
+    return list(SIGNATURE.iter_unpack(data))
+
+
+def pack_delta_copy(index, count):
+    return COPY.pack(index, count)
+
+
+def unpack_delta_copy(payload):
+    return COPY.unpack(payload)
+
+
+class DeltaEncoder:
+
+    def __init__(self, signatures, block_size, basis_size):
+        self.block_size = block_size
+        self.table = {}
+        for index, (weak, strong) in enumerate(signatures):
+            self.table.setdefault(weak, []).append((index, strong))
+        self.last_index = len(signatures) - 1
+        self.tail_size = basis_size - self.last_index * block_size
+        self.roll_backoff = 0
+        self.skip_rolls = 0
+
+    def block_length(self, index):
+        return self.tail_size if index == self.last_index else self.block_size
+
+    def match(self, window, weak):
+        candidates = self.table.get(weak)
+        if not candidates:
+            return None
+        strong = None
+        for index, candidate in candidates:
+            if self.block_length(index) != len(window):
+                continue
+            if strong is None:
+                strong = strong_hash(window)
+            if strong == candidate:
+                return index
+        return None
+
+    def probe(self, data, pos):
+        for step in range(MAX_PROBES + 1):
+            start = pos + step * self.block_size
+            if start >= len(data):
+                break
+            window = data[start:start + self.block_size]
+            index = self.match(window, zlib.adler32(window))
+            if index is not None:
+                return start, index
+        return None, None
+
+    def roll(self, data, pos):
+        block = self.block_size
+        last = min(pos + block, len(data) - block + 1)
+        if last <= pos + 1:
+            return None, None
+
+        span = data[pos:last + block - 1]
+        weak = zlib.adler32(span[:block])
+        a, b = weak & 0xffff, weak >> 16
+        table = self.table
+        for offset in range(1, last - pos):
+            out = span[offset - 1]
+            a = (a - out + span[offset + block - 1]) % ADLER_MOD
+            b = (b - block * out + a - 1) % ADLER_MOD
+            weak = b << 16 | a
+            if weak in table:
+                index = self.match(span[offset:offset + block], weak)
+                if index is not None:
+                    return pos + offset, index
+        return None, None
+
+    def find(self, data, pos):
+        start, index = self.probe(data, pos)
+        if index is not None:
+            return start, index
+        if self.skip_rolls:
+            self.skip_rolls -= 1
+            return None, None
+
+        start, index = self.roll(data, pos)
+        if index is None:
+            self.roll_backoff = min(max(1, self.roll_backoff * 2), MAX_ROLL_BACKOFF)
+            self.skip_rolls = self.roll_backoff
+        else:
+            self.roll_backoff = 0
+        return start, index
+
+    def instructions(self, data):
+        size = len(data)
+        pos = 0
+        literal_start = 0
+        copy_index = copy_count = 0
+
+        while pos < size:
+            start, index = self.find(data, pos)
+            if index is None:
+                pos = min(pos + self.block_size, size)
+                if pos < size:
+                    continue
+                start = size
+
+            if copy_count and start > literal_start:
+                yield MSG_DELTA_COPY, pack_delta_copy(copy_index, copy_count)
+                copy_count = 0
+            for chunk_start in range(literal_start, start, LITERAL_CHUNK_SIZE):
+                yield MSG_DELTA_DATA, data[chunk_start:min(chunk_start + LITERAL_CHUNK_SIZE, start)]
+            if index is None:
+                break
+
+            if copy_count and copy_index + copy_count == index:
+                copy_count += 1
+            else:
+                if copy_count:
+                    yield MSG_DELTA_COPY, pack_delta_copy(copy_index, copy_count)
+                copy_index, copy_count = index, 1
+            pos = literal_start = start + self.block_length(index)
+
+        if copy_count:
+            yield MSG_DELTA_COPY, pack_delta_copy(copy_index, copy_count)
+
+
+class DeltaTransfer:
+
+    def __init__(self, filepath, signatures, block_size, basis_size, hash_cache=None, codec=None):
+        self.filepath = filepath
+        self.filename = os.path.basename(filepath)
+        self.signatures = signatures
+        self.block_size = block_size
+        self.basis_size = basis_size
+        self.hash_cache = hash_cache
+        self.codec = codec
+        self.error = None
+        self.literal_bytes = 0
+        self.pending = self.frames()
+
+    def end_frame(self, file_hash=None, error=None):
+        self.error = error
+        return Message(MSG_DELTA_END, encode_delta_end(self.filename, file_hash, error)).serialize()
+
+    def frames(self):
+        if not os.path.isfile(self.filepath):
+            yield self.end_frame(error="Arquivo não encontrado")
+            return
+
+        try:
+            file_size = os.path.getsize(self.filepath)
+            codec = file_codec(self.filepath, self.codec)
+            yield Message(MSG_DELTA_META, pack_file_meta(self.filename, file_size)).serialize()
+
+            if file_size:
+                encoder = DeltaEncoder(self.signatures, self.block_size, self.basis_size)
+                with open(self.filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    for msg_type, payload in encoder.instructions(data):
+                        if msg_type == MSG_DELTA_DATA:
+                            self.literal_bytes += len(payload)
+                            yield serialize_frame(msg_type, payload, codec)
+                        else:
+                            yield Message(msg_type, payload).serialize()
+
+            file_hash = file_hash_payload(self.filepath, file_size, self.hash_cache)
+        except OSError as e:
+            yield self.end_frame(error=f"Erro ao ler arquivo: {e}")
+            return
+
+        yield self.end_frame(file_hash)
+
+    def next_frames(self, max_bytes=BATCH_SIZE):
+        batch = []
+        size = 0
+        for frame in self.pending:
+            batch.append(frame)
+            size += len(frame)
+            if size >= max_bytes:
+                break
+        return batch
+
+    def close(self):
+        self.pending.close()
@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from protocol import HASH_SIZE, calculate_file_hash, calculate_block_hashes
+
+DEFAULT_MAX_ENTRIES = 1024
+INDEX_FILENAME = '.hash_index.json'
+INDEX_FLUSH_INTERVAL = 5.0
+
+
+def file_key(st):
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class FileHashCache:
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, index_path=None, flush_interval=INDEX_FLUSH_INTERVAL):
+        self.max_entries = max_entries
+        self.index_path = index_path
+        self.flush_interval = flush_interval
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.dirty = False
+        self.stopped = threading.Event()
+        self.flusher = None
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+        if index_path:
+            self.load()
+            self.flusher = threading.Thread(target=self.flush_loop, daemon=True)
+            self.flusher.start()
+
+    def get(self, filepath):
+        path = os.path.abspath(filepath)
+        key = file_key(os.stat(path))
+
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None:
+                if entry[0] == key:
+                    self.entries.move_to_end(path)
+                    self.counters['hits'] += 1
+                    return entry[1]
+                del self.entries[path]
+                self.counters['invalidations'] += 1
+            self.counters['misses'] += 1
+
+        digest = calculate_file_hash(path)
+
+        if file_key(os.stat(path)) == key:
+            self.put(path, key, digest)
+        return digest
+
+    def get_blocks(self, filepath, block_size):
+        path = os.path.abspath(filepath)
+        key = file_key(os.stat(path))
+
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None:
+                if entry[0] == key and entry[2] is not None and entry[2][0] == block_size:
+                    self.entries.move_to_end(path)
+                    self.counters['hits'] += 1
+                    return entry[1], entry[2][1]
+                if entry[0] != key:
+                    del self.entries[path]
+                    self.counters['invalidations'] += 1
+            self.counters['misses'] += 1
+
+        digest, block_hashes = calculate_block_hashes(path, block_size)
+
+        if file_key(os.stat(path)) == key:
+            self.put(path, key, digest, (block_size, block_hashes))
+        return digest, block_hashes
+
+    def peek(self, filepath):
+        path = os.path.abspath(filepath)
+        key = file_key(os.stat(path))
+
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == key:
+                self.entries.move_to_end(path)
+                self.counters['hits'] += 1
+                return entry[1]
+            self.counters['misses'] += 1
+            return None
+
+    def update(self, filepath, file_stat, digest):
+        path = os.path.abspath(filepath)
+        key = file_key(file_stat)
+        if file_key(os.stat(path)) == key:
+            self.put(path, key, digest)
+
+    def put(self, path, key, digest, blocks=None):
+        with self.lock:
+            entry = self.entries.get(path)
+            if blocks is None and entry is not None and entry[0] == key:
+                blocks = entry[2]
+            self.entries[path] = (key, digest, blocks)
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters['evictions'] += 1
+            self.dirty = True
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+            counters['entries'] = len(self.entries)
+            return counters
+
+    def load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        for path, (dev, ino, size, mtime_ns, digest, *blocks) in data.items():
+            try:
+                current = file_key(os.stat(path))
+            except OSError:
+                continue
+            key = (dev, ino, size, mtime_ns)
+            if current == key:
+                if blocks:
+                    block_size, hashes = blocks
+                    hashes = bytes.fromhex(hashes)
+                    blocks = (block_size, [hashes[i:i + HASH_SIZE] for i in range(0, len(hashes), HASH_SIZE)])
+                self.entries[path] = (key, bytes.fromhex(digest), blocks or None)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def flush_loop(self):
+        while not self.stopped.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                entries = list(self.entries.items())
+                self.dirty = False
+            if not self.save(entries):
+                with self.lock:
+                    self.dirty = True
+
+    def close(self):
+        self.stopped.set()
+        if self.index_path:
+            self.flush()
+
+    def save(self, entries):
+        data = {}
+        for path, (key, digest, blocks) in entries:
+            data[path] = [*key, digest.hex()]
+            if blocks is not None:
+                data[path] += [blocks[0], b''.join(blocks[1]).hex()]
+        tmp_path = self.index_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.index_path)
+            return True
+        except OSError as e:
+            print(f"[Cache] Erro ao gravar índice de hashes: {e}")
+            return False
@@ -0,0 +1,109 @@
+import threading
+from collections import OrderedDict
+
+from protocol import MSG_HISTORY, Message, encode_history_entry
+
+DEFAULT_MAX_MESSAGES = 1000
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_MAX_CHANNELS = 1024
+PAGE_SIZE = 500
+PAGE_BYTES = 256 * 1024
+GLOBAL_CHANNEL = ''
+
+
+class HistoryBuffer:
+
+    def __init__(self, max_messages=DEFAULT_MAX_MESSAGES, max_bytes=DEFAULT_MAX_BYTES, start=1):
+        self.frames = [None] * max_messages
+        self.max_bytes = max_bytes
+        self.first = start
+        self.next = start
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.next - self.first
+
+    def evict_oldest(self):
+        index = self.first % len(self.frames)
+        self.bytes -= len(self.frames[index])
+        self.frames[index] = None
+        self.first += 1
+
+    def append(self, channel, text):
+        with self.lock:
+            seq = self.next
+            frame = Message(MSG_HISTORY, encode_history_entry(seq, channel, text)).serialize()
+            while self.next > self.first and (self.next - self.first >= len(self.frames)
+                                              or self.bytes + len(frame) > self.max_bytes):
+                self.evict_oldest()
+            if len(frame) > self.max_bytes:
+                self.first = self.next = seq + 1
+                return frame
+            self.frames[seq % len(self.frames)] = frame
+            self.bytes += len(frame)
+            self.next = seq + 1
+            return frame
+
+    def page(self, since, limit=PAGE_SIZE, max_bytes=PAGE_BYTES):
+        with self.lock:
+            if since < 0:
+                since = self.next + since
+            start = min(max(since, self.first), self.next)
+            frames = []
+            size = 0
+            seq = start
+            while seq < self.next and len(frames) < limit:
+                frame = self.frames[seq % len(self.frames)]
+                if frames and size + len(frame) > max_bytes:
+                    break
+                frames.append(frame)
+                size += len(frame)
+                seq += 1
+            return frames, self.first, seq, seq < self.next
+
+
+class HistoryStore:
+
+    def __init__(self, max_messages=DEFAULT_MAX_MESSAGES, max_bytes=DEFAULT_MAX_BYTES,
+                 max_channels=DEFAULT_MAX_CHANNELS):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_channels = max_channels
+        self.global_buffer = HistoryBuffer(max_messages, max_bytes)
+        self.channels = OrderedDict()
+        self.floor = 1
+        self.lock = threading.Lock()
+
+    def buffer(self, channel, create=False):
+        if channel == GLOBAL_CHANNEL:
+            return self.global_buffer
+        with self.lock:
+            buffer = self.channels.get(channel)
+            if buffer is None and create:
+                buffer = self.channels[channel] = HistoryBuffer(self.max_messages, self.max_bytes, self.floor)
+                while len(self.channels) > self.max_channels:
+                    _, evicted = self.channels.popitem(last=False)
+                    self.floor = max(self.floor, evicted.next)
+            if buffer is not None and create:
+                self.channels.move_to_end(channel)
+            return buffer
+
+    def record(self, channel, text):
+        return self.buffer(channel, create=True).append(channel, text)
+
+    def page(self, channel, since, limit=PAGE_SIZE, max_bytes=PAGE_BYTES):
+        buffer = self.buffer(channel)
+        if buffer is None:
+            with self.lock:
+                return [], self.floor, self.floor, False
+        return buffer.page(since, limit, max_bytes)
+
+    def stats(self):
+        with self.lock:
+            buffers = [self.global_buffer] + list(self.channels.values())
+        return {
+            'channels': len(buffers),
+            'messages': sum(len(buffer) for buffer in buffers),
+            'bytes': sum(buffer.bytes for buffer in buffers),
+        }
@@ -0,0 +1,279 @@
+import os
+import selectors
+import threading
+import time
+from collections import deque
+
+from server import (
+    MAX_REQUEST_SIZE, RECV_SIZE, REQUEST_TIMEOUT, OUTPUT_BUFFER_SIZE, HTTPRequestHandler
+)
+from workers import SHUTDOWN_TIMEOUT
+
+IOV_MAX = 64
+ACCEPT_BATCH = 128
+SWEEP_INTERVAL = 1.0
+
+
+class HTTPConnection(HTTPRequestHandler):
+
+    def __init__(self, loop, client_socket, client_address):
+        self.loop = loop
+        self.socket = client_socket
+        self.address = client_address
+        self.root_dir = loop.root_dir
+        self.cache = loop.cache
+        self.metrics = loop.metrics
+        self.shutdown = loop.shutdown
+        self.keepalive_timeout = loop.keepalive_timeout
+        self.max_requests = loop.max_requests
+        self.buffer = bytearray()
+        self.output = deque()
+        self.output_size = 0
+        self.keep_alive = True
+        self.handled = 0
+        self.body_remaining = 0
+        self.read_closed = False
+        self.closing = False
+        self.closed = False
+        self.events = selectors.EVENT_READ
+        self.last_activity = time.monotonic()
+        self.request_started = time.perf_counter()
+
+    def queue(self, data):
+        if data:
+            self.output.append(memoryview(data))
+            self.output_size += len(data)
+
+    def send_file_data(self, f, offset, count):
+        if count <= 0:
+            return
+        self.output.append([os.dup(f.fileno()), offset, count])
+        self.output_size += count
+
+    def discard_body(self, remaining):
+        self.body_remaining = remaining
+        self.skip_body()
+
+    def skip_body(self):
+        consumed = min(self.body_remaining, len(self.buffer))
+        del self.buffer[:consumed]
+        self.body_remaining -= consumed
+
+    def on_readable(self):
+        try:
+            chunk = self.socket.recv(RECV_SIZE)
+        except BlockingIOError:
+            return
+        if chunk:
+            self.buffer += chunk
+            self.metrics.bytes_received.inc(amount=len(chunk))
+        else:
+            self.read_closed = True
+        self.last_activity = time.monotonic()
+        self.pump()
+
+    def next_request(self):
+        if self.body_remaining:
+            self.skip_body()
+            if self.body_remaining:
+                if self.read_closed:
+                    self.closing = True
+                return None
+
+        end = self.buffer.find(b'\r\n\r\n')
+        if end != -1:
+            request = bytes(self.buffer[:end + 4])
+            del self.buffer[:end + 4]
+            return request
+        if len(self.buffer) >= MAX_REQUEST_SIZE:
+            raise ValueError('cabeçalho da requisição excede o limite')
+        if self.read_closed:
+            self.closing = True
+            if self.buffer:
+                request = bytes(self.buffer)
+                self.buffer.clear()
+                return request
+        return None
+
+    def process(self):
+        while not self.closing and self.output_size < OUTPUT_BUFFER_SIZE:
+            mark = len(self.output)
+            try:
+                request_data = self.next_request()
+                if request_data is None:
+                    return
+                self.handled += 1
+                self.handle_request(request_data, self.handled)
+            except ValueError as err:
+                self.keep_alive = False
+                body = f"Bad request: {err}".encode('utf-8')
+                self.send_response(400, body, {'Content-Type': 'text/plain; charset=utf-8'})
+            except Exception as err:
+                print(f"[Erro] {self.address}: {err}")
+                self.discard_output(mark)
+                self.keep_alive = False
+                body = b'Internal server error'
+                self.send_response(500, body, {'Content-Type': 'text/plain; charset=utf-8'})
+            if not self.keep_alive:
+                self.closing = True
+
+    def discard_output(self, mark):
+        while len(self.output) > mark:
+            item = self.output.pop()
+            if isinstance(item, list):
+                os.close(item[0])
+                self.output_size -= item[2]
+            else:
+                self.output_size -= len(item)
+
+    def write(self):
+        while self.output:
+            item = self.output[0]
+            try:
+                if isinstance(item, list):
+                    fd, offset, count = item
+                    sent = os.sendfile(self.socket.fileno(), fd, offset, count)
+                    if sent == 0:
+                        raise ConnectionError("Arquivo encurtado durante o envio")
+                    item[1] += sent
+                    item[2] -= sent
+                    self.output_size -= sent
+                    self.metrics.bytes_sent.inc(amount=sent)
+                    if not item[2]:
+                        os.close(fd)
+                        self.output.popleft()
+                else:
+                    buffers = []
+                    for buffer in self.output:
+                        if isinstance(buffer, list) or len(buffers) == IOV_MAX:
+                            break
+                        buffers.append(buffer)
+                    sent = self.socket.sendmsg(buffers)
+                    self.output_size -= sent
+                    self.metrics.bytes_sent.inc(amount=sent)
+                    while sent and sent >= len(self.output[0]):
+                        sent -= len(self.output.popleft())
+                    if sent:
+                        self.output[0] = self.output[0][sent:]
+            except BlockingIOError:
+                return False
+            self.last_activity = time.monotonic()
+        return True
+
+    def pump(self):
+        while not self.closed:
+            self.process()
+            if not self.write():
+                self.watch(selectors.EVENT_WRITE)
+                return
+            if self.closing:
+                self.close()
+                return
+            if self.output_size < OUTPUT_BUFFER_SIZE and not self.has_pending_request():
+                self.watch(selectors.EVENT_READ)
+                return
+
+    def has_pending_request(self):
+        return b'\r\n\r\n' in self.buffer and not self.body_remaining
+
+    def watch(self, events):
+        if events != self.events:
+            self.loop.selector.modify(self.socket, events, self)
+            self.events = events
+
+    def idle(self):
+        return not self.output and not self.buffer and not self.body_remaining
+
+    def timeout(self):
+        if self.output or (self.handled and not self.buffer):
+            return self.keepalive_timeout
+        return REQUEST_TIMEOUT
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.loop.connections.discard(self)
+        self.metrics.disconnected()
+        try:
+            self.loop.selector.unregister(self.socket)
+        except (KeyError, ValueError):
+            pass
+        self.discard_output(0)
+        try:
+            self.socket.close()
+        except OSError:
+            pass
+
+
+class HTTPEventLoop:
+
+    def __init__(self, server_socket, root_dir, cache, metrics, keepalive_timeout, max_requests, shutdown=None):
+        self.server_socket = server_socket
+        self.root_dir = os.path.abspath(root_dir)
+        self.cache = cache
+        self.metrics = metrics
+        self.keepalive_timeout = keepalive_timeout
+        self.max_requests = max_requests
+        self.selector = selectors.DefaultSelector()
+        self.connections = set()
+        self.shutdown = shutdown if shutdown is not None else threading.Event()
+        self.deadline = None
+
+    def request_stop(self):
+        self.shutdown.set()
+
+    def run(self):
+        self.server_socket.setblocking(False)
+        self.selector.register(self.server_socket, selectors.EVENT_READ, None)
+        next_sweep = time.monotonic() + SWEEP_INTERVAL
+        while True:
+            for key, events in self.selector.select(SWEEP_INTERVAL):
+                connection = key.data
+                if connection is None:
+                    self.accept()
+                    continue
+                try:
+                    if events & selectors.EVENT_READ:
+                        connection.on_readable()
+                    elif events & selectors.EVENT_WRITE:
+                        connection.pump()
+                except OSError:
+                    connection.close()
+
+            now = time.monotonic()
+            if self.shutdown.is_set() and self.drain(now):
+                return
+            if now >= next_sweep:
+                self.sweep(now)
+                next_sweep = now + SWEEP_INTERVAL
+
+    def accept(self):
+        for _ in range(ACCEPT_BATCH):
+            try:
+                client_socket, client_address = self.server_socket.accept()
+            except BlockingIOError:
+                return
+            except OSError as e:
+                print(f"[Servidor] Erro ao aceitar conexão: {e}")
+                return
+            client_socket.setblocking(False)
+            connection = HTTPConnection(self, client_socket, client_address)
+            self.selector.register(client_socket, selectors.EVENT_READ, connection)
+            self.connections.add(connection)
+            self.metrics.connected()
+
+    def drain(self, now):
+        if self.deadline is None:
+            self.deadline = now + SHUTDOWN_TIMEOUT
+            self.selector.unregister(self.server_socket)
+            self.server_socket.close()
+        for connection in [c for c in self.connections if c.idle() or now > self.deadline]:
+            connection.close()
+        return not self.connections
+
+    def sweep(self, now):
+        expired = [connection for connection in self.connections
+                   if now - connection.last_activity > connection.timeout()]
+        for connection in expired:
+            connection.close()
@@ -0,0 +1,291 @@
+import bisect
+import threading
+import time
+
+from protocol import MESSAGE_TYPES
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+INF = float('inf')
+
+
+def format_value(value):
+    if value == INF:
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        if isinstance(value, bytes):
+            value = value.decode('ascii', errors='replace')
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.const_names = ()
+        self.const_values = ()
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def format_labels(self, names, values):
+        return format_labels(self.const_names + names, self.const_values + values)
+
+    def header(self, lines):
+        lines.append(f'# HELP {self.name} {self.help_text}')
+        lines.append(f'# TYPE {self.name} {self.kind}')
+
+    def render(self, lines):
+        self.header(lines)
+        with self.lock:
+            items = list(self.values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        for labels, value in items:
+            lines.append(f'{self.name}{self.format_labels(self.labelnames, labels)} {format_value(value)}')
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self.lock:
+            return self.values.get(labels, 0)
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def render(self, lines):
+        self.header(lines)
+        with self.lock:
+            items = [(labels, list(state)) for labels, state in self.values.items()]
+        if not items and not self.labelnames:
+            items = [((), [0] * (len(self.buckets) + 1) + [0.0])]
+
+        bucket_names = self.labelnames + ('le',)
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (INF,), state):
+                cumulative += count
+                bucket_labels = self.format_labels(bucket_names, labels + (format_value(bound),))
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            label_text = self.format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {format_value(state[-1])}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+
+
+class MetricsRegistry:
+
+    def __init__(self, const_labels=None):
+        self.metrics = []
+        self.collectors = []
+        self.started = time.time()
+        self.const_names = tuple(const_labels or ())
+        self.const_values = tuple((const_labels or {}).values())
+
+    def register(self, metric):
+        metric.const_names = self.const_names
+        metric.const_values = self.const_values
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self.register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def add_collector(self, prefix, snapshot, help_text):
+        self.collectors.append((prefix, snapshot, help_text))
+
+    def render(self):
+        const_text = format_labels(self.const_names, self.const_values)
+        lines = [
+            '# HELP process_start_time_seconds Início do processo em segundos desde a época Unix',
+            '# TYPE process_start_time_seconds gauge',
+            f'process_start_time_seconds{const_text} {format_value(self.started)}',
+        ]
+        for metric in self.metrics:
+            metric.render(lines)
+        for prefix, snapshot, help_text in self.collectors:
+            for key, value in snapshot().items():
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    continue
+                name = f'{prefix}_{key}'
+                lines.append(f'# HELP {name} {help_text}: {key}')
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name}{const_text} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class CountingSocket:
+
+    def __init__(self, sock, received, sent):
+        self.sock = sock
+        self.received = received
+        self.sent = sent
+
+    def recv(self, bufsize, *args):
+        data = self.sock.recv(bufsize, *args)
+        self.received.inc(amount=len(data))
+        return data
+
+    def recv_into(self, buffer, *args):
+        n = self.sock.recv_into(buffer, *args)
+        self.received.inc(amount=n)
+        return n
+
+    def send(self, data, *args):
+        n = self.sock.send(data, *args)
+        self.sent.inc(amount=n)
+        return n
+
+    def sendall(self, data, *args):
+        self.sock.sendall(data, *args)
+        self.sent.inc(amount=memoryview(data).nbytes)
+
+    def sendmsg(self, buffers, *args):
+        n = self.sock.sendmsg(buffers, *args)
+        self.sent.inc(amount=n)
+        return n
+
+    def sendfile(self, file, offset=0, count=None):
+        n = self.sock.sendfile(file, offset, count)
+        self.sent.inc(amount=n)
+        return n
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+
+class CountingWriter:
+
+    def __init__(self, writer, sent):
+        self.writer = writer
+        self.sent = sent
+
+    def write(self, data):
+        self.writer.write(data)
+        self.sent.inc(amount=memoryview(data).nbytes)
+
+    def writelines(self, data):
+        data = list(data)
+        self.writer.writelines(data)
+        self.sent.inc(amount=sum(memoryview(item).nbytes for item in data))
+
+    def __getattr__(self, name):
+        return getattr(self.writer, name)
+
+
+class ChatMetrics:
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.connections_open = self.registry.gauge('chat_connections_open', 'Conexões de clientes abertas')
+        self.connections_total = self.registry.counter('chat_connections_total', 'Conexões de clientes aceitas')
+        self.frames_received = self.registry.counter('chat_frames_received_total', 'Mensagens recebidas por tipo',
+                                                     ('type',))
+        self.frames_sent = self.registry.counter('chat_frames_sent_total',
+                                                 'Mensagens enviadas por tipo, fora as transferências de arquivo',
+                                                 ('type',))
+        self.bytes_received = self.registry.counter('chat_bytes_received_total', 'Bytes recebidos dos clientes')
+        self.bytes_sent = self.registry.counter('chat_bytes_sent_total', 'Bytes enviados aos clientes')
+        self.file_transfers = self.registry.histogram('chat_file_transfer_seconds',
+                                                      'Duração das transferências de arquivo', ('result',))
+
+    def add_collector(self, prefix, snapshot, help_text):
+        self.registry.add_collector(prefix, snapshot, help_text)
+
+    def connected(self):
+        self.connections_total.inc()
+        self.connections_open.inc()
+
+    def disconnected(self):
+        self.connections_open.dec()
+
+    def frame_received(self, msg_type):
+        self.frames_received.inc(msg_type if msg_type in MESSAGE_TYPES else 'outro')
+
+    def file_transfer(self, started, success):
+        self.file_transfers.observe(time.perf_counter() - started, 'ok' if success else 'error')
+
+    def render(self):
+        return self.registry.render()
+
+
+class HTTPMetrics:
+
+    def __init__(self, worker=None):
+        self.registry = MetricsRegistry({'worker': worker} if worker is not None else None)
+        self.connections_open = self.registry.gauge('http_connections_open', 'Conexões HTTP abertas')
+        self.connections_total = self.registry.counter('http_connections_total', 'Conexões HTTP aceitas')
+        self.requests = self.registry.counter('http_requests_total', 'Respostas enviadas por código de status',
+                                              ('code',))
+        self.request_duration = self.registry.histogram('http_request_duration_seconds',
+                                                        'Tempo entre a leitura da requisição e a resposta pronta')
+        self.bytes_received = self.registry.counter('http_bytes_received_total', 'Bytes recebidos dos clientes')
+        self.bytes_sent = self.registry.counter('http_bytes_sent_total', 'Bytes enviados aos clientes')
+
+    def add_collector(self, prefix, snapshot, help_text):
+        self.registry.add_collector(prefix, snapshot, help_text)
+
+    def connected(self):
+        self.connections_total.inc()
+        self.connections_open.inc()
+
+    def disconnected(self):
+        self.connections_open.dec()
+
+    def response(self, status_code, started):
+        self.requests.inc(status_code)
+        self.request_duration.observe(time.perf_counter() - started)
+
+    def render(self):
+        return self.registry.render()
@@ -1,9 +1,15 @@
+import contextlib
 import struct
 import hashlib
 import os
+import time
+from compression import (
+    COMPRESS_CHUNK_SIZE, MIN_COMPRESS_SIZE, INCOMPRESSIBLE_BACKOFF, compress, decompress, is_compressible
+)
 
 HEADER_SIZE = 12
 TYPE_SIZE = 4
+COMPRESSED_FLAG = 1 << 63
 
 MSG_QUIT = b'QUIT'
 MSG_FILE = b'FILE'
@@ -13,20 +19,84 @@ MSG_FILE_ERROR = b'FERR'
 MSG_FILE_META = b'FMTA'
 MSG_FILE_DATA = b'FDAT'
 MSG_FILE_HASH = b'FHSH'
+MSG_FILE_RAW = b'FRAW'
+MSG_HELLO = b'HELO'
+MSG_ECHO = b'ECHO'
+MSG_STATS = b'STAT'
+MSG_JOIN = b'JOIN'
+MSG_LEAVE = b'LEAV'
+MSG_ROOM = b'ROOM'
+MSG_HISTORY = b'HIST'
+MSG_HISTORY_END = b'HEND'
+MSG_DELTA_REQUEST = b'DREQ'
+MSG_DELTA_META = b'DMTA'
+MSG_DELTA_COPY = b'DCPY'
+MSG_DELTA_DATA = b'DLIT'
+MSG_DELTA_END = b'DEND'
+
+RAW_FRAME_TYPES = (MSG_FILE_RAW,)
+FILE_REPLY_TYPES = (MSG_FILE_OK, MSG_FILE_ERROR, MSG_FILE_META, MSG_FILE_DATA, MSG_FILE_HASH)
+DELTA_REPLY_TYPES = (MSG_DELTA_META, MSG_DELTA_COPY, MSG_DELTA_DATA, MSG_DELTA_END)
+MESSAGE_TYPES = frozenset({
+    MSG_QUIT, MSG_FILE, MSG_CHAT, MSG_FILE_OK, MSG_FILE_ERROR, MSG_FILE_META, MSG_FILE_DATA, MSG_FILE_HASH,
+    MSG_FILE_RAW, MSG_HELLO, MSG_ECHO, MSG_STATS, MSG_JOIN, MSG_LEAVE, MSG_ROOM,
+    MSG_HISTORY, MSG_HISTORY_END, MSG_DELTA_REQUEST, MSG_DELTA_META, MSG_DELTA_COPY, MSG_DELTA_DATA,
+    MSG_DELTA_END
+})
+
+CAP_SENDFILE = 'sendfile'
+
+CAP_TRAILER = 'trailer'
+CAP_RANGE = 'range'
+CAP_BLOCKS = 'blocks'
+CAP_STREAMS = 'streams'
+CAP_ECHO = 'echo'
+CAP_STATS = 'stats'
+CAP_ROOMS = 'rooms'
+CAP_HISTORY = 'history'
+CAP_DELTA = 'delta'
+
+HASH_UPFRONT = 'upfront'
+HASH_TRAILER = 'trailer'
+HASH_NONE = 'none'
+
+TRANSFER_FRAMED = 'framed'
+TRANSFER_SENDFILE = 'sendfile'
 
 CHUNK_SIZE = 8192
+FILE_BLOCK_SIZE = 32 * CHUNK_SIZE
+COALESCE_THRESHOLD = 64 * 1024
+SMALL_PAYLOAD_SIZE = 1024
+IOV_MAX = os.sysconf('SC_IOV_MAX') if hasattr(os, 'sysconf') else 1024
+RECV_BUFFER_SIZE = 64 * 1024
+MAX_RECV_BUFFER_SIZE = 4 * 1024 * 1024
+MAX_PAYLOAD_SIZE = 16 * 1024 * 1024
+RAW_READ_SIZE = 1024 * 1024
+SENDFILE_CHUNK_SIZE = 4 * 1024 * 1024
+HASH_SIZE = 32
+HASH_BLOCK_SIZE = 1024 * 1024
+MAX_HASH_BLOCKS = 65536
+
+STREAM_ID_SIZE = 4
+STREAM_QUANTUM = 64 * 1024
+MAX_STREAMS = 16
+STREAM_NOTSENT_LOWAT = 128 * 1024
+
+RANGE_ERROR = "Intervalo inválido"
+STREAM_ERROR = "Identificador de fluxo inválido"
 
 
 class Message:
     
     def __init__(self, msg_type, payload=b''):
         self.msg_type = msg_type
-        self.payload = payload if isinstance(payload, bytes) else payload.encode('utf-8')
+        self.payload = payload if isinstance(payload, (bytes, bytearray, memoryview)) else payload.encode('utf-8')
+    
+    def header(self):
+        return struct.pack('!Q', len(self.payload)) + self.msg_type
     
     def serialize(self):
-        payload_size = len(self.payload)
-        header = struct.pack('!Q', payload_size) + self.msg_type
-        return header + self.payload
+        return self.header() + self.payload
     
     @staticmethod
     def deserialize_header(header_bytes):
@@ -34,36 +104,458 @@ class Message:
             raise ValueError(f"Cabeçalho inválido: esperado {HEADER_SIZE} bytes, recebido {len(header_bytes)}")
         
         payload_size = struct.unpack('!Q', header_bytes[:8])[0]
-        msg_type = header_bytes[8:12]
+        msg_type = bytes(header_bytes[8:12])
         return payload_size, msg_type
 
 
-def send_message(sock, msg_type, payload=b''):
+def encode_capabilities(capabilities):
+    return ','.join(sorted(capabilities))
+
+
+def decode_capabilities(payload):
+    text = bytes(payload).decode('utf-8')
+    return {cap.strip() for cap in text.split(',') if cap.strip()}
+
+
+def encode_file_request(filename, options=None):
+    lines = [filename]
+    for key, value in (options or {}).items():
+        lines.append(f"{key}={value}")
+    return '\n'.join(lines)
+
+
+def decode_file_request(payload):
+    lines = bytes(payload).decode('utf-8').split('\n')
+    options = {}
+    for line in lines[1:]:
+        key, sep, value = line.partition('=')
+        if sep:
+            options[key.strip()] = value.strip()
+    return lines[0].strip(), options
+
+
+def encode_room_message(room, message=''):
+    return f"{room}\n{message}"
+
+
+def decode_room_message(payload):
+    room, _, message = bytes(payload).decode('utf-8').partition('\n')
+    return room.strip(), message
+
+
+def encode_history_request(channel, since=0, limit=None):
+    options = {'since': since}
+    if limit is not None:
+        options['limit'] = limit
+    return encode_file_request(channel, options)
+
+
+def decode_history_request(payload):
+    channel, options = decode_file_request(payload)
+    limit = int(options['limit']) if 'limit' in options else None
+    return channel, int(options.get('since', 0)), limit
+
+
+def encode_history_end(channel, first, next_seq, more):
+    return encode_file_request(channel, {'first': first, 'next': next_seq, 'more': int(more)})
+
+
+def decode_history_end(payload):
+    channel, options = decode_file_request(payload)
+    return channel, int(options['first']), int(options['next']), options.get('more') == '1'
+
+
+def encode_history_entry(seq, channel, text):
+    return f"{seq}\n{channel}\n{text}"
+
+
+def decode_history_entry(payload):
+    seq, channel, text = bytes(payload).decode('utf-8').split('\n', 2)
+    return int(seq), channel, text
+
+
+def encode_delta_request(filename, file_size, block_size, signatures):
+    header = encode_file_request(filename, {'size': file_size, 'block': block_size}).encode('utf-8')
+    return struct.pack('!I', len(header)) + header + signatures
+
+
+def decode_delta_request(payload):
+    try:
+        header_size = struct.unpack('!I', payload[:4])[0]
+        filename, options = decode_file_request(payload[4:4 + header_size])
+        return filename, int(options['size']), int(options['block']), bytes(payload[4 + header_size:])
+    except (struct.error, KeyError) as e:
+        raise ValueError(f"Pedido de delta inválido: {e}") from e
+
+
+def encode_delta_end(filename, file_hash=None, error=None):
+    options = {'error': error} if error is not None else {'hash': file_hash.hex()}
+    return encode_file_request(filename, options)
+
+
+def decode_delta_end(payload):
+    filename, options = decode_file_request(payload)
+    file_hash = bytes.fromhex(options['hash']) if 'hash' in options else None
+    return filename, file_hash, options.get('error')
+
+
+def decode_stream_id(options):
+    stream_id = int(options['stream'])
+    if not 0 < stream_id < 2 ** 32:
+        raise ValueError(STREAM_ERROR)
+    return stream_id
+
+
+def decode_range(options):
+    offset = int(options.get('offset', 0))
+    length = int(options['length']) if 'length' in options else None
+    return offset, length
+
+
+def resolve_range(file_size, offset=0, length=None):
+    if offset < 0 or offset > file_size or (length is not None and length < 0):
+        raise ValueError(RANGE_ERROR)
+    if length is None:
+        length = file_size - offset
+    return offset, min(length, file_size - offset)
+
+
+def pack_file_meta(filename, file_size, offset=None, length=None):
+    filename_bytes = filename.encode('utf-8')
+    metadata = struct.pack('!I', len(filename_bytes)) + filename_bytes + struct.pack('!Q', file_size)
+    if offset is not None:
+        metadata += struct.pack('!QQ', offset, length)
+    return metadata
+
+
+def unpack_file_meta(metadata):
+    filename_size = struct.unpack('!I', metadata[:4])[0]
+    filename = bytes(metadata[4:4+filename_size]).decode('utf-8')
+    sizes = metadata[4+filename_size:]
+    if len(sizes) == 24:
+        file_size, offset, length = struct.unpack('!QQQ', sizes)
+    else:
+        file_size = struct.unpack('!Q', sizes)[0]
+        offset, length = 0, file_size
+    return filename, file_size, offset, length
+
+
+def pack_file_hash(file_hash, block_size=None, block_hashes=None):
+    if block_hashes is None:
+        return file_hash
+    return file_hash + struct.pack('!I', block_size) + b''.join(block_hashes)
+
+
+def unpack_file_hash(payload):
+    payload = bytes(payload)
+    if len(payload) == HASH_SIZE:
+        return payload, None, None
+    block_size = struct.unpack('!I', payload[HASH_SIZE:HASH_SIZE + 4])[0]
+    hashes = payload[HASH_SIZE + 4:]
+    block_hashes = [hashes[i:i + HASH_SIZE] for i in range(0, len(hashes), HASH_SIZE)]
+    return payload[:HASH_SIZE], block_size, block_hashes
+
+
+def stream_header(msg_type, stream_id, payload_size):
+    return struct.pack('!Q', payload_size + STREAM_ID_SIZE) + msg_type + struct.pack('!I', stream_id)
+
+
+def stream_frame(msg_type, stream_id, payload=b''):
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    return stream_header(msg_type, stream_id, len(payload)) + payload
+
+
+def decode_stream_payload(payload):
+    return struct.unpack('!I', payload[:STREAM_ID_SIZE])[0], payload[STREAM_ID_SIZE:]
+
+
+class FileRegion:
+    
+    def __init__(self, file, offset, count):
+        self.file = file
+        self.offset = offset
+        self.count = count
+
+
+def send_items(sock, items):
+    buffers = []
+    for item in items:
+        if not isinstance(item, FileRegion):
+            buffers.append(item)
+            continue
+        if buffers:
+            send_buffers(sock, buffers)
+            buffers = []
+        sent = sock.sendfile(item.file, item.offset, item.count)
+        if sent != item.count:
+            raise ConnectionError(f"Enviados {sent} de {item.count} bytes")
+    if buffers:
+        send_buffers(sock, buffers)
+
+
+def send_buffers(sock, buffers):
+    if not hasattr(sock, 'sendmsg'):
+        sock.sendall(b''.join(buffers))
+        return
+    
+    views = list(buffers)
+    index = 0
+    while index < len(views):
+        sent = sock.sendmsg(views[index:index + IOV_MAX])
+        while index < len(views) and sent >= len(views[index]):
+            sent -= len(views[index])
+            index += 1
+        if sent:
+            views[index] = memoryview(views[index])[sent:]
+
+
+def compress_payload(payload, codec):
+    if codec is None or len(payload) < MIN_COMPRESS_SIZE:
+        return None
+    compressed = compress(codec, payload)
+    return compressed if len(compressed) < len(payload) else None
+
+
+def serialize_frame(msg_type, payload=b'', codec=None):
     message = Message(msg_type, payload)
-    data = message.serialize()
-    sock.sendall(data)
+    compressed = compress_payload(message.payload, codec)
+    if compressed is None:
+        return message.serialize()
+    return struct.pack('!Q', len(compressed) | COMPRESSED_FLAG) + msg_type + compressed
+
 
+def file_codec(filepath, codec, offset=0):
+    if codec is None or not is_compressible(filepath):
+        return None
+    with open(filepath, 'rb') as f:
+        f.seek(offset)
+        sample = f.read(COMPRESS_CHUNK_SIZE)
+    return codec if compress_payload(sample, codec) is not None else None
 
-def receive_message(sock):
-    header = receive_exact(sock, HEADER_SIZE)
-    if not header:
-        return None, None
+
+class FrameCompressor:
     
-    payload_size, msg_type = Message.deserialize_header(header)
+    def __init__(self, codec):
+        self.codec = codec
+        self.skip = 0
     
-    payload = receive_exact(sock, payload_size) if payload_size > 0 else b''
+    def frame(self, msg_type, payload):
+        if self.skip:
+            self.skip -= 1
+            return Message(msg_type, payload).serialize()
+        
+        frame = serialize_frame(msg_type, payload, self.codec)
+        if len(frame) >= HEADER_SIZE + len(payload):
+            self.skip = INCOMPRESSIBLE_BACKOFF
+        return frame
+
+
+def send_message(sock, msg_type, payload=b'', codec=None):
+    message = Message(msg_type, payload)
+    if codec is not None:
+        sock.sendall(serialize_frame(msg_type, message.payload, codec))
+    elif len(message.payload) <= SMALL_PAYLOAD_SIZE:
+        sock.sendall(message.serialize())
+    else:
+        send_buffers(sock, [message.header(), message.payload])
+
+
+class FrameWriter:
+    
+    def __init__(self, sock, threshold=COALESCE_THRESHOLD):
+        self.sock = sock
+        self.threshold = threshold
+        self.buffers = []
+        self.pending_bytes = 0
+    
+    def write(self, msg_type, payload=b''):
+        message = Message(msg_type, payload)
+        self.buffers.append(message.header())
+        self.buffers.append(message.payload)
+        self.pending_bytes += HEADER_SIZE + len(message.payload)
+        if self.pending_bytes >= self.threshold:
+            self.flush()
     
-    return msg_type, payload
+    def write_frame(self, frame):
+        self.buffers.append(frame)
+        self.pending_bytes += len(frame)
+        if self.pending_bytes >= self.threshold:
+            self.flush()
+    
+    def flush(self):
+        if self.buffers:
+            send_buffers(self.sock, self.buffers)
+            self.buffers = []
+            self.pending_bytes = 0
+
+
+def receive_into(sock, view):
+    received = 0
+    total = len(view)
+    while received < total:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            return False
+        received += n
+    return True
 
 
-def receive_exact(sock, num_bytes):
-    data = b''
-    while len(data) < num_bytes:
-        chunk = sock.recv(min(num_bytes - len(data), 4096))
-        if not chunk:
+class ReceiveBuffer:
+    
+    def __init__(self, size=RECV_BUFFER_SIZE, max_size=MAX_RECV_BUFFER_SIZE):
+        self.max_size = max_size
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+    
+    def receive_exact(self, sock, num_bytes):
+        if num_bytes > len(self.buffer):
+            if num_bytes > self.max_size:
+                data = bytearray(num_bytes)
+                view = memoryview(data)
+                return view if receive_into(sock, view) else None
+            self.buffer = bytearray(num_bytes)
+            self.view = memoryview(self.buffer)
+        
+        view = self.view[:num_bytes]
+        if not receive_into(sock, view):
             return None
-        data += chunk
-    return data
+        return view
+    
+    def receive_header(self, sock):
+        header = self.receive_exact(sock, HEADER_SIZE)
+        if header is None:
+            return None, None
+        return Message.deserialize_header(header)
+    
+    def receive_stream(self, sock, num_bytes, block_size=RAW_READ_SIZE):
+        if len(self.buffer) < block_size:
+            self.buffer = bytearray(block_size)
+            self.view = memoryview(self.buffer)
+        
+        remaining = num_bytes
+        while remaining:
+            n = sock.recv_into(self.view, min(remaining, block_size))
+            if n == 0:
+                raise ConnectionError("Conexão encerrada durante a transferência")
+            remaining -= n
+            yield self.view[:n]
+    
+    def receive_message(self, sock):
+        payload_size, msg_type = self.receive_header(sock)
+        if msg_type is None:
+            return None, None
+        
+        if payload_size == 0:
+            return msg_type, b''
+        
+        payload = self.receive_exact(sock, payload_size)
+        if payload is None:
+            return None, None
+        
+        return msg_type, payload
+
+
+class FrameDecoder:
+    
+    def __init__(self, max_payload_size=MAX_PAYLOAD_SIZE, buffer_size=RECV_BUFFER_SIZE, accept_raw=True):
+        self.max_payload_size = max_payload_size
+        self.accept_raw = accept_raw
+        self.buffer = bytearray(buffer_size)
+        self.start = 0
+        self.end = 0
+        self.raw_remaining = 0
+        self.codec = None
+    
+    def buffered(self):
+        return self.end - self.start
+    
+    def reserve(self, num_bytes):
+        if len(self.buffer) - self.end >= num_bytes:
+            return
+        
+        pending = self.end - self.start
+        if pending + num_bytes <= len(self.buffer):
+            self.buffer[:pending] = self.buffer[self.start:self.end]
+        else:
+            new_buffer = bytearray(max(pending + num_bytes, 2 * len(self.buffer)))
+            new_buffer[:pending] = self.buffer[self.start:self.end]
+            self.buffer = new_buffer
+        self.start = 0
+        self.end = pending
+    
+    def feed(self, data):
+        self.reserve(len(data))
+        self.buffer[self.end:self.end + len(data)] = data
+        self.end += len(data)
+    
+    def recv_into(self, sock, min_free=RECV_BUFFER_SIZE):
+        self.reserve(min_free)
+        n = sock.recv_into(memoryview(self.buffer)[self.end:])
+        self.end += n
+        return n
+    
+    def read_raw(self, sock, view):
+        n = min(len(view), self.raw_remaining)
+        buffered = self.end - self.start
+        if buffered:
+            n = min(n, buffered)
+            view[:n] = self.buffer[self.start:self.start + n]
+            self.start += n
+        else:
+            n = sock.recv_into(view, n)
+            if n == 0:
+                raise ConnectionError("Conexão encerrada durante a transferência")
+        self.raw_remaining -= n
+        return n
+    
+    def read_stream_id(self, sock):
+        if self.raw_remaining < STREAM_ID_SIZE:
+            raise ValueError("Quadro bruto sem identificador de fluxo")
+        view = memoryview(bytearray(STREAM_ID_SIZE))
+        received = 0
+        while received < STREAM_ID_SIZE:
+            received += self.read_raw(sock, view[received:])
+        return struct.unpack('!I', view)[0]
+    
+    def skip_raw(self, sock):
+        scratch = memoryview(bytearray(RECV_BUFFER_SIZE))
+        while self.raw_remaining:
+            self.read_raw(sock, scratch)
+    
+    def frames(self):
+        view = memoryview(self.buffer)
+        while self.end - self.start >= HEADER_SIZE and not self.raw_remaining:
+            payload_size, msg_type = Message.deserialize_header(view[self.start:self.start + HEADER_SIZE])
+            compressed = payload_size & COMPRESSED_FLAG
+            payload_size &= ~COMPRESSED_FLAG
+            if msg_type in RAW_FRAME_TYPES:
+                if not self.accept_raw:
+                    raise ValueError(f"Quadro {msg_type.decode('ascii')} não é aceito nesta direção")
+                self.start += HEADER_SIZE
+                self.raw_remaining = payload_size
+                yield msg_type, b''
+                view = memoryview(self.buffer)
+                continue
+            
+            if payload_size > self.max_payload_size:
+                raise ValueError(f"Payload de {payload_size} bytes excede o limite de {self.max_payload_size} bytes")
+            
+            frame_end = self.start + HEADER_SIZE + payload_size
+            if frame_end > self.end:
+                self.reserve(frame_end - self.end)
+                break
+            
+            payload = view[self.start + HEADER_SIZE:frame_end]
+            self.start = frame_end
+            if compressed:
+                if self.codec is None:
+                    raise ValueError("Quadro comprimido recebido sem codec negociado")
+                payload = memoryview(decompress(self.codec, payload, self.max_payload_size))
+            yield msg_type, payload
+        
+        if self.start == self.end:
+            self.start = self.end = 0
 
 
 def calculate_file_hash(filepath):
@@ -77,87 +569,355 @@ def calculate_file_hash(filepath):
     return sha256.digest()
 
 
-def send_file(sock, filepath):
+def hash_block_size(file_size):
+    block_size = HASH_BLOCK_SIZE
+    while file_size > block_size * MAX_HASH_BLOCKS:
+        block_size *= 2
+    return block_size
+
+
+def calculate_block_hashes(filepath, block_size=HASH_BLOCK_SIZE):
+    sha256 = hashlib.sha256()
+    block_hashes = []
+    with open(filepath, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            sha256.update(block)
+            block_hashes.append(hashlib.sha256(block).digest())
+    return sha256.digest(), block_hashes
+
+
+def verify_file_blocks(filepath, block_size, block_hashes):
+    file_hash, actual = calculate_block_hashes(filepath, block_size)
+    bad_blocks = [index for index, block_hash in enumerate(block_hashes)
+                  if index >= len(actual) or actual[index] != block_hash]
+    return file_hash, bad_blocks
+
+
+def file_hash_payload(filepath, file_size, hash_cache=None, blocks=False):
+    if not blocks:
+        return hash_cache.get(filepath) if hash_cache else calculate_file_hash(filepath)
+    
+    block_size = hash_block_size(file_size)
+    if hash_cache:
+        file_hash, block_hashes = hash_cache.get_blocks(filepath, block_size)
+    else:
+        file_hash, block_hashes = calculate_block_hashes(filepath, block_size)
+    return pack_file_hash(file_hash, block_size, block_hashes)
+
+
+def send_file(sock, filepath, mode=TRANSFER_FRAMED, hash_cache=None, trailer=False,
+              offset=0, length=None, blocks=False, send_hash=True, codec=None, send_lock=None):
+    lock = send_lock or contextlib.nullcontext()
+    raw_started = False
     try:
         if not os.path.exists(filepath):
-            send_message(sock, MSG_FILE_ERROR, "Arquivo não encontrado")
+            with lock:
+                send_message(sock, MSG_FILE_ERROR, "Arquivo não encontrado")
             return False
         
-        send_message(sock, MSG_FILE_OK)
+        file_stat = os.stat(filepath)
+        file_size = file_stat.st_size
         
-        file_hash = calculate_file_hash(filepath)
+        ranged = offset != 0 or length is not None
+        try:
+            offset, length = resolve_range(file_size, offset, length)
+        except ValueError:
+            with lock:
+                send_message(sock, MSG_FILE_ERROR, RANGE_ERROR)
+            return False
+        trailer = trailer and not ranged and not blocks
         
-        filename = os.path.basename(filepath)
-        file_size = os.path.getsize(filepath)
+        codec = file_codec(filepath, codec, offset)
+        if codec is not None:
+            mode = TRANSFER_FRAMED
+        
+        with lock:
+            send_message(sock, MSG_FILE_OK)
         
-        filename_bytes = filename.encode('utf-8')
-        metadata = struct.pack('!I', len(filename_bytes)) + filename_bytes + struct.pack('!Q', file_size)
-        send_message(sock, MSG_FILE_META, metadata)
+        hash_payload = None
+        if send_hash and not trailer:
+            hash_payload = file_hash_payload(filepath, file_size, hash_cache, blocks)
+        elif send_hash and hash_cache:
+            hash_payload = hash_cache.peek(filepath)
         
-        send_message(sock, MSG_FILE_HASH, file_hash)
+        filename = os.path.basename(filepath)
+        if ranged or blocks:
+            metadata = pack_file_meta(filename, file_size, offset, length)
+        else:
+            metadata = pack_file_meta(filename, file_size)
+        
+        writer = FrameWriter(sock)
+        with lock:
+            writer.write(MSG_FILE_META, metadata)
+            if hash_payload is not None:
+                writer.write(MSG_FILE_HASH, hash_payload)
+            writer.flush()
+        sha256 = hashlib.sha256() if send_hash and hash_payload is None else None
         
+        raw = mode == TRANSFER_SENDFILE and length > 0
         with open(filepath, 'rb') as f:
-            bytes_sent = 0
-            while bytes_sent < file_size:
-                chunk = f.read(CHUNK_SIZE)
-                if not chunk:
-                    break
-                send_message(sock, MSG_FILE_DATA, chunk)
-                bytes_sent += len(chunk)
+            f.seek(offset)
+            if raw:
+                raw_started = True
+                bytes_sent = 0
+                while bytes_sent < length:
+                    chunk_size = min(SENDFILE_CHUNK_SIZE, length - bytes_sent)
+                    with lock:
+                        writer.write_frame(struct.pack('!Q', chunk_size) + MSG_FILE_RAW)
+                        writer.flush()
+                        if sha256 is None:
+                            sent = sock.sendfile(f, offset + bytes_sent, chunk_size)
+                        else:
+                            sent = send_file_blocks(writer, f, chunk_size, sha256, raw=True)
+                    if sent != chunk_size:
+                        raise ConnectionError(f"Enviados {bytes_sent + sent} de {length} bytes")
+                    bytes_sent += sent
+            else:
+                send_file_blocks(writer, f, length, sha256, codec=codec, send_lock=send_lock)
         
+        if sha256 is not None:
+            file_hash = sha256.digest()
+            if hash_cache:
+                hash_cache.update(filepath, file_stat, file_hash)
+            with lock:
+                writer.write(MSG_FILE_HASH, file_hash)
+                writer.flush()
         return True
         
     except Exception as e:
+        if raw_started:
+            raise
         print(f"Erro ao enviar arquivo: {e}")
-        send_message(sock, MSG_FILE_ERROR, str(e))
+        with lock:
+            send_message(sock, MSG_FILE_ERROR, str(e))
         return False
 
 
-def receive_file(sock, save_dir):
+class FileStream:
+    
+    def __init__(self, stream_id, filepath, hash_cache=None, trailer=False, offset=0, length=None,
+                 blocks=False, send_hash=True, quantum=STREAM_QUANTUM, codec=None, raw=False):
+        self.stream_id = stream_id
+        self.filepath = filepath
+        self.filename = os.path.basename(filepath)
+        self.hash_cache = hash_cache
+        self.codec = codec
+        self.compressor = None
+        self.raw = raw
+        self.quantum = quantum
+        self.pending = []
+        self.file = None
+        self.file_stat = None
+        self.position = 0
+        self.sha256 = None
+        self.remaining = 0
+        self.failed = False
+        self.done = False
+        self.started = time.perf_counter()
+        try:
+            self.open(trailer, offset, length, blocks, send_hash)
+        except Exception as e:
+            self.fail(e)
+    
+    def frame(self, msg_type, payload=b''):
+        return stream_frame(msg_type, self.stream_id, payload)
+    
+    def open(self, trailer, offset, length, blocks, send_hash):
+        if not os.path.exists(self.filepath):
+            self.fail("Arquivo não encontrado")
+            return
+        
+        self.file_stat = os.stat(self.filepath)
+        file_size = self.file_stat.st_size
+        
+        ranged = offset != 0 or length is not None
+        try:
+            offset, length = resolve_range(file_size, offset, length)
+        except ValueError:
+            self.fail(RANGE_ERROR)
+            return
+        trailer = trailer and not ranged and not blocks
+        
+        codec = file_codec(self.filepath, self.codec, offset)
+        if codec is not None:
+            self.compressor = FrameCompressor(codec)
+            self.raw = False
+        
+        hash_payload = None
+        if send_hash and not trailer:
+            hash_payload = file_hash_payload(self.filepath, file_size, self.hash_cache, blocks)
+        elif send_hash and self.hash_cache:
+            hash_payload = self.hash_cache.peek(self.filepath)
+        
+        if ranged or blocks:
+            metadata = pack_file_meta(self.filename, file_size, offset, length)
+        else:
+            metadata = pack_file_meta(self.filename, file_size)
+        
+        self.pending = [self.frame(MSG_FILE_OK), self.frame(MSG_FILE_META, metadata)]
+        if hash_payload is not None:
+            self.pending.append(self.frame(MSG_FILE_HASH, hash_payload))
+        elif send_hash:
+            self.sha256 = hashlib.sha256()
+        
+        self.file = open(self.filepath, 'rb')
+        self.file.seek(offset)
+        self.position = offset
+        self.remaining = length
+    
+    def fail(self, error):
+        self.close()
+        self.pending.append(self.frame(MSG_FILE_ERROR, str(error)))
+        self.remaining = 0
+        self.sha256 = None
+        self.failed = True
+    
+    def next_frames(self):
+        try:
+            if self.remaining and self.raw and self.sha256 is None:
+                count = min(self.quantum, self.remaining)
+                self.pending.append(stream_header(MSG_FILE_RAW, self.stream_id, count))
+                self.pending.append(FileRegion(self.file, self.position, count))
+                self.position += count
+                self.remaining -= count
+            
+            elif self.remaining:
+                block = self.file.read(min(self.quantum, self.remaining))
+                if not block:
+                    raise EOFError("Arquivo truncado durante o envio")
+                if self.sha256 is not None:
+                    self.sha256.update(block)
+                view = memoryview(block)
+                if self.raw:
+                    self.pending.append(stream_header(MSG_FILE_RAW, self.stream_id, len(block)))
+                    self.pending.append(block)
+                elif self.compressor is not None:
+                    prefix = struct.pack('!I', self.stream_id)
+                    for offset in range(0, len(block), COMPRESS_CHUNK_SIZE):
+                        chunk = prefix + view[offset:offset + COMPRESS_CHUNK_SIZE]
+                        self.pending.append(self.compressor.frame(MSG_FILE_DATA, chunk))
+                else:
+                    for offset in range(0, len(block), CHUNK_SIZE):
+                        chunk = view[offset:offset + CHUNK_SIZE]
+                        self.pending.append(stream_header(MSG_FILE_DATA, self.stream_id, len(chunk)))
+                        self.pending.append(chunk)
+                self.remaining -= len(block)
+            
+            if not self.remaining and self.sha256 is not None:
+                file_hash = self.sha256.digest()
+                self.sha256 = None
+                self.pending.append(self.frame(MSG_FILE_HASH, file_hash))
+                if self.hash_cache:
+                    self.hash_cache.update(self.filepath, self.file_stat, file_hash)
+        
+        except Exception as e:
+            self.fail(e)
+        
+        if not self.remaining:
+            if not self.raw or self.failed:
+                self.close()
+            self.done = True
+        
+        frames, self.pending = self.pending, []
+        return frames
+    
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def send_file_blocks(writer, f, file_size, sha256=None, raw=False, codec=None, send_lock=None):
+    lock = send_lock or contextlib.nullcontext()
+    compressor = FrameCompressor(codec) if codec is not None else None
+    block = bytearray(FILE_BLOCK_SIZE)
+    block_view = memoryview(block)
+    
+    bytes_sent = 0
+    while bytes_sent < file_size:
+        n = f.readinto(block_view[:min(FILE_BLOCK_SIZE, file_size - bytes_sent)])
+        if not n:
+            break
+        if sha256 is not None:
+            sha256.update(block_view[:n])
+        if raw:
+            frames = [block_view[:n]]
+        elif compressor is not None:
+            frames = [compressor.frame(MSG_FILE_DATA, block_view[offset:min(offset + COMPRESS_CHUNK_SIZE, n)])
+                      for offset in range(0, n, COMPRESS_CHUNK_SIZE)]
+        else:
+            frames = []
+            for offset in range(0, n, CHUNK_SIZE):
+                chunk = block_view[offset:min(offset + CHUNK_SIZE, n)]
+                frames += (Message(MSG_FILE_DATA, chunk).header(), chunk)
+        with lock:
+            for frame in frames:
+                writer.write_frame(frame)
+            writer.flush()
+        bytes_sent += n
+    
+    return bytes_sent
+
+
+def receive_file(sock, save_dir, progress=True):
+    recv_buffer = ReceiveBuffer()
     try:
-        msg_type, payload = receive_message(sock)
+        msg_type, payload = recv_buffer.receive_message(sock)
         
         if msg_type == MSG_FILE_ERROR:
-            error_msg = payload.decode('utf-8')
+            error_msg = bytes(payload).decode('utf-8')
             return False, f"Erro: {error_msg}"
         
         if msg_type != MSG_FILE_OK:
             return False, "Resposta inválida do servidor"
         
-        msg_type, metadata = receive_message(sock)
+        msg_type, metadata = recv_buffer.receive_message(sock)
         if msg_type != MSG_FILE_META:
             return False, "Metadados não recebidos"
         
-        filename_size = struct.unpack('!I', metadata[:4])[0]
-        filename = metadata[4:4+filename_size].decode('utf-8')
-        file_size = struct.unpack('!Q', metadata[4+filename_size:])[0]
+        filename, file_size, _, _ = unpack_file_meta(metadata)
         
-        print(f"Recebendo arquivo: {filename} ({file_size} bytes)")
-        
-        msg_type, file_hash_received = receive_message(sock)
-        if msg_type != MSG_FILE_HASH:
-            return False, "Hash não recebido"
+        if progress:
+            print(f"Recebendo arquivo: {filename} ({file_size} bytes)")
         
         os.makedirs(save_dir, exist_ok=True)
         filepath = os.path.join(save_dir, filename)
         
         bytes_received = 0
         sha256 = hashlib.sha256()
+        file_hash_received = None
         
         with open(filepath, 'wb') as f:
-            while bytes_received < file_size:
-                msg_type, chunk = receive_message(sock)
-                if msg_type != MSG_FILE_DATA:
+            while bytes_received < file_size or file_hash_received is None:
+                payload_size, msg_type = recv_buffer.receive_header(sock)
+                if msg_type == MSG_FILE_HASH:
+                    file_hash_received = bytes(recv_buffer.receive_exact(sock, payload_size))
+                    continue
+                elif msg_type == MSG_FILE_RAW:
+                    chunks = recv_buffer.receive_stream(sock, payload_size)
+                elif msg_type == MSG_FILE_DATA:
+                    chunks = [recv_buffer.receive_exact(sock, payload_size)]
+                elif msg_type is None:
+                    raise ConnectionError("Conexão encerrada durante a transferência")
+                else:
                     return False, "Dados do arquivo não recebidos corretamente"
                 
-                f.write(chunk)
-                sha256.update(chunk)
-                bytes_received += len(chunk)
-                
-                progress = (bytes_received / file_size) * 100
-                print(f"\rProgresso: {progress:.1f}%", end='', flush=True)
+                for chunk in chunks:
+                    if chunk is None:
+                        raise ConnectionError("Conexão encerrada durante a transferência")
+                    f.write(chunk)
+                    sha256.update(chunk)
+                    bytes_received += len(chunk)
+                    
+                    if progress:
+                        percent = (bytes_received / file_size) * 100
+                        print(f"\rProgresso: {percent:.1f}%", end='', flush=True)
         
-        print()
+        if progress:
+            print()
         
         file_hash_calculated = sha256.digest()
         
@@ -0,0 +1,224 @@
+import gzip
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_BODY_SIZE = 256 * 1024
+DEFAULT_REVALIDATE_INTERVAL = 1.0
+ENTRY_OVERHEAD = 512
+INDEX_FILE = 'index.html'
+
+ENCODING_BROTLI = 'br'
+ENCODING_GZIP = 'gzip'
+ENCODING_IDENTITY = 'identity'
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+DEFAULT_MAX_COMPRESS_SIZE = 4 * 1024 * 1024
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+
+def available_encodings():
+    if brotli is not None:
+        return (ENCODING_BROTLI, ENCODING_GZIP)
+    return (ENCODING_GZIP,)
+
+
+def is_compressible_type(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress_body(encoding, body):
+    if encoding == ENCODING_GZIP:
+        return gzip.compress(body, GZIP_LEVEL, mtime=0)
+    if encoding == ENCODING_BROTLI and brotli is not None:
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    raise ValueError(f"Codificação desconhecida: {encoding}")
+
+
+def make_etag(st):
+    return f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+class CachedResponse:
+
+    def __init__(self, path, file_path, st, content_type, body):
+        self.path = path
+        self.file_path = file_path
+        self.key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        self.size = st.st_size
+        self.mtime = int(st.st_mtime)
+        self.etag = make_etag(st)
+        self.last_modified = formatdate(st.st_mtime, usegmt=True)
+        self.body = body
+        self.compressible = is_compressible_type(content_type)
+        self.variants = {}
+        self.pending = set()
+        self.headers = {
+            'Content-Type': content_type,
+            'Accept-Ranges': 'bytes',
+            'ETag': self.etag,
+            'Last-Modified': self.last_modified,
+        }
+        if self.compressible:
+            self.headers['Vary'] = 'Accept-Encoding'
+        self.cost = ENTRY_OVERHEAD + (len(body) if body is not None else 0)
+        self.checked = time.monotonic()
+
+
+class ResponseCache:
+
+    def __init__(self, guess_content_type, max_bytes=DEFAULT_MAX_BYTES,
+                 max_body_size=DEFAULT_MAX_BODY_SIZE, revalidate_interval=DEFAULT_REVALIDATE_INTERVAL,
+                 max_compress_size=DEFAULT_MAX_COMPRESS_SIZE):
+        self.guess_content_type = guess_content_type
+        self.max_bytes = max_bytes
+        self.max_body_size = max_body_size
+        self.revalidate_interval = revalidate_interval
+        self.max_compress_size = max_compress_size
+        self.encodings = available_encodings() if max_compress_size > 0 and max_bytes > 0 else ()
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        if self.encodings:
+            threading.Thread(target=self.compress_loop, daemon=True).start()
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'revalidations': 0,
+            'invalidations': 0,
+            'evictions': 0,
+            'compressions': 0,
+            'variant_hits': 0,
+        }
+
+    def get(self, path):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and now - entry.checked < self.revalidate_interval:
+                self.entries.move_to_end(path)
+                self.counters['hits'] += 1
+                return entry
+
+        file_path = path
+        if os.path.isdir(file_path):
+            file_path = os.path.join(file_path, INDEX_FILE)
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            self.discard(path)
+            return None
+
+        if entry is not None and entry.file_path == file_path and \
+                entry.key == (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns):
+            with self.lock:
+                entry.checked = now
+                if path in self.entries:
+                    self.entries.move_to_end(path)
+                self.counters['hits'] += 1
+                self.counters['revalidations'] += 1
+            return entry
+
+        body = None
+        if st.st_size <= self.max_body_size:
+            with open(file_path, 'rb') as f:
+                body = f.read()
+            if len(body) != st.st_size:
+                body = None
+
+        fresh = CachedResponse(path, file_path, st, self.guess_content_type(file_path), body)
+        with self.lock:
+            self.counters['misses'] += 1
+            old = self.entries.pop(path, None)
+            if old is not None:
+                self.bytes -= old.cost
+                self.counters['invalidations'] += 1
+            if fresh.cost <= self.max_bytes:
+                self.entries[path] = fresh
+                self.bytes += fresh.cost
+                self.evict()
+        return fresh
+
+    def variant(self, entry, encoding):
+        if not entry.compressible or encoding not in self.encodings or entry.size > self.max_compress_size:
+            return None
+        with self.lock:
+            if self.entries.get(entry.path) is not entry:
+                return None
+            if encoding in entry.variants:
+                variant = entry.variants[encoding]
+                if variant is not None:
+                    self.counters['variant_hits'] += 1
+                return variant
+            if encoding not in entry.pending:
+                entry.pending.add(encoding)
+                self.jobs.put((entry, encoding))
+        return None
+
+    def compress_loop(self):
+        while True:
+            entry, encoding = self.jobs.get()
+            with self.lock:
+                cached = self.entries.get(entry.path) is entry
+            variant = None
+            if cached:
+                try:
+                    variant = self.compress(entry, encoding)
+                except OSError:
+                    pass
+            with self.lock:
+                entry.pending.discard(encoding)
+                if not cached:
+                    continue
+                entry.variants[encoding] = variant
+                self.counters['compressions'] += 1
+                if variant is not None:
+                    entry.cost += len(variant[0])
+                    if self.entries.get(entry.path) is entry:
+                        self.bytes += len(variant[0])
+                        self.evict()
+
+    def compress(self, entry, encoding):
+        body = entry.body
+        if body is None:
+            with open(entry.file_path, 'rb') as f:
+                body = f.read()
+            if len(body) != entry.size:
+                return None
+
+        compressed = compress_body(encoding, body)
+        if len(compressed) >= len(body):
+            return None
+        return compressed, f'{entry.etag[:-1]}-{encoding}"'
+
+    def evict(self):
+        while self.bytes > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.cost
+            self.counters['evictions'] += 1
+
+    def discard(self, path):
+        with self.lock:
+            entry = self.entries.pop(path, None)
+            if entry is not None:
+                self.bytes -= entry.cost
+                self.counters['invalidations'] += 1
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+            counters['entries'] = len(self.entries)
+            counters['bytes'] = self.bytes
+            lookups = counters['hits'] + counters['misses']
+            counters['hit_ratio'] = f"{counters['hits'] / lookups:.3f}" if lookups else '0.000'
+            return counters
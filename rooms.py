@@ -0,0 +1,59 @@
+import threading
+
+DEFAULT_STRIPES = 64
+MAX_ROOM_NAME_SIZE = 64
+MAX_ROOMS_PER_CLIENT = 64
+
+
+def valid_room_name(room):
+    return bool(room) and len(room.encode('utf-8')) <= MAX_ROOM_NAME_SIZE and room.isprintable()
+
+
+class RoomIndex:
+
+    def __init__(self, stripes=DEFAULT_STRIPES):
+        self.locks = [threading.Lock() for _ in range(stripes)]
+        self.rooms = [{} for _ in range(stripes)]
+
+    def stripe(self, room):
+        return hash(room) % len(self.locks)
+
+    def join(self, room, client_id, member):
+        index = self.stripe(room)
+        with self.locks[index]:
+            members = self.rooms[index].get(room, {})
+            if client_id in members:
+                return len(members)
+            members = dict(members)
+            members[client_id] = member
+            self.rooms[index][room] = members
+            return len(members)
+
+    def leave(self, room, client_id):
+        index = self.stripe(room)
+        with self.locks[index]:
+            members = self.rooms[index].get(room)
+            if members is None or client_id not in members:
+                return False
+            if len(members) == 1:
+                del self.rooms[index][room]
+            else:
+                members = dict(members)
+                del members[client_id]
+                self.rooms[index][room] = members
+            return True
+
+    def members(self, room):
+        return self.rooms[self.stripe(room)].get(room, {})
+
+    def stats(self):
+        rooms = 0
+        memberships = 0
+        largest = 0
+        for index, lock in enumerate(self.locks):
+            with lock:
+                for members in self.rooms[index].values():
+                    rooms += 1
+                    memberships += len(members)
+                    largest = max(largest, len(members))
+        return {'rooms': rooms, 'memberships': memberships, 'largest': largest}
@@ -0,0 +1,146 @@
+import threading
+from collections import deque
+
+POLICY_DROP = 'drop'
+POLICY_DISCONNECT = 'disconnect'
+POLICY_DROP_OLDEST = 'drop-oldest'
+SLOW_CLIENT_POLICIES = (POLICY_DROP, POLICY_DISCONNECT, POLICY_DROP_OLDEST)
+
+DEFAULT_MAX_FRAMES = 256
+DEFAULT_MAX_BYTES = 1024 * 1024
+
+
+class SendQueueStats:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {
+            'enqueued': 0,
+            'control': 0,
+            'dropped_new': 0,
+            'dropped_oldest': 0,
+            'dropped_oversize': 0,
+            'disconnected': 0,
+            'dropped_on_disconnect': 0,
+        }
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+send_queue_stats = SendQueueStats()
+
+
+class SendQueue:
+
+    def __init__(self, max_frames=DEFAULT_MAX_FRAMES, max_bytes=DEFAULT_MAX_BYTES,
+                 policy=POLICY_DROP, on_ready=None, stats=send_queue_stats):
+        if policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"Política desconhecida: {policy}")
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.on_ready = on_ready
+        self.stats = stats
+        self.frames = deque()
+        self.pending_bytes = 0
+        self.control = deque()
+        self.control_bytes = 0
+        self.closed = False
+        self.woken = False
+        self.cond = threading.Condition()
+
+    def is_full(self, frame_size):
+        return (len(self.frames) >= self.max_frames
+                or self.pending_bytes + frame_size > self.max_bytes)
+
+    def put(self, frame, control=False):
+        with self.cond:
+            if self.closed:
+                return True
+
+            if control:
+                if self.control and (len(self.control) >= self.max_frames
+                                     or self.control_bytes + len(frame) > self.max_bytes):
+                    self.disconnect(1)
+                    return False
+                self.control.append(frame)
+                self.control_bytes += len(frame)
+                self.stats.increment('control')
+            elif len(frame) > self.max_bytes:
+                self.stats.increment('dropped_oversize')
+                return True
+            else:
+                if self.is_full(len(frame)):
+                    if self.policy == POLICY_DROP:
+                        self.stats.increment('dropped_new')
+                        return True
+                    if self.policy == POLICY_DISCONNECT:
+                        self.disconnect(1)
+                        return False
+                    self.drop_oldest(len(frame))
+                self.frames.append(frame)
+                self.pending_bytes += len(frame)
+                self.stats.increment('enqueued')
+            self.cond.notify()
+
+        if self.on_ready is not None:
+            self.on_ready()
+        return True
+
+    def disconnect(self, incoming):
+        self.stats.increment('disconnected')
+        self.stats.increment('dropped_on_disconnect', len(self.frames) + len(self.control) + incoming)
+        self.frames.clear()
+        self.pending_bytes = 0
+        self.control.clear()
+        self.control_bytes = 0
+        self.closed = True
+        self.cond.notify_all()
+
+    def drop_oldest(self, incoming_size):
+        dropped = 0
+        while self.frames and self.is_full(incoming_size):
+            self.pending_bytes -= len(self.frames.popleft())
+            dropped += 1
+        self.stats.increment('dropped_oldest', dropped)
+
+    def take(self):
+        frames = list(self.control) + list(self.frames)
+        self.control.clear()
+        self.control_bytes = 0
+        self.frames.clear()
+        self.pending_bytes = 0
+        return frames
+
+    def pop_all(self):
+        with self.cond:
+            return self.take()
+
+    def wait_batch(self, timeout=None):
+        with self.cond:
+            while not self.frames and not self.control and not self.closed and not self.woken:
+                if not self.cond.wait(timeout):
+                    return []
+            self.woken = False
+            if not self.frames and not self.control:
+                return None if self.closed else []
+            return self.take()
+
+    def wake(self):
+        with self.cond:
+            self.woken = True
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+        if self.on_ready is not None:
+            self.on_ready()
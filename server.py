@@ -1,22 +1,52 @@
+import argparse
 import os
+import signal
 import socket
-import sys
 import threading
+import time
+import uuid
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 from urllib.parse import unquote
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from response_cache import (
+    ResponseCache, ENCODING_IDENTITY, DEFAULT_MAX_BYTES, DEFAULT_MAX_BODY_SIZE, DEFAULT_REVALIDATE_INTERVAL,
+    DEFAULT_MAX_COMPRESS_SIZE
+)
+from metrics import HTTPMetrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from workers import WorkerSupervisor, SHUTDOWN_TIMEOUT
+
 HOST = '0.0.0.0'
 DEFAULT_PORT = 8080
 ROOT_DIR = 'server_files'
 MAX_REQUEST_SIZE = 65536
+BACKLOG = 1024
+RECV_SIZE = 65536
+REQUEST_TIMEOUT = 5
+KEEPALIVE_TIMEOUT = 15
+MAX_KEEPALIVE_REQUESTS = 100
+OUTPUT_BUFFER_SIZE = 256 * 1024
+INLINE_BODY_SIZE = 64 * 1024
+MAX_RANGES = 16
+MAX_DISCARD_BODY = 64 * 1024
+METRICS_PATH = '/metrics'
 
 
 STATUS_MESSAGES = {
     200: 'OK',
+    206: 'Partial Content',
+    304: 'Not Modified',
     400: 'Bad Request',
     403: 'Forbidden',
     404: 'Not Found',
     405: 'Method Not Allowed',
+    406: 'Not Acceptable',
+    416: 'Range Not Satisfiable',
     500: 'Internal Server Error',
 }
 
@@ -34,6 +64,14 @@ CONTENT_TYPES = {
 }
 
 
+def raise_nofile_limit():
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
 def guess_content_type(path):
     _, ext = os.path.splitext(path.lower())
     return CONTENT_TYPES.get(ext, 'application/octet-stream')
@@ -43,15 +81,17 @@ def format_http_date():
     return datetime.utcnow().strftime('%a, %d %b %Y %H:%M:%S GMT')
 
 
-def build_response(status_code, body=b'', headers=None):
+def build_response(status_code, body=b'', headers=None, keep_alive=False):
     reason = STATUS_MESSAGES.get(status_code, 'Unknown')
     headers = headers or {}
     default_headers = {
         'Date': format_http_date(),
         'Server': 'TCPChatHTTP/1.0',
         'Content-Length': str(len(body)),
-        'Connection': 'close',
+        'Connection': 'keep-alive' if keep_alive else 'close',
     }
+    if status_code == 304:
+        del default_headers['Content-Length']
     default_headers.update(headers)
 
     header_lines = [f"HTTP/1.1 {status_code} {reason}\r\n"]
@@ -69,74 +109,197 @@ def sanitize_path(raw_path):
     return normalized if normalized != '.' else ''
 
 
-class HTTPClientHandler(threading.Thread):
+def parse_range(header, file_size):
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec.strip():
+        return None
 
-    def __init__(self, client_socket, client_address, root_dir):
-        super().__init__(daemon=True)
-        self.socket = client_socket
-        self.address = client_address
-        self.root_dir = os.path.abspath(root_dir)
-
-    def run(self):
+    ranges = []
+    for part in spec.split(','):
+        first, sep, last = part.strip().partition('-')
+        if not sep:
+            return None
         try:
-            request_data = self.read_request()
-            if not request_data:
-                return
-
-            method, target, version = self.parse_request_line(request_data)
-            if method != 'GET':
-                body = b'Method not allowed'
-                response = build_response(405, body, {'Content-Type': 'text/plain; charset=utf-8'})
-                self.socket.sendall(response)
-                return
-
-            file_path = self.resolve_path(target)
-            if not file_path:
-                body = b'Forbidden'
-                response = build_response(403, body, {'Content-Type': 'text/plain; charset=utf-8'})
-                self.socket.sendall(response)
-                return
-
-            if os.path.isdir(file_path):
-                file_path = os.path.join(file_path, 'index.html')
-
-            if not os.path.exists(file_path):
-                body = b"<html><body><h1>404 Not Found</h1></body></html>"
-                response = build_response(404, body, {'Content-Type': 'text/html; charset=utf-8'})
-                self.socket.sendall(response)
-                return
-
-            self.send_file_response(file_path)
-
-        except ValueError as err:
-            body = f"Bad request: {err}".encode('utf-8')
-            response = build_response(400, body, {'Content-Type': 'text/plain; charset=utf-8'})
-            self.socket.sendall(response)
-        except Exception as err:
-            print(f"[Erro] {self.address}: {err}")
-            body = b'Internal server error'
-            response = build_response(500, body, {'Content-Type': 'text/plain; charset=utf-8'})
-            try:
-                self.socket.sendall(response)
-            except Exception:
-                pass
-        finally:
-            try:
-                self.socket.close()
-            except Exception:
-                pass
-
-    def read_request(self):
-        data = b''
-        self.socket.settimeout(5)
-        while b'\r\n\r\n' not in data and len(data) < MAX_REQUEST_SIZE:
-            chunk = self.socket.recv(4096)
-            if not chunk:
-                break
-            data += chunk
-        return data
-
-    def parse_request_line(self, request_bytes):
+            if not first:
+                suffix = int(last)
+                if suffix < 0:
+                    return None
+                start, end = max(0, file_size - suffix), file_size - 1
+                if suffix == 0:
+                    continue
+            else:
+                start = int(first)
+                end = int(last) if last else file_size - 1
+                if start < 0 or (last and end < start):
+                    return None
+        except ValueError:
+            return None
+        if start < file_size:
+            ranges.append((start, min(end, file_size - 1)))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def negotiate_encoding(header, available):
+    if header is None:
+        return ENCODING_IDENTITY
+
+    qualities = {}
+    for item in header.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            qualities[name] = quality
+
+    default = qualities.get('*')
+    identity = qualities.get(ENCODING_IDENTITY, default)
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = qualities.get(encoding, default or 0.0)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    if best is not None and (identity is None or best_quality >= identity):
+        return best
+    return ENCODING_IDENTITY if identity is None or identity > 0 else None
+
+
+def is_not_modified(entry, headers, etag=None):
+    etag = etag or entry.etag
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or any((tag[2:] if tag.startswith('W/') else tag) == etag for tag in tags)
+
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since:
+        try:
+            return entry.mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def range_applies(entry, headers):
+    if_range = headers.get('if-range')
+    if if_range is None:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == entry.etag
+    return if_range == entry.last_modified
+
+
+def wants_keep_alive(version, headers):
+    tokens = {token.strip().lower() for token in headers.get('connection', '').split(',')}
+    if version == 'HTTP/1.0':
+        return 'keep-alive' in tokens
+    return 'close' not in tokens
+
+
+def request_body_length(headers):
+    if 'transfer-encoding' in headers:
+        return None
+    try:
+        length = int(headers.get('content-length', '0'))
+    except ValueError:
+        raise ValueError('Content-Length inválido')
+    if length < 0:
+        raise ValueError('Content-Length inválido')
+    return length
+
+
+class HTTPRequestHandler:
+
+    serve_files = True
+
+    def handle_request(self, request_data, handled):
+        self.request_started = time.perf_counter()
+        method, target, version, headers = self.parse_request(request_data)
+        self.keep_alive = (handled < self.max_requests and wants_keep_alive(version, headers)
+                           and not self.shutdown.is_set())
+        body_length = request_body_length(headers)
+        if body_length is None or body_length > MAX_DISCARD_BODY:
+            self.keep_alive = False
+        else:
+            self.discard_body(body_length)
+
+        if method != 'GET':
+            body = b'Method not allowed'
+            self.send_response(405, body, {'Content-Type': 'text/plain; charset=utf-8'})
+            return
+
+        if target.split('?', 1)[0] == METRICS_PATH:
+            body = self.metrics.render().encode('utf-8')
+            self.send_response(200, body, {'Content-Type': METRICS_CONTENT_TYPE})
+            return
+
+        if not self.serve_files:
+            body = b"<html><body><h1>404 Not Found</h1></body></html>"
+            self.send_response(404, body, {'Content-Type': 'text/html; charset=utf-8'})
+            return
+
+        file_path = self.resolve_path(target)
+        if not file_path:
+            body = b'Forbidden'
+            self.send_response(403, body, {'Content-Type': 'text/plain; charset=utf-8'})
+            return
+
+        entry = self.cache.get(file_path)
+        if entry is None:
+            body = b"<html><body><h1>404 Not Found</h1></body></html>"
+            self.send_response(404, body, {'Content-Type': 'text/html; charset=utf-8'})
+            return
+
+        range_header = headers.get('range') if range_applies(entry, headers) else None
+        accept_encoding = headers.get('accept-encoding')
+        encodings = self.cache.encodings if entry.compressible and not range_header else ()
+        encoding = negotiate_encoding(accept_encoding, encodings)
+        identity_refused = negotiate_encoding(accept_encoding, ()) is None
+        variant = None
+        if encoding not in (None, ENCODING_IDENTITY):
+            variant = self.cache.variant(entry, encoding)
+            if variant is None and identity_refused and entry.size <= self.cache.max_compress_size:
+                variant = self.cache.compress(entry, encoding)
+        if variant is None and identity_refused:
+            body = b'Not acceptable'
+            self.send_response(406, body, {'Content-Type': 'text/plain; charset=utf-8', 'Vary': 'Accept-Encoding'})
+            return
+
+        etag = variant[1] if variant else entry.etag
+        if is_not_modified(entry, headers, etag):
+            not_modified_headers = {'ETag': etag, 'Last-Modified': entry.last_modified}
+            if entry.compressible:
+                not_modified_headers['Vary'] = 'Accept-Encoding'
+            self.send_response(304, b'', not_modified_headers)
+            return
+
+        if variant:
+            self.send_compressed_response(entry, encoding, variant)
+            return
+        self.send_file_response(entry, range_header)
+
+    def send_response(self, status_code, body=b'', headers=None):
+        self.metrics.response(status_code, self.request_started)
+        self.queue(build_response(status_code, body, headers, self.keep_alive))
+
+    def parse_request(self, request_bytes):
         try:
             text = request_bytes.decode('iso-8859-1', errors='replace')
             lines = text.split('\r\n')
@@ -147,7 +310,15 @@ class HTTPClientHandler(threading.Thread):
             method, target, version = parts
             if not version.startswith('HTTP/'):
                 raise ValueError('versão HTTP desconhecida')
-            return method, target, version
+            headers = {}
+            for line in lines[1:]:
+                if not line:
+                    continue
+                name, sep, value = line.partition(':')
+                if not sep:
+                    raise ValueError('cabeçalho inválido')
+                headers[name.strip().lower()] = value.strip()
+            return method, target, version, headers
         except Exception as err:
             raise ValueError(err)
 
@@ -158,41 +329,395 @@ class HTTPClientHandler(threading.Thread):
             return None
         return abs_path
 
-    def send_file_response(self, file_path):
-        with open(file_path, 'rb') as f:
-            body = f.read()
+    def send_file_response(self, entry, range_header=None):
+        file_size = entry.size
+        ranges = parse_range(range_header, file_size) if range_header else None
+        relpath = os.path.relpath(entry.file_path, self.root_dir)
+
+        if ranges == []:
+            headers = {
+                'Content-Type': 'text/plain; charset=utf-8',
+                'Content-Range': f'bytes */{file_size}',
+            }
+            self.send_response(416, b'Range not satisfiable', headers)
+            print(f"[416] {self.address} -> {relpath} ({range_header})")
+            return
+
+        f = open(entry.file_path, 'rb') if entry.body is None else None
+        try:
+            if ranges is None:
+                self.send_file_part(entry, f, 200, 0, file_size, dict(entry.headers))
+                print(f"[200] {self.address} -> {relpath} ({file_size} bytes)")
+                return
 
-        content_type = guess_content_type(file_path)
-        headers = {
-            'Content-Type': content_type,
-        }
-        response = build_response(200, body, headers)
-        self.socket.sendall(response)
-        print(f"[200] {self.address} -> {os.path.relpath(file_path, self.root_dir)} ({len(body)} bytes)")
+            if len(ranges) == 1:
+                start, end = ranges[0]
+                headers = dict(entry.headers)
+                headers['Content-Range'] = f'bytes {start}-{end}/{file_size}'
+                self.send_file_part(entry, f, 206, start, end - start + 1, headers)
+                print(f"[206] {self.address} -> {relpath} (bytes {start}-{end}/{file_size})")
+                return
 
+            self.send_multipart_ranges(entry, f, ranges)
+            print(f"[206] {self.address} -> {relpath} ({len(ranges)} intervalos)")
+        finally:
+            if f is not None:
+                f.close()
+
+    def send_compressed_response(self, entry, encoding, variant):
+        body, etag = variant
+        headers = dict(entry.headers)
+        del headers['Accept-Ranges']
+        headers['ETag'] = etag
+        headers['Content-Encoding'] = encoding
+        self.send_response(200, body, headers)
+        relpath = os.path.relpath(entry.file_path, self.root_dir)
+        print(f"[200] {self.address} -> {relpath} ({len(body)} bytes {encoding}, {entry.size} sem compressão)")
+
+    def read_part(self, entry, f, offset, count):
+        if entry.body is not None:
+            return entry.body[offset:offset + count]
+        f.seek(offset)
+        data = f.read(count)
+        if len(data) != count:
+            raise ConnectionError("Arquivo encurtado durante o envio")
+        return data
 
-def main():
-    port = DEFAULT_PORT
-    if len(sys.argv) > 1:
-        port = int(sys.argv[1])
+    def send_file_part(self, entry, f, status_code, offset, count, headers):
+        if entry.body is not None or count <= INLINE_BODY_SIZE:
+            self.send_response(status_code, self.read_part(entry, f, offset, count), headers)
+            return
+        headers['Content-Length'] = str(count)
+        self.send_response(status_code, b'', headers)
+        self.send_file_data(f, offset, count)
+
+    def send_multipart_ranges(self, entry, f, ranges):
+        boundary = uuid.uuid4().hex
+        part_headers = [
+            (f"--{boundary}\r\nContent-Type: {entry.headers['Content-Type']}\r\n"
+             f"Content-Range: bytes {start}-{end}/{entry.size}\r\n\r\n").encode('ascii')
+            for start, end in ranges
+        ]
+        closing = f"--{boundary}--\r\n".encode('ascii')
+        content_length = len(closing) + sum(
+            len(head) + end - start + 1 + 2 for head, (start, end) in zip(part_headers, ranges)
+        )
+
+        self.send_response(206, b'', {
+            'Content-Type': f'multipart/byteranges; boundary={boundary}',
+            'Accept-Ranges': 'bytes',
+            'ETag': entry.etag,
+            'Last-Modified': entry.last_modified,
+            'Content-Length': str(content_length),
+        })
+        for head, (start, end) in zip(part_headers, ranges):
+            self.queue(head)
+            count = end - start + 1
+            if entry.body is not None or count <= INLINE_BODY_SIZE:
+                self.queue(self.read_part(entry, f, start, count))
+            else:
+                self.send_file_data(f, start, count)
+            self.queue(b'\r\n')
+        self.queue(closing)
+
+
+class HTTPClientHandler(HTTPRequestHandler, threading.Thread):
+
+    def __init__(self, client_socket, client_address, root_dir, cache, metrics, shutdown,
+                 keepalive_timeout=KEEPALIVE_TIMEOUT, max_requests=MAX_KEEPALIVE_REQUESTS):
+        super().__init__(daemon=True)
+        self.socket = client_socket
+        self.address = client_address
+        self.root_dir = os.path.abspath(root_dir)
+        self.cache = cache
+        self.metrics = metrics
+        self.shutdown = shutdown
+        self.keepalive_timeout = keepalive_timeout
+        self.max_requests = max_requests
+        self.buffer = bytearray()
+        self.output = []
+        self.output_size = 0
+        self.keep_alive = False
+        self.request_started = time.perf_counter()
 
-    os.makedirs(ROOT_DIR, exist_ok=True)
+    def run(self):
+        handled = 0
+        self.metrics.connected()
+        try:
+            while True:
+                try:
+                    request_data = self.read_request(self.keepalive_timeout if handled else REQUEST_TIMEOUT)
+                    if not request_data:
+                        break
+                    handled += 1
+                    self.handle_request(request_data, handled)
+                except ValueError as err:
+                    self.keep_alive = False
+                    body = f"Bad request: {err}".encode('utf-8')
+                    self.send_response(400, body, {'Content-Type': 'text/plain; charset=utf-8'})
+
+                if not self.keep_alive:
+                    break
+            self.flush()
+
+        except (ConnectionError, socket.timeout):
+            pass
+        except Exception as err:
+            print(f"[Erro] {self.address}: {err}")
+            self.output.clear()
+            self.output_size = 0
+            self.keep_alive = False
+            body = b'Internal server error'
+            self.send_response(500, body, {'Content-Type': 'text/plain; charset=utf-8'})
+            try:
+                self.flush()
+            except Exception:
+                pass
+        finally:
+            self.metrics.disconnected()
+            try:
+                self.socket.close()
+            except Exception:
+                pass
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
-        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server_socket.bind((HOST, port))
-        server_socket.listen(10)
+    def queue(self, data):
+        self.output.append(data)
+        self.output_size += len(data)
+        if self.output_size >= OUTPUT_BUFFER_SIZE:
+            self.flush()
+
+    def stop_reading(self):
+        try:
+            self.socket.shutdown(socket.SHUT_RD)
+        except OSError:
+            pass
+
+    def send_file_data(self, f, offset, count):
+        if count <= 0:
+            return
+        self.flush()
+        sent = self.socket.sendfile(f, offset, count)
+        self.metrics.bytes_sent.inc(amount=sent)
+        if sent != count:
+            raise ConnectionError("Arquivo encurtado durante o envio")
+
+    def flush(self):
+        if self.output:
+            data = b''.join(self.output)
+            self.output.clear()
+            self.output_size = 0
+            self.socket.sendall(data)
+            self.metrics.bytes_sent.inc(amount=len(data))
+
+    def receive_more(self):
+        chunk = self.socket.recv(RECV_SIZE)
+        if chunk:
+            self.buffer += chunk
+            self.metrics.bytes_received.inc(amount=len(chunk))
+        return len(chunk)
+
+    def read_request(self, timeout):
+        self.socket.settimeout(timeout)
+        while True:
+            end = self.buffer.find(b'\r\n\r\n')
+            if end != -1:
+                request = bytes(self.buffer[:end + 4])
+                del self.buffer[:end + 4]
+                return request
+            if len(self.buffer) >= MAX_REQUEST_SIZE:
+                raise ValueError('cabeçalho da requisição excede o limite')
+            self.flush()
+            try:
+                received = self.receive_more()
+            except socket.timeout:
+                return None
+            if not received:
+                request = bytes(self.buffer)
+                self.buffer.clear()
+                return request
+            self.socket.settimeout(REQUEST_TIMEOUT)
+
+    def discard_body(self, remaining):
+        while remaining > len(self.buffer):
+            remaining -= len(self.buffer)
+            self.buffer.clear()
+            if not self.receive_more():
+                self.keep_alive = False
+                return
+        del self.buffer[:remaining]
 
-        print('=' * 60)
-        print('Servidor HTTP simples (TCP) iniciado')
-        print(f'Escutando em http://{HOST}:{port}')
-        print(f'Diretório raiz: {os.path.abspath(ROOT_DIR)}')
-        print('=' * 60)
 
+def console_input_thread(cache, metrics):
+    while True:
+        try:
+            command = input().strip().lower()
+        except EOFError:
+            break
+        if command == 'quit':
+            print("[Servidor] Encerrando...")
+            os._exit(0)
+        if command == 'stats':
+            counters = cache.stats()
+            print("[Stats] Cache de respostas: " + ', '.join(f"{k}={v}" for k, v in counters.items()))
+            print(metrics.render(), end='')
+
+
+class ShutdownRequested(Exception):
+    pass
+
+
+def raise_shutdown(signum, frame):
+    raise ShutdownRequested()
+
+
+def create_server_socket(port, backlog, reuse_port=False):
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    server_socket.bind((HOST, port))
+    server_socket.listen(backlog)
+    return server_socket
+
+
+def serve(server_socket, args, cache, metrics, shutdown=None):
+    if shutdown is None:
+        shutdown = threading.Event()
+    if args.event_loop:
+        from http_event_loop import HTTPEventLoop
+        loop = HTTPEventLoop(server_socket, ROOT_DIR, cache, metrics, args.keepalive_timeout, args.max_requests,
+                             shutdown)
+        signal.signal(signal.SIGTERM, lambda signum, frame: loop.request_stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: loop.request_stop())
+        loop.run()
+        return
+
+    handlers = set()
+    signal.signal(signal.SIGTERM, raise_shutdown)
+    signal.signal(signal.SIGINT, raise_shutdown)
+    try:
         while True:
             client_socket, client_address = server_socket.accept()
-            handler = HTTPClientHandler(client_socket, client_address, ROOT_DIR)
+            handler = HTTPClientHandler(client_socket, client_address, ROOT_DIR, cache, metrics, shutdown,
+                                        args.keepalive_timeout, args.max_requests)
             handler.start()
+            handlers = {h for h in handlers if h.is_alive()}
+            handlers.add(handler)
+    except ShutdownRequested:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        shutdown.set()
+        server_socket.close()
+
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+    for handler in handlers:
+        handler.stop_reading()
+    for handler in handlers:
+        handler.join(max(0, deadline - time.monotonic()))
+
+
+class MetricsPortHandler(HTTPClientHandler):
+
+    serve_files = False
+
+
+def serve_worker_port(server_socket, args, cache, metrics, shutdown):
+    while not shutdown.is_set():
+        try:
+            client_socket, client_address = server_socket.accept()
+        except OSError:
+            return
+        MetricsPortHandler(client_socket, client_address, ROOT_DIR, cache, metrics, shutdown,
+                           args.keepalive_timeout, args.max_requests).start()
+
+
+def create_metrics(cache, worker=None):
+    metrics = HTTPMetrics(worker)
+    metrics.add_collector('http_response_cache', cache.stats, 'Cache de respostas')
+    return metrics
+
+
+def run_worker(index, args):
+    reuse_port = hasattr(socket, 'SO_REUSEPORT')
+    server_socket = create_server_socket(args.port, args.backlog, reuse_port) if reuse_port else args.shared_socket
+    cache = ResponseCache(guess_content_type, args.cache_bytes, args.cache_max_body, args.cache_revalidate,
+                          args.compress_max)
+    metrics = create_metrics(cache, index)
+    shutdown = threading.Event()
+    worker_socket = None
+    if args.worker_port:
+        worker_socket = create_server_socket(args.worker_port + index, args.backlog)
+        threading.Thread(target=serve_worker_port, args=(worker_socket, args, cache, metrics, shutdown),
+                         daemon=True).start()
+    serve(server_socket, args, cache, metrics, shutdown)
+    if worker_socket is not None:
+        worker_socket.close()
+    print(f"[Worker {index}] Encerrado")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor HTTP simples')
+    parser.add_argument('port', nargs='?', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--keepalive-timeout', type=float, default=KEEPALIVE_TIMEOUT,
+                        help='segundos que uma conexão ociosa permanece aberta')
+    parser.add_argument('--max-requests', type=int, default=MAX_KEEPALIVE_REQUESTS,
+                        help='máximo de requisições por conexão (1 desativa keep-alive)')
+    parser.add_argument('--cache-bytes', type=int, default=DEFAULT_MAX_BYTES,
+                        help='orçamento do cache de respostas em bytes (0 desativa o cache e a compressão)')
+    parser.add_argument('--cache-max-body', type=int, default=DEFAULT_MAX_BODY_SIZE,
+                        help='maior corpo mantido em memória pelo cache')
+    parser.add_argument('--cache-revalidate', type=float, default=DEFAULT_REVALIDATE_INTERVAL,
+                        help='segundos entre verificações de mtime/tamanho de uma entrada')
+    parser.add_argument('--compress-max', type=int, default=DEFAULT_MAX_COMPRESS_SIZE,
+                        help='maior arquivo comprimido com gzip/br para o cache, em segundo plano; '
+                             'a primeira resposta sai sem compressão (0 desativa)')
+    parser.add_argument('--event-loop', action='store_true',
+                        help='atende todas as conexões em uma única thread com selectors/epoll')
+    parser.add_argument('--backlog', type=int, default=BACKLOG,
+                        help='tamanho da fila de conexões pendentes do listen()')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processos worker pré-criados com SO_REUSEPORT (1 atende no próprio processo)')
+    parser.add_argument('--worker-port', type=int, default=0,
+                        help='com --workers, o worker N também escuta em WORKER_PORT+N; essa porta só responde '
+                             f'{METRICS_PATH}, com os contadores do próprio worker e o rótulo worker="N"')
+    args = parser.parse_args()
+    port = args.port
+
+    os.makedirs(ROOT_DIR, exist_ok=True)
+    raise_nofile_limit()
+
+    print('=' * 60)
+    print('Servidor HTTP simples (TCP) iniciado')
+    print(f'Escutando em http://{HOST}:{port}')
+    print(f'Diretório raiz: {os.path.abspath(ROOT_DIR)}')
+    print(f'Keep-alive: {args.max_requests} requisições, {args.keepalive_timeout:g}s ocioso')
+    print(f"Modelo: {'laço de eventos (selectors)' if args.event_loop else 'uma thread por conexão'}")
+
+    if args.workers > 1:
+        print(f"Workers: {args.workers} processos")
+        if args.worker_port:
+            print(f"Métricas por worker em http://{HOST}:{args.worker_port}..{args.worker_port + args.workers - 1}"
+                  f"{METRICS_PATH}")
+        else:
+            print(f"{METRICS_PATH} mostra o worker que atendeu a conexão (rótulo worker); "
+                  "use --worker-port para coletar cada um")
+        print('=' * 60)
+        args.shared_socket = None
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            args.shared_socket = create_server_socket(port, args.backlog)
+        WorkerSupervisor(args.workers, lambda index: run_worker(index, args)).run()
+        return
+
+    print(f"Métricas em {METRICS_PATH}. Digite 'stats' para ver o cache e as métricas ou 'quit' para parar")
+    print('=' * 60)
+
+    cache = ResponseCache(guess_content_type, args.cache_bytes, args.cache_max_body, args.cache_revalidate,
+                          args.compress_max)
+    metrics = create_metrics(cache)
+    threading.Thread(target=console_input_thread, args=(cache, metrics), daemon=True).start()
+    serve(create_server_socket(port, args.backlog), args, cache, metrics)
 
 
 if __name__ == '__main__':
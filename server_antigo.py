@@ -1,52 +1,152 @@
+import argparse
 import socket
 import threading
 import os
 import sys
+import time
+from collections import deque
 from protocol import (
-    MSG_QUIT, MSG_FILE, MSG_CHAT,
-    send_message, receive_message, send_file
+    MSG_QUIT, MSG_FILE, MSG_CHAT, MSG_HELLO, MSG_ECHO, MSG_STATS, MSG_JOIN, MSG_LEAVE, MSG_ROOM,
+    MSG_HISTORY, MSG_HISTORY_END, MSG_FILE_ERROR, MSG_DELTA_REQUEST, MSG_DELTA_END,
+    CAP_SENDFILE, CAP_TRAILER, CAP_RANGE, CAP_BLOCKS, CAP_STREAMS, CAP_ECHO, CAP_STATS, CAP_ROOMS, CAP_HISTORY,
+    CAP_DELTA,
+    HASH_TRAILER, HASH_NONE, RANGE_ERROR, STREAM_ERROR, TRANSFER_FRAMED, TRANSFER_SENDFILE,
+    MAX_STREAMS, STREAM_NOTSENT_LOWAT,
+    Message, FrameDecoder, FileStream, send_buffers, send_items, send_message, send_file, stream_frame, serialize_frame,
+    encode_capabilities, decode_capabilities, decode_file_request, decode_range, decode_stream_id,
+    encode_room_message, decode_room_message, decode_history_request, encode_history_end,
+    decode_delta_request, encode_delta_end
+)
+from compression import available_codecs, choose_codec
+from delta import DeltaTransfer, unpack_signatures
+from hash_cache import FileHashCache, DEFAULT_MAX_ENTRIES, INDEX_FILENAME, INDEX_FLUSH_INTERVAL
+from history import (
+    HistoryStore, GLOBAL_CHANNEL, PAGE_SIZE as HISTORY_PAGE_SIZE,
+    DEFAULT_MAX_MESSAGES as HISTORY_MAX_MESSAGES, DEFAULT_MAX_BYTES as HISTORY_MAX_BYTES,
+    DEFAULT_MAX_CHANNELS as HISTORY_MAX_CHANNELS
+)
+from metrics import ChatMetrics, CountingSocket
+from rooms import RoomIndex, MAX_ROOMS_PER_CLIENT, valid_room_name
+from send_queue import (
+    SendQueue, send_queue_stats, SLOW_CLIENT_POLICIES,
+    POLICY_DROP, DEFAULT_MAX_FRAMES, DEFAULT_MAX_BYTES
 )
 
 HOST = '0.0.0.0'
 PORT = 5555
 FILES_DIR = 'server_files'
+BACKLOG = 1024
+
+SERVER_CAPABILITIES = {CAP_SENDFILE, CAP_TRAILER, CAP_RANGE, CAP_BLOCKS, CAP_STREAMS, CAP_ECHO, CAP_STATS, CAP_ROOMS, CAP_HISTORY,
+                       CAP_DELTA}
 
 clients_lock = threading.Lock()
-clients = []
+clients = {}
 client_counter = 0
+room_index = RoomIndex()
+
+send_queue_max_frames = DEFAULT_MAX_FRAMES
+send_queue_max_bytes = DEFAULT_MAX_BYTES
+slow_client_policy = POLICY_DROP
+hash_cache = None
+history = None
+server_codecs = available_codecs()
+metrics = ChatMetrics()
+
+
+class ClientWriter(threading.Thread):
+    
+    def __init__(self, client_socket, client_id, send_queue):
+        super().__init__(daemon=True)
+        self.socket = client_socket
+        self.client_id = client_id
+        self.send_queue = send_queue
+        self.send_lock = threading.Lock()
+        self.streams = deque()
+        self.streams_lock = threading.Lock()
+    
+    def add_stream(self, stream):
+        with self.streams_lock:
+            if len(self.streams) >= MAX_STREAMS:
+                return False
+            self.streams.append(stream)
+        self.send_queue.wake()
+        return True
+    
+    def next_stream(self):
+        with self.streams_lock:
+            return self.streams.popleft() if self.streams else None
+    
+    def run(self):
+        stream = None
+        try:
+            while True:
+                frames = self.send_queue.wait_batch(0 if self.streams else None)
+                if frames is None:
+                    break
+                
+                stream = self.next_stream()
+                if stream is not None:
+                    frames += stream.next_frames()
+                    if not stream.done:
+                        with self.streams_lock:
+                            self.streams.append(stream)
+                
+                if frames:
+                    with self.send_lock:
+                        send_items(self.socket, frames)
+                
+                if stream is not None and stream.done:
+                    stream.close()
+                    metrics.file_transfer(stream.started, not stream.failed)
+                    if stream.failed:
+                        print(f"[Cliente {self.client_id}] Falha ao enviar arquivo '{stream.filename}' (fluxo {stream.stream_id})")
+                    else:
+                        print(f"[Cliente {self.client_id}] Arquivo '{stream.filename}' enviado com sucesso (fluxo {stream.stream_id})")
+        
+        except OSError as e:
+            print(f"[Cliente {self.client_id}] Erro ao enviar: {e}")
+            self.send_queue.close()
+        
+        finally:
+            if stream is not None:
+                stream.close()
+            with self.streams_lock:
+                for stream in self.streams:
+                    stream.close()
+                self.streams.clear()
 
 
 class ClientHandler(threading.Thread):
     
     def __init__(self, client_socket, client_address, client_id):
         super().__init__()
-        self.socket = client_socket
+        self.socket = CountingSocket(client_socket, metrics.bytes_received, metrics.bytes_sent)
         self.address = client_address
         self.client_id = client_id
         self.running = True
+        self.capabilities = set()
+        self.codec = None
+        self.rooms = set()
+        self.decoder = FrameDecoder(accept_raw=False)
+        self.send_queue = SendQueue(send_queue_max_frames, send_queue_max_bytes, slow_client_policy)
+        self.writer = ClientWriter(self.socket, client_id, self.send_queue)
         
     def run(self):
         print(f"[Cliente {self.client_id}] Conectado de {self.address}")
+        metrics.connected()
+        
+        self.writer.start()
         
         try:
             while self.running:
-                msg_type, payload = receive_message(self.socket)
-                
-                if msg_type is None:
+                if self.decoder.recv_into(self.socket) == 0:
                     break
                 
-                if msg_type == MSG_QUIT:
-                    self.handle_quit()
-                    break
-                    
-                elif msg_type == MSG_FILE:
-                    self.handle_file_request(payload)
-                    
-                elif msg_type == MSG_CHAT:
-                    self.handle_chat_message(payload)
-                    
-                else:
-                    print(f"[Cliente {self.client_id}] Comando desconhecido: {msg_type}")
+                for msg_type, payload in self.decoder.frames():
+                    self.handle_message(msg_type, payload)
+                    if not self.running:
+                        break
                     
         except Exception as e:
             print(f"[Cliente {self.client_id}] Erro: {e}")
@@ -54,38 +154,235 @@ class ClientHandler(threading.Thread):
         finally:
             self.cleanup()
     
+    def handle_message(self, msg_type, payload):
+        metrics.frame_received(msg_type)
+        
+        if msg_type == MSG_QUIT:
+            self.handle_quit()
+            
+        elif msg_type == MSG_FILE:
+            self.handle_file_request(payload)
+            
+        elif msg_type == MSG_CHAT:
+            self.handle_chat_message(payload)
+            
+        elif msg_type == MSG_HELLO:
+            self.handle_hello(payload)
+            
+        elif msg_type == MSG_ECHO:
+            self.send_frame(MSG_ECHO, bytes(payload))
+            
+        elif msg_type == MSG_STATS:
+            self.send_frame(MSG_STATS, metrics.render().encode('utf-8'))
+            
+        elif msg_type == MSG_JOIN:
+            self.handle_join(payload)
+            
+        elif msg_type == MSG_LEAVE:
+            self.handle_leave(payload)
+            
+        elif msg_type == MSG_ROOM:
+            self.handle_room_message(payload)
+            
+        elif msg_type == MSG_HISTORY:
+            self.handle_history(payload)
+            
+        elif msg_type == MSG_DELTA_REQUEST:
+            self.handle_delta_request(payload)
+            
+        else:
+            print(f"[Cliente {self.client_id}] Comando desconhecido: {msg_type}")
+    
     def handle_quit(self):
         print(f"[Cliente {self.client_id}] Requisição de desconexão")
         self.running = False
     
+    def handle_hello(self, payload):
+        offered = decode_capabilities(payload)
+        self.capabilities = offered & SERVER_CAPABILITIES
+        if history is None:
+            self.capabilities.discard(CAP_HISTORY)
+        codec = choose_codec(offered & server_codecs)
+        reply = self.capabilities | {codec} if codec else self.capabilities
+        print(f"[Cliente {self.client_id}] Capacidades: {encode_capabilities(reply) or '-'}")
+        
+        if CAP_STREAMS in self.capabilities and hasattr(socket, 'TCP_NOTSENT_LOWAT'):
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NOTSENT_LOWAT, STREAM_NOTSENT_LOWAT)
+        
+        metrics.frames_sent.inc(MSG_HELLO)
+        with self.writer.send_lock:
+            send_message(self.socket, MSG_HELLO, encode_capabilities(reply))
+            self.codec = codec
+        self.decoder.codec = codec
+    
     def handle_file_request(self, payload):
-        filename = payload.decode('utf-8').strip()
+        filename, options = decode_file_request(payload)
         print(f"[Cliente {self.client_id}] Solicitou arquivo: '{filename}'")
         
         filepath = os.path.join(FILES_DIR, filename)
         
-        success = send_file(self.socket, filepath)
+        stream_id = None
+        if CAP_STREAMS in self.capabilities and 'stream' in options:
+            try:
+                stream_id = decode_stream_id(options)
+            except ValueError:
+                self.send_file_error(None, STREAM_ERROR)
+                return
+        
+        mode = TRANSFER_FRAMED
+        if options.get('mode') == TRANSFER_SENDFILE and CAP_SENDFILE in self.capabilities:
+            mode = TRANSFER_SENDFILE
+        trailer = options.get('hash') == HASH_TRAILER and CAP_TRAILER in self.capabilities
+        blocks = options.get('blocks') == '1' and CAP_BLOCKS in self.capabilities
+        send_hash = options.get('hash') != HASH_NONE
+        
+        offset, length = 0, None
+        if CAP_RANGE in self.capabilities:
+            try:
+                offset, length = decode_range(options)
+            except ValueError:
+                self.send_file_error(stream_id, RANGE_ERROR)
+                return
+        
+        if stream_id is not None:
+            stream = FileStream(stream_id, filepath, hash_cache, trailer, offset, length, blocks, send_hash,
+                                codec=self.codec, raw=mode == TRANSFER_SENDFILE)
+            if not self.writer.add_stream(stream):
+                stream.close()
+                self.send_file_error(stream_id, "Limite de transferências simultâneas atingido")
+            return
+        
+        started = time.perf_counter()
+        success = send_file(self.socket, filepath, mode=mode, hash_cache=hash_cache, trailer=trailer,
+                            offset=offset, length=length, blocks=blocks, send_hash=send_hash,
+                            codec=self.codec, send_lock=self.writer.send_lock)
+        metrics.file_transfer(started, success)
         
         if success:
             print(f"[Cliente {self.client_id}] Arquivo '{filename}' enviado com sucesso")
         else:
             print(f"[Cliente {self.client_id}] Falha ao enviar arquivo '{filename}'")
     
+    def handle_delta_request(self, payload):
+        try:
+            filename, basis_size, block_size, signatures = decode_delta_request(payload)
+            signatures = unpack_signatures(signatures, basis_size, block_size)
+        except ValueError:
+            self.send_frame(MSG_DELTA_END, encode_delta_end('', error="Pedido de delta inválido").encode('utf-8'))
+            return
+        print(f"[Cliente {self.client_id}] Solicitou delta de '{filename}' ({len(signatures)} blocos de {block_size} bytes)")
+        
+        filepath = os.path.join(FILES_DIR, os.path.basename(filename))
+        transfer = DeltaTransfer(filepath, signatures, block_size, basis_size, hash_cache, self.codec)
+        started = time.perf_counter()
+        try:
+            while True:
+                frames = transfer.next_frames()
+                if not frames:
+                    break
+                with self.writer.send_lock:
+                    send_buffers(self.socket, frames)
+        finally:
+            transfer.close()
+        
+        metrics.file_transfer(started, transfer.error is None)
+        
+        if transfer.error is None:
+            print(f"[Cliente {self.client_id}] Delta de '{filename}' enviado: {transfer.literal_bytes} bytes literais")
+        else:
+            print(f"[Cliente {self.client_id}] Falha no delta de '{filename}': {transfer.error}")
+    
+    def send_file_error(self, stream_id, error):
+        metrics.frames_sent.inc(MSG_FILE_ERROR)
+        if stream_id is None:
+            frame = Message(MSG_FILE_ERROR, error).serialize()
+        else:
+            frame = stream_frame(MSG_FILE_ERROR, stream_id, error)
+        
+        with self.writer.send_lock:
+            send_buffers(self.socket, [frame])
+    
     def handle_chat_message(self, payload):
-        message = payload.decode('utf-8')
+        message = bytes(payload).decode('utf-8')
         print(f"[CHAT] Cliente {self.client_id}: {message}")
     
-    def send_chat(self, message):
+    def handle_join(self, payload):
+        room, _ = decode_room_message(payload)
+        if not valid_room_name(room):
+            self.send_frame(MSG_CHAT, "[SERVIDOR]: Nome de sala inválido")
+            return
+        if room not in self.rooms and len(self.rooms) >= MAX_ROOMS_PER_CLIENT:
+            self.send_frame(MSG_CHAT, f"[SERVIDOR]: Limite de {MAX_ROOMS_PER_CLIENT} salas atingido")
+            return
+        
+        self.rooms.add(room)
+        count = room_index.join(room, self.client_id, self)
+        print(f"[Cliente {self.client_id}] Entrou na sala '{room}' ({count} membros)")
+        self.send_frame(MSG_JOIN, encode_room_message(room, str(count)))
+    
+    def handle_leave(self, payload):
+        room, _ = decode_room_message(payload)
+        if room in self.rooms:
+            self.rooms.discard(room)
+            room_index.leave(room, self.client_id)
+            print(f"[Cliente {self.client_id}] Saiu da sala '{room}'")
+        self.send_frame(MSG_LEAVE, encode_room_message(room))
+    
+    def handle_room_message(self, payload):
+        room, message = decode_room_message(payload)
+        if room not in self.rooms:
+            self.send_frame(MSG_CHAT, f"[SERVIDOR]: Você não está na sala '{room}'")
+            return
+        
+        print(f"[SALA {room}] Cliente {self.client_id}: {message}")
+        text = f"Cliente {self.client_id}: {message}"
+        history_frame = history.record(room, text) if history is not None else None
+        members = [handler for client_id, handler in room_index.members(room).items() if client_id != self.client_id]
+        fan_out(members, MSG_ROOM, encode_room_message(room, text).encode('utf-8'), history_frame)
+    
+    def handle_history(self, payload):
         try:
-            send_message(self.socket, MSG_CHAT, message)
-        except Exception as e:
-            print(f"[Cliente {self.client_id}] Erro ao enviar chat: {e}")
+            channel, since, limit = decode_history_request(payload)
+        except (ValueError, KeyError):
+            self.send_frame(MSG_CHAT, "[SERVIDOR]: Pedido de histórico inválido")
+            return
+        if channel != GLOBAL_CHANNEL and channel not in self.rooms:
+            self.send_frame(MSG_CHAT, f"[SERVIDOR]: Você não está na sala '{channel}'")
+            return
+        
+        frames, first, next_seq, more = [], 1, 1, False
+        if history is not None:
+            frames, first, next_seq, more = history.page(channel, since, min(limit or HISTORY_PAGE_SIZE,
+                                                                             HISTORY_PAGE_SIZE))
+        metrics.frames_sent.inc(MSG_HISTORY, amount=len(frames))
+        metrics.frames_sent.inc(MSG_HISTORY_END)
+        frames.append(serialize_frame(MSG_HISTORY_END, encode_history_end(channel, first, next_seq, more)))
+        self.put_frame(b''.join(frames))
+    
+    def send_frame(self, msg_type, payload):
+        metrics.frames_sent.inc(msg_type)
+        self.put_frame(serialize_frame(msg_type, payload, self.codec))
+    
+    def put_frame(self, frame):
+        if not self.send_queue.put(frame, control=True):
+            print(f"[Cliente {self.client_id}] Fila de envio cheia, desconectando")
+            disconnect_client(self.socket)
+    
+    def send_chat(self, message):
+        self.send_frame(MSG_CHAT, message)
     
     def cleanup(self):
         print(f"[Cliente {self.client_id}] Desconectado")
+        metrics.disconnected()
+        
+        for room in self.rooms:
+            room_index.leave(room, self.client_id)
+        self.rooms.clear()
         
         with clients_lock:
-            clients[:] = [c for c in clients if c[2] != self.client_id]
+            clients.pop(self.client_id, None)
+        
+        self.send_queue.close()
         
         try:
             self.socket.close()
@@ -93,17 +390,50 @@ class ClientHandler(threading.Thread):
             pass
 
 
+def disconnect_client(client_socket):
+    try:
+        client_socket.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def fan_out(handlers, msg_type, payload, history_frame=None):
+    frames = {}
+    replayable = 0
+    
+    for handler in handlers:
+        if history_frame is not None and CAP_HISTORY in handler.capabilities:
+            frame = history_frame
+            replayable += 1
+        else:
+            frame = frames.get(handler.codec)
+            if frame is None:
+                frame = frames[handler.codec] = serialize_frame(msg_type, payload, handler.codec)
+        if not handler.send_queue.put(frame):
+            print(f"[Servidor] Cliente {handler.client_id} não acompanha as mensagens, desconectando")
+            disconnect_client(handler.socket)
+    
+    metrics.frames_sent.inc(msg_type, amount=len(handlers) - replayable)
+    metrics.frames_sent.inc(MSG_HISTORY, amount=replayable)
+
+
 def broadcast_message(message, exclude_id=None):
+    history_frame = history.record(GLOBAL_CHANNEL, message) if history is not None else None
     with clients_lock:
-        for client_socket, client_addr, client_id in clients:
-            if exclude_id is None or client_id != exclude_id:
-                try:
-                    send_message(client_socket, MSG_CHAT, message)
-                except Exception as e:
-                    print(f"[Servidor] Erro ao enviar para Cliente {client_id}: {e}")
+        targets = [handler for client_id, (_, _, handler) in clients.items() if client_id != exclude_id]
+    fan_out(targets, MSG_CHAT, message.encode('utf-8'), history_frame)
+
 
+def print_stats():
+    counters = send_queue_stats.snapshot()
+    print("[Stats] Filas de envio: " + ', '.join(f"{k}={v}" for k, v in counters.items()))
+    if hash_cache is not None:
+        counters = hash_cache.stats()
+        print("[Stats] Cache de hashes: " + ', '.join(f"{k}={v}" for k, v in counters.items()))
+    print(metrics.render(), end='')
 
-def console_input_thread():
+
+def console_input_thread(broadcast=broadcast_message):
     print("\n[Servidor] Digite mensagens para enviar a todos os clientes (ou 'quit' para parar):\n")
     
     while True:
@@ -114,8 +444,12 @@ def console_input_thread():
                 print("[Servidor] Encerrando...")
                 os._exit(0)
                 
+            if message.strip().lower() == 'stats':
+                print_stats()
+                continue
+                
             if message.strip():
-                broadcast_message(f"[SERVIDOR]: {message}")
+                broadcast(f"[SERVIDOR]: {message}")
                 print(f"[Broadcast] Mensagem enviada: {message}")
                 
         except EOFError:
@@ -124,22 +458,83 @@ def console_input_thread():
             print(f"[Servidor] Erro no console: {e}")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description='Servidor TCP de chat e transferência de arquivos')
+    parser.add_argument('--port', type=int, default=PORT, help=f'porta de escuta (padrão {PORT})')
+    parser.add_argument('--dir', default=FILES_DIR, help=f'diretório de arquivos (padrão {FILES_DIR})')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='usa o motor asyncio (todas as conexões em uma única thread)')
+    parser.add_argument('--queue-frames', type=int, default=DEFAULT_MAX_FRAMES,
+                        help='máximo de mensagens pendentes por cliente')
+    parser.add_argument('--queue-bytes', type=int, default=DEFAULT_MAX_BYTES,
+                        help='máximo de bytes pendentes por cliente')
+    parser.add_argument('--slow-policy', choices=SLOW_CLIENT_POLICIES, default=POLICY_DROP,
+                        help='o que fazer com clientes que não acompanham: descartar as novas, desconectar ou '
+                             'descartar as mais antigas (respostas ao próprio cliente nunca são descartadas)')
+    parser.add_argument('--hash-cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help='entradas no cache de hashes em memória (0 desativa)')
+    parser.add_argument('--hash-index', action='store_true',
+                        help=f'persiste o cache de hashes em {INDEX_FILENAME} no diretório de arquivos '
+                             f'(gravado a cada {INDEX_FLUSH_INTERVAL:g}s e ao encerrar)')
+    parser.add_argument('--history-messages', type=int, default=HISTORY_MAX_MESSAGES,
+                        help='mensagens guardadas por canal para replay (0 desativa o histórico)')
+    parser.add_argument('--history-bytes', type=int, default=HISTORY_MAX_BYTES,
+                        help='orçamento de bytes do histórico por canal')
+    parser.add_argument('--history-channels', type=int, default=HISTORY_MAX_CHANNELS,
+                        help='máximo de salas com histórico, além do chat geral, que nunca é descartado; '
+                             'a memória total fica limitada a (salas + 1) x --history-bytes '
+                             f'({(HISTORY_MAX_CHANNELS + 1) * HISTORY_MAX_BYTES // (1024 * 1024)} MiB no padrão)')
+    parser.add_argument('--codecs', default=','.join(sorted(available_codecs())),
+                        help="codecs de compressão aceitos, separados por vírgula ('none' desativa)")
+    return parser.parse_args()
+
+
 def main():
-    global client_counter
+    global client_counter, send_queue_max_frames, send_queue_max_bytes, slow_client_policy, FILES_DIR
+    global hash_cache, history, server_codecs
+    
+    args = parse_args()
+    FILES_DIR = args.dir
+    send_queue_max_frames = args.queue_frames
+    send_queue_max_bytes = args.queue_bytes
+    slow_client_policy = args.slow_policy
+    server_codecs = decode_capabilities(args.codecs.encode('utf-8')) & available_codecs()
     
     os.makedirs(FILES_DIR, exist_ok=True)
     
+    if args.hash_cache_size > 0:
+        index_path = os.path.join(FILES_DIR, INDEX_FILENAME) if args.hash_index else None
+        hash_cache = FileHashCache(args.hash_cache_size, index_path)
+        metrics.add_collector('chat_hash_cache', hash_cache.stats, 'Cache de hashes')
+    metrics.add_collector('chat_send_queue', send_queue_stats.snapshot, 'Filas de envio')
+    
+    if args.history_messages > 0:
+        history = HistoryStore(args.history_messages, args.history_bytes, args.history_channels)
+        metrics.add_collector('chat_history', history.stats, 'Histórico')
+    
+    if args.use_async:
+        from server_async import run_async_server
+        try:
+            run_async_server(HOST, args.port, FILES_DIR, console=console_input_thread,
+                             queue_config=(args.queue_frames, args.queue_bytes, args.slow_policy),
+                             hash_cache=hash_cache, codecs=server_codecs, metrics=metrics, history=history)
+        finally:
+            if hash_cache is not None:
+                hash_cache.close()
+        return
+    
+    metrics.add_collector('chat_rooms', room_index.stats, 'Salas')
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     
     try:
-        server_socket.bind((HOST, PORT))
-        server_socket.listen(5)
+        server_socket.bind((HOST, args.port))
+        server_socket.listen(BACKLOG)
         
         print("="*60)
         print(f"Servidor TCP Multithread iniciado")
-        print(f"Escutando em {HOST}:{PORT}")
+        print(f"Escutando em {HOST}:{args.port}")
         print(f"Diretório de arquivos: {os.path.abspath(FILES_DIR)}")
         print("="*60)
         
@@ -154,11 +549,12 @@ def main():
             client_counter += 1
             client_id = client_counter
             
-            with clients_lock:
-                clients.append((client_socket, client_address, client_id))
-            
             handler = ClientHandler(client_socket, client_address, client_id)
             handler.daemon = True
+            
+            with clients_lock:
+                clients[client_id] = (client_socket, client_address, handler)
+            
             handler.start()
             
     except KeyboardInterrupt:
@@ -169,13 +565,15 @@ def main():
         
     finally:
         with clients_lock:
-            for client_socket, _, _ in clients:
+            for client_socket, _, _ in clients.values():
                 try:
                     client_socket.close()
                 except:
                     pass
         
         server_socket.close()
+        if hash_cache is not None:
+            hash_cache.close()
         print("[Servidor] Encerrado")
 
 
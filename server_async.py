@@ -0,0 +1,614 @@
+import asyncio
+import functools
+import hashlib
+import os
+import struct
+import socket
+import threading
+import time
+from collections import deque
+from protocol import (
+    CHUNK_SIZE, FILE_BLOCK_SIZE, RECV_BUFFER_SIZE,
+    MSG_QUIT, MSG_FILE, MSG_CHAT,
+    MSG_FILE_OK, MSG_FILE_ERROR, MSG_FILE_META, MSG_FILE_DATA, MSG_FILE_HASH,
+    MSG_FILE_RAW, MSG_HELLO, MSG_ECHO, MSG_STATS, MSG_JOIN, MSG_LEAVE, MSG_ROOM, MSG_HISTORY, MSG_HISTORY_END,
+    MSG_DELTA_REQUEST, MSG_DELTA_END,
+    CAP_SENDFILE, CAP_TRAILER, CAP_RANGE, CAP_BLOCKS, CAP_STREAMS, CAP_ECHO, CAP_STATS, CAP_ROOMS, CAP_HISTORY,
+    CAP_DELTA,
+    HASH_TRAILER, HASH_NONE, RANGE_ERROR, STREAM_ERROR, TRANSFER_FRAMED, TRANSFER_SENDFILE,
+    MAX_STREAMS, STREAM_NOTSENT_LOWAT, SENDFILE_CHUNK_SIZE,
+    Message, FrameDecoder, FileStream, FileRegion, file_hash_payload, pack_file_meta, resolve_range, stream_frame,
+    FrameCompressor, file_codec, serialize_frame,
+    encode_capabilities, decode_capabilities, decode_file_request, decode_range, decode_stream_id,
+    encode_room_message, decode_room_message, decode_history_request, encode_history_end,
+    decode_delta_request, encode_delta_end
+)
+from compression import COMPRESS_CHUNK_SIZE, available_codecs, choose_codec
+from delta import DeltaTransfer, unpack_signatures
+from history import GLOBAL_CHANNEL, PAGE_SIZE as HISTORY_PAGE_SIZE
+from metrics import ChatMetrics, CountingWriter
+from rooms import RoomIndex, MAX_ROOMS_PER_CLIENT, valid_room_name
+from send_queue import SendQueue
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BACKLOG = 1024
+
+SERVER_CAPABILITIES = {CAP_SENDFILE, CAP_TRAILER, CAP_RANGE, CAP_BLOCKS, CAP_STREAMS, CAP_ECHO, CAP_STATS, CAP_ROOMS, CAP_HISTORY,
+                       CAP_DELTA}
+
+
+def raise_nofile_limit():
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def write_message(writer, msg_type, payload=b''):
+    writer.write(Message(msg_type, payload).serialize())
+
+
+async def send_file_async(writer, filepath, mode=TRANSFER_FRAMED, send_lock=None, hash_cache=None,
+                          trailer=False, offset=0, length=None, blocks=False, send_hash=True, codec=None,
+                          metrics=None):
+    raw_started = False
+    try:
+        if not os.path.exists(filepath):
+            write_message(writer, MSG_FILE_ERROR, "Arquivo não encontrado")
+            await writer.drain()
+            return False
+
+        file_stat = os.stat(filepath)
+        file_size = file_stat.st_size
+
+        ranged = offset != 0 or length is not None
+        try:
+            offset, length = resolve_range(file_size, offset, length)
+        except ValueError:
+            write_message(writer, MSG_FILE_ERROR, RANGE_ERROR)
+            await writer.drain()
+            return False
+        trailer = trailer and not ranged and not blocks
+
+        codec = file_codec(filepath, codec, offset)
+        if codec is not None:
+            mode = TRANSFER_FRAMED
+
+        write_message(writer, MSG_FILE_OK)
+
+        loop = asyncio.get_running_loop()
+        hash_payload = None
+        if send_hash and not trailer:
+            hash_payload = await loop.run_in_executor(None, file_hash_payload, filepath, file_size,
+                                                      hash_cache, blocks)
+        elif send_hash and hash_cache:
+            hash_payload = hash_cache.peek(filepath)
+
+        filename = os.path.basename(filepath)
+        if ranged or blocks:
+            metadata = pack_file_meta(filename, file_size, offset, length)
+        else:
+            metadata = pack_file_meta(filename, file_size)
+        write_message(writer, MSG_FILE_META, metadata)
+
+        sha256 = None
+        if hash_payload is not None:
+            write_message(writer, MSG_FILE_HASH, hash_payload)
+        elif send_hash:
+            sha256 = hashlib.sha256()
+
+        if mode == TRANSFER_SENDFILE and length > 0:
+            raw_started = True
+            bytes_sent = 0
+            with open(filepath, 'rb') as f:
+                f.seek(offset)
+                while bytes_sent < length:
+                    chunk_size = min(SENDFILE_CHUNK_SIZE, length - bytes_sent)
+                    async with send_lock:
+                        writer.write(struct.pack('!Q', chunk_size) + MSG_FILE_RAW)
+                        if sha256 is None:
+                            sent = await loop.sendfile(writer.transport, f, offset + bytes_sent, chunk_size)
+                            if metrics is not None:
+                                metrics.bytes_sent.inc(amount=sent)
+                        else:
+                            sent = await write_file_blocks(writer, f, chunk_size, sha256, raw=True)
+                    if sent != chunk_size:
+                        raise ConnectionError(f"Enviados {bytes_sent + sent} de {length} bytes")
+                    bytes_sent += sent
+        else:
+            with open(filepath, 'rb') as f:
+                f.seek(offset)
+                await write_file_blocks(writer, f, length, sha256, codec=codec)
+
+        if sha256 is not None:
+            file_hash = sha256.digest()
+            write_message(writer, MSG_FILE_HASH, file_hash)
+            if hash_cache:
+                hash_cache.update(filepath, file_stat, file_hash)
+
+        await writer.drain()
+        return True
+
+    except ConnectionError:
+        raise
+    except Exception as e:
+        if raw_started:
+            raise
+        print(f"Erro ao enviar arquivo: {e}")
+        write_message(writer, MSG_FILE_ERROR, str(e))
+        return False
+
+
+def read_file_block(f, size, sha256=None, raw=False, compressor=None):
+    block = f.read(size)
+    if not block:
+        return 0, []
+    if sha256 is not None:
+        sha256.update(block)
+    if raw:
+        return len(block), [block]
+
+    view = memoryview(block)
+    if compressor is not None:
+        return len(block), [compressor.frame(MSG_FILE_DATA, view[offset:offset + COMPRESS_CHUNK_SIZE])
+                            for offset in range(0, len(block), COMPRESS_CHUNK_SIZE)]
+    return len(block), [Message(MSG_FILE_DATA, view[offset:offset + CHUNK_SIZE]).serialize()
+                        for offset in range(0, len(block), CHUNK_SIZE)]
+
+
+async def write_file_blocks(writer, f, file_size, sha256=None, raw=False, codec=None):
+    loop = asyncio.get_running_loop()
+    compressor = FrameCompressor(codec) if codec is not None else None
+    bytes_sent = 0
+    while bytes_sent < file_size:
+        size, frames = await loop.run_in_executor(None, read_file_block, f,
+                                                  min(FILE_BLOCK_SIZE, file_size - bytes_sent),
+                                                  sha256, raw, compressor)
+        if not size:
+            break
+        writer.writelines(frames)
+        bytes_sent += size
+        await writer.drain()
+
+    return bytes_sent
+
+
+class AsyncClient:
+
+    def __init__(self, server, reader, writer, client_id):
+        self.server = server
+        self.metrics = server.metrics
+        self.reader = reader
+        self.writer = CountingWriter(writer, server.metrics.bytes_sent)
+        self.client_id = client_id
+        self.address = writer.get_extra_info('peername')
+        self.decoder = FrameDecoder(accept_raw=False)
+        self.running = True
+        self.capabilities = set()
+        self.codec = None
+        self.rooms = set()
+        self.send_lock = asyncio.Lock()
+        self.ready = asyncio.Event()
+        self.send_queue = SendQueue(*server.queue_config, on_ready=self.ready.set)
+        self.streams = deque()
+        self.delta_task = None
+
+    async def write_loop(self):
+        loop = asyncio.get_running_loop()
+        stream = None
+        try:
+            while True:
+                if not self.streams:
+                    await self.ready.wait()
+                self.ready.clear()
+                frames = self.send_queue.pop_all()
+
+                stream = self.streams.popleft() if self.streams else None
+                if stream is not None:
+                    frames += await loop.run_in_executor(None, stream.next_frames)
+                    if not stream.done:
+                        self.streams.append(stream)
+
+                if frames:
+                    async with self.send_lock:
+                        await self.write_items(frames)
+                    await self.writer.drain()
+
+                if stream is not None and stream.done:
+                    stream.close()
+                    self.metrics.file_transfer(stream.started, not stream.failed)
+                    if stream.failed:
+                        print(f"[Cliente {self.client_id}] Falha ao enviar arquivo '{stream.filename}' (fluxo {stream.stream_id})")
+                    else:
+                        print(f"[Cliente {self.client_id}] Arquivo '{stream.filename}' enviado com sucesso (fluxo {stream.stream_id})")
+                if self.send_queue.closed:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            if stream is not None:
+                stream.close()
+            for stream in self.streams:
+                stream.close()
+            self.streams.clear()
+
+    async def write_items(self, items):
+        loop = asyncio.get_running_loop()
+        buffers = []
+        for item in items:
+            if not isinstance(item, FileRegion):
+                buffers.append(item)
+                continue
+            if buffers:
+                self.writer.writelines(buffers)
+                buffers = []
+            sent = await loop.sendfile(self.writer.transport, item.file, item.offset, item.count)
+            self.metrics.bytes_sent.inc(amount=sent)
+            if sent != item.count:
+                raise ConnectionError(f"Enviados {sent} de {item.count} bytes")
+        if buffers:
+            self.writer.writelines(buffers)
+
+    def send_frame(self, msg_type, payload):
+        self.metrics.frames_sent.inc(msg_type)
+        self.enqueue(serialize_frame(msg_type, payload, self.codec), control=True)
+
+    def enqueue(self, frame, control=False):
+        if not self.send_queue.put(frame, control):
+            print(f"[Servidor] Cliente {self.client_id} não acompanha as mensagens, desconectando")
+            self.writer.transport.abort()
+
+    async def run(self):
+        print(f"[Cliente {self.client_id}] Conectado de {self.address}")
+
+        writer_task = asyncio.create_task(self.write_loop())
+
+        try:
+            while self.running:
+                data = await self.reader.read(RECV_BUFFER_SIZE)
+                if not data:
+                    break
+
+                self.metrics.bytes_received.inc(amount=len(data))
+                self.decoder.feed(data)
+                for msg_type, payload in self.decoder.frames():
+                    await self.handle_message(msg_type, payload)
+                    if not self.running:
+                        break
+
+        except ConnectionError:
+            pass
+        except Exception as e:
+            print(f"[Cliente {self.client_id}] Erro: {e}")
+
+        finally:
+            self.send_queue.close()
+            writer_task.cancel()
+            await self.cleanup()
+
+    async def handle_message(self, msg_type, payload):
+        self.metrics.frame_received(msg_type)
+
+        if msg_type == MSG_QUIT:
+            print(f"[Cliente {self.client_id}] Requisição de desconexão")
+            self.running = False
+
+        elif msg_type == MSG_FILE:
+            await self.handle_file_request(payload)
+
+        elif msg_type == MSG_CHAT:
+            self.handle_chat_message(payload)
+
+        elif msg_type == MSG_ECHO:
+            self.send_frame(MSG_ECHO, bytes(payload))
+
+        elif msg_type == MSG_STATS:
+            self.send_frame(MSG_STATS, self.metrics.render().encode('utf-8'))
+
+        elif msg_type == MSG_JOIN:
+            self.handle_join(payload)
+
+        elif msg_type == MSG_LEAVE:
+            self.handle_leave(payload)
+
+        elif msg_type == MSG_ROOM:
+            self.handle_room_message(payload)
+
+        elif msg_type == MSG_HISTORY:
+            self.handle_history(payload)
+
+        elif msg_type == MSG_DELTA_REQUEST:
+            self.start_delta(payload)
+
+        elif msg_type == MSG_HELLO:
+            offered = decode_capabilities(payload)
+            self.capabilities = offered & SERVER_CAPABILITIES
+            if self.server.history is None:
+                self.capabilities.discard(CAP_HISTORY)
+            codec = choose_codec(offered & self.server.codecs)
+            reply = self.capabilities | {codec} if codec else self.capabilities
+            print(f"[Cliente {self.client_id}] Capacidades: {encode_capabilities(reply) or '-'}")
+            self.metrics.frames_sent.inc(MSG_HELLO)
+            write_message(self.writer, MSG_HELLO, encode_capabilities(reply))
+            self.codec = self.decoder.codec = codec
+
+            sock = self.writer.get_extra_info('socket')
+            if CAP_STREAMS in self.capabilities and sock is not None and hasattr(socket, 'TCP_NOTSENT_LOWAT'):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NOTSENT_LOWAT, STREAM_NOTSENT_LOWAT)
+
+        else:
+            print(f"[Cliente {self.client_id}] Comando desconhecido: {msg_type}")
+
+    async def handle_file_request(self, payload):
+        filename, options = decode_file_request(payload)
+        print(f"[Cliente {self.client_id}] Solicitou arquivo: '{filename}'")
+
+        filepath = os.path.join(self.server.files_dir, filename)
+
+        stream_id = None
+        if CAP_STREAMS in self.capabilities and 'stream' in options:
+            try:
+                stream_id = decode_stream_id(options)
+            except ValueError:
+                self.send_file_error(None, STREAM_ERROR)
+                return
+
+        mode = TRANSFER_FRAMED
+        if options.get('mode') == TRANSFER_SENDFILE and CAP_SENDFILE in self.capabilities:
+            mode = TRANSFER_SENDFILE
+
+        trailer = options.get('hash') == HASH_TRAILER and CAP_TRAILER in self.capabilities
+        blocks = options.get('blocks') == '1' and CAP_BLOCKS in self.capabilities
+        send_hash = options.get('hash') != HASH_NONE
+
+        offset, length = 0, None
+        if CAP_RANGE in self.capabilities:
+            try:
+                offset, length = decode_range(options)
+            except ValueError:
+                self.send_file_error(stream_id, RANGE_ERROR)
+                return
+
+        if stream_id is not None:
+            await self.start_stream(stream_id, filepath, trailer, offset, length, blocks, send_hash,
+                                    mode == TRANSFER_SENDFILE)
+            return
+
+        started = time.perf_counter()
+        success = await send_file_async(self.writer, filepath, mode, self.send_lock,
+                                        self.server.hash_cache, trailer, offset, length, blocks,
+                                        send_hash, self.codec, self.metrics)
+        self.metrics.file_transfer(started, success)
+
+        if success:
+            print(f"[Cliente {self.client_id}] Arquivo '{filename}' enviado com sucesso")
+        else:
+            print(f"[Cliente {self.client_id}] Falha ao enviar arquivo '{filename}'")
+
+    async def start_stream(self, stream_id, filepath, trailer, offset, length, blocks, send_hash, raw):
+        if len(self.streams) >= MAX_STREAMS:
+            self.send_file_error(stream_id, "Limite de transferências simultâneas atingido")
+            return
+
+        loop = asyncio.get_running_loop()
+        create_stream = functools.partial(FileStream, stream_id, filepath, self.server.hash_cache, trailer,
+                                          offset, length, blocks, send_hash, codec=self.codec, raw=raw)
+        stream = await loop.run_in_executor(None, create_stream)
+        self.streams.append(stream)
+        self.ready.set()
+
+    def start_delta(self, payload):
+        if self.delta_task is not None and not self.delta_task.done():
+            self.send_frame(MSG_DELTA_END, encode_delta_end('', error="Sincronização já em andamento").encode('utf-8'))
+            return
+        try:
+            filename, basis_size, block_size, signatures = decode_delta_request(payload)
+            signatures = unpack_signatures(signatures, basis_size, block_size)
+        except ValueError:
+            self.send_frame(MSG_DELTA_END, encode_delta_end('', error="Pedido de delta inválido").encode('utf-8'))
+            return
+        self.delta_task = asyncio.create_task(self.handle_delta_request(filename, basis_size, block_size, signatures))
+
+    async def handle_delta_request(self, filename, basis_size, block_size, signatures):
+        print(f"[Cliente {self.client_id}] Solicitou delta de '{filename}' ({len(signatures)} blocos de {block_size} bytes)")
+
+        filepath = os.path.join(self.server.files_dir, os.path.basename(filename))
+        transfer = DeltaTransfer(filepath, signatures, block_size, basis_size, self.server.hash_cache, self.codec)
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        completed = False
+        try:
+            while not self.writer.is_closing():
+                frames = await loop.run_in_executor(None, transfer.next_frames)
+                if not frames:
+                    completed = True
+                    break
+                async with self.send_lock:
+                    self.writer.writelines(frames)
+                await self.writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            await loop.run_in_executor(None, transfer.close)
+
+        self.metrics.file_transfer(started, completed and transfer.error is None)
+
+        if not completed:
+            print(f"[Cliente {self.client_id}] Delta de '{filename}' interrompido: conexão encerrada")
+        elif transfer.error is None:
+            print(f"[Cliente {self.client_id}] Delta de '{filename}' enviado: {transfer.literal_bytes} bytes literais")
+        else:
+            print(f"[Cliente {self.client_id}] Falha no delta de '{filename}': {transfer.error}")
+
+    def send_file_error(self, stream_id, error):
+        self.metrics.frames_sent.inc(MSG_FILE_ERROR)
+        if stream_id is None:
+            write_message(self.writer, MSG_FILE_ERROR, error)
+        else:
+            self.writer.write(stream_frame(MSG_FILE_ERROR, stream_id, error))
+
+    def handle_chat_message(self, payload):
+        message = bytes(payload).decode('utf-8')
+        print(f"[CHAT] Cliente {self.client_id}: {message}")
+
+    def handle_join(self, payload):
+        room, _ = decode_room_message(payload)
+        if not valid_room_name(room):
+            self.send_frame(MSG_CHAT, "[SERVIDOR]: Nome de sala inválido")
+            return
+        if room not in self.rooms and len(self.rooms) >= MAX_ROOMS_PER_CLIENT:
+            self.send_frame(MSG_CHAT, f"[SERVIDOR]: Limite de {MAX_ROOMS_PER_CLIENT} salas atingido")
+            return
+
+        self.rooms.add(room)
+        count = self.server.rooms.join(room, self.client_id, self)
+        print(f"[Cliente {self.client_id}] Entrou na sala '{room}' ({count} membros)")
+        self.send_frame(MSG_JOIN, encode_room_message(room, str(count)))
+
+    def handle_leave(self, payload):
+        room, _ = decode_room_message(payload)
+        if room in self.rooms:
+            self.rooms.discard(room)
+            self.server.rooms.leave(room, self.client_id)
+            print(f"[Cliente {self.client_id}] Saiu da sala '{room}'")
+        self.send_frame(MSG_LEAVE, encode_room_message(room))
+
+    def handle_room_message(self, payload):
+        room, message = decode_room_message(payload)
+        if room not in self.rooms:
+            self.send_frame(MSG_CHAT, f"[SERVIDOR]: Você não está na sala '{room}'")
+            return
+
+        print(f"[SALA {room}] Cliente {self.client_id}: {message}")
+        text = f"Cliente {self.client_id}: {message}"
+        history = self.server.history
+        history_frame = history.record(room, text) if history is not None else None
+        members = [client for client_id, client in self.server.rooms.members(room).items()
+                   if client_id != self.client_id]
+        self.server.fan_out(members, MSG_ROOM, encode_room_message(room, text).encode('utf-8'), history_frame)
+
+    def handle_history(self, payload):
+        try:
+            channel, since, limit = decode_history_request(payload)
+        except (ValueError, KeyError):
+            self.send_frame(MSG_CHAT, "[SERVIDOR]: Pedido de histórico inválido")
+            return
+        if channel != GLOBAL_CHANNEL and channel not in self.rooms:
+            self.send_frame(MSG_CHAT, f"[SERVIDOR]: Você não está na sala '{channel}'")
+            return
+
+        frames, first, next_seq, more = [], 1, 1, False
+        if self.server.history is not None:
+            frames, first, next_seq, more = self.server.history.page(
+                channel, since, min(limit or HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE))
+        self.metrics.frames_sent.inc(MSG_HISTORY, amount=len(frames))
+        self.metrics.frames_sent.inc(MSG_HISTORY_END)
+        frames.append(serialize_frame(MSG_HISTORY_END, encode_history_end(channel, first, next_seq, more)))
+        self.enqueue(b''.join(frames), control=True)
+
+    async def cleanup(self):
+        print(f"[Cliente {self.client_id}] Desconectado")
+
+        for room in self.rooms:
+            self.server.rooms.leave(room, self.client_id)
+        self.rooms.clear()
+
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+
+
+class AsyncChatServer:
+
+    def __init__(self, host, port, files_dir, queue_config=(), hash_cache=None, codecs=None, metrics=None,
+                 history=None):
+        self.host = host
+        self.port = port
+        self.files_dir = files_dir
+        self.queue_config = queue_config
+        self.hash_cache = hash_cache
+        self.codecs = available_codecs() if codecs is None else codecs
+        self.metrics = ChatMetrics() if metrics is None else metrics
+        self.history = history
+        self.rooms = RoomIndex()
+        self.metrics.add_collector('chat_rooms', self.rooms.stats, 'Salas')
+        self.clients = {}
+        self.client_counter = 0
+        self.loop = None
+
+    async def handle_connection(self, reader, writer):
+        self.client_counter += 1
+        client = AsyncClient(self, reader, writer, self.client_counter)
+        self.clients[client.client_id] = client
+        self.metrics.connected()
+
+        try:
+            await client.run()
+        finally:
+            self.clients.pop(client.client_id, None)
+            self.metrics.disconnected()
+
+    def fan_out(self, clients, msg_type, payload, history_frame=None):
+        frames = {}
+        replayable = 0
+        for client in clients:
+            if history_frame is not None and CAP_HISTORY in client.capabilities:
+                frame = history_frame
+                replayable += 1
+            else:
+                frame = frames.get(client.codec)
+                if frame is None:
+                    frame = frames[client.codec] = serialize_frame(msg_type, payload, client.codec)
+            client.enqueue(frame)
+        self.metrics.frames_sent.inc(msg_type, amount=len(clients) - replayable)
+        self.metrics.frames_sent.inc(MSG_HISTORY, amount=replayable)
+
+    def broadcast(self, message, exclude_id=None):
+        history_frame = self.history.record(GLOBAL_CHANNEL, message) if self.history is not None else None
+        targets = [client for client in self.clients.values() if client.client_id != exclude_id]
+        self.fan_out(targets, MSG_CHAT, message.encode('utf-8'), history_frame)
+
+    def broadcast_threadsafe(self, message, exclude_id=None):
+        if self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(self.broadcast, message, exclude_id)
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port,
+            backlog=BACKLOG, reuse_address=True
+        )
+        async with server:
+            await server.serve_forever()
+
+
+def run_async_server(host, port, files_dir, console=None, queue_config=(), hash_cache=None, codecs=None,
+                     metrics=None, history=None):
+    raise_nofile_limit()
+
+    server = AsyncChatServer(host, port, files_dir, queue_config, hash_cache, codecs, metrics, history)
+
+    print("="*60)
+    print("Servidor TCP asyncio iniciado")
+    print(f"Escutando em {host}:{port}")
+    print(f"Diretório de arquivos: {os.path.abspath(files_dir)}")
+    print("="*60)
+
+    if console is not None:
+        console_thread = threading.Thread(target=console, args=(server.broadcast_threadsafe,), daemon=True)
+        console_thread.start()
+
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print("\n[Servidor] Interrompido pelo usuário")
+    finally:
+        print("[Servidor] Encerrado")
@@ -0,0 +1,59 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from batch_client import BatchClient, read_manifest, unique_filenames
+from protocol import MSG_FILE, MSG_FILE_OK, CAP_STREAMS, FrameDecoder, Message
+
+
+class ManifestTest(unittest.TestCase):
+
+    def test_duplicates_are_dropped_in_order(self):
+        self.assertEqual(unique_filenames(['a.bin', 'b.bin', 'a.bin', 'c.bin', 'b.bin']), ['a.bin', 'b.bin', 'c.bin'])
+
+    def test_paths_with_the_same_target_are_rejected(self):
+        with self.assertRaises(ValueError):
+            unique_filenames(['dir1/a.bin', 'dir2/a.bin'])
+
+    def test_read_manifest(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'manifesto.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('# comentário\na.bin\n\n  b.bin  \na.bin\n')
+            self.assertEqual(read_manifest(path), ['a.bin', 'b.bin'])
+
+
+class ReceiveLoopTest(unittest.TestCase):
+
+    def test_protocol_error_fails_every_pending_stream(self):
+        client_socket, server_socket = socket.socketpair()
+        with tempfile.TemporaryDirectory() as tmpdir, client_socket, server_socket:
+            client = BatchClient('teste', 0, download_dir=tmpdir, window=2, timeout=5)
+            client.socket = client_socket
+            client.capabilities = {CAP_STREAMS}
+            client.connected = True
+            client.receiver = threading.Thread(target=client.receive_loop, daemon=True)
+            client.receiver.start()
+
+            def bad_server():
+                decoder = FrameDecoder()
+                requests = 0
+                while requests < 2:
+                    decoder.recv_into(server_socket)
+                    requests += sum(1 for msg_type, _ in decoder.frames() if msg_type == MSG_FILE)
+                server_socket.sendall(Message(MSG_FILE_OK, b'xy').serialize())
+
+            threading.Thread(target=bad_server, daemon=True).start()
+            results = client.fetch(['a.bin', 'b.bin', 'c.bin'])
+            client.receiver.join(5)
+
+        self.assertFalse(client.receiver.is_alive())
+        self.assertEqual(sorted(result['filename'] for result in results), ['a.bin', 'b.bin', 'c.bin'])
+        for result in results:
+            self.assertIsNotNone(result['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import unittest
+
+from compression import (
+    CODEC_LZMA, CODEC_ZLIB, CODEC_ZSTD, available_codecs, choose_codec, compress, decompress, is_compressible
+)
+from protocol import (
+    MSG_CHAT, HEADER_SIZE, FrameCompressor, FrameDecoder, Message, serialize_frame
+)
+
+TEXT = b'texto repetido ' * 1000
+
+
+class CodecTest(unittest.TestCase):
+
+    def test_choose_codec_prefers_best_available(self):
+        self.assertEqual(choose_codec({CODEC_LZMA, CODEC_ZLIB}), CODEC_ZLIB)
+        self.assertEqual(choose_codec({CODEC_LZMA}), CODEC_LZMA)
+        self.assertIsNone(choose_codec(set()))
+        self.assertIsNone(choose_codec({'brotli'}))
+        expected = CODEC_ZSTD if CODEC_ZSTD in available_codecs() else CODEC_ZLIB
+        self.assertEqual(choose_codec({CODEC_ZSTD, CODEC_ZLIB, CODEC_LZMA}), expected)
+
+    def test_round_trip_for_every_codec(self):
+        for codec in available_codecs():
+            compressed = compress(codec, TEXT)
+            self.assertLess(len(compressed), len(TEXT))
+            self.assertEqual(decompress(codec, compressed, len(TEXT)), TEXT)
+
+    def test_decompress_enforces_max_size(self):
+        for codec in available_codecs():
+            with self.assertRaises(ValueError):
+                decompress(codec, compress(codec, TEXT), len(TEXT) - 1)
+
+    def test_truncated_payload_rejected(self):
+        for codec in (CODEC_ZLIB, CODEC_LZMA):
+            compressed = compress(codec, TEXT)
+            with self.assertRaises(ValueError):
+                decompress(codec, compressed[:len(compressed) // 2], len(TEXT))
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            compress('brotli', TEXT)
+        with self.assertRaises(ValueError):
+            decompress('brotli', TEXT, len(TEXT))
+
+    def test_is_compressible(self):
+        self.assertTrue(is_compressible('notas.txt'))
+        self.assertTrue(is_compressible('sem_extensao'))
+        self.assertFalse(is_compressible('foto.JPG'))
+        self.assertFalse(is_compressible('pacote.tar.gz'))
+
+
+class CompressedFrameTest(unittest.TestCase):
+
+    def test_compressed_frame_round_trip(self):
+        frame = serialize_frame(MSG_CHAT, TEXT, CODEC_ZLIB)
+        self.assertLess(len(frame), HEADER_SIZE + len(TEXT))
+        decoder = FrameDecoder()
+        decoder.codec = CODEC_ZLIB
+        decoder.feed(frame)
+        self.assertEqual([(msg_type, bytes(payload)) for msg_type, payload in decoder.frames()],
+                         [(MSG_CHAT, TEXT)])
+
+    def test_small_payload_is_not_compressed(self):
+        self.assertEqual(serialize_frame(MSG_CHAT, b'oi', CODEC_ZLIB), Message(MSG_CHAT, b'oi').serialize())
+
+    def test_compressed_frame_without_codec_rejected(self):
+        decoder = FrameDecoder()
+        decoder.feed(serialize_frame(MSG_CHAT, TEXT, CODEC_ZLIB))
+        with self.assertRaises(ValueError):
+            list(decoder.frames())
+
+    def test_compressed_frame_over_max_payload_rejected(self):
+        decoder = FrameDecoder(max_payload_size=len(TEXT) - 1)
+        decoder.codec = CODEC_ZLIB
+        decoder.feed(serialize_frame(MSG_CHAT, TEXT, CODEC_ZLIB))
+        with self.assertRaises(ValueError):
+            list(decoder.frames())
+
+    def test_frame_compressor_backs_off_on_incompressible_data(self):
+        compressor = FrameCompressor(CODEC_ZLIB)
+        noise = os.urandom(4096)
+        self.assertEqual(compressor.frame(MSG_CHAT, noise), Message(MSG_CHAT, noise).serialize())
+        self.assertGreater(compressor.skip, 0)
+        self.assertEqual(compressor.frame(MSG_CHAT, TEXT), Message(MSG_CHAT, TEXT).serialize())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import random
+import socket
+import tempfile
+import unittest
+
+from bench.common import free_port, start_server, stop_server
+from delta import (
+    MAX_BLOCK_SIZE, MIN_BLOCK_SIZE, DeltaEncoder, choose_block_size, file_signatures, unpack_delta_copy,
+    unpack_signatures
+)
+from protocol import (
+    MSG_CHAT, MSG_DELTA_COPY, MSG_DELTA_DATA, MSG_DELTA_END, MSG_DELTA_REQUEST, MSG_HELLO, CAP_DELTA,
+    FrameDecoder, Message, decode_capabilities, decode_delta_end, encode_capabilities, encode_delta_request,
+    send_message
+)
+
+
+def apply_delta(basis, instructions, block_size):
+    output = bytearray()
+    for msg_type, payload in instructions:
+        if msg_type == MSG_DELTA_COPY:
+            index, count = unpack_delta_copy(payload)
+            output += basis[index * block_size:(index + count) * block_size]
+        else:
+            output += payload
+    return bytes(output)
+
+
+class DeltaEncoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(1)
+        self.basis = self.rng.randbytes(64 * MIN_BLOCK_SIZE + 123)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'basis.bin')
+        with open(self.path, 'wb') as f:
+            f.write(self.basis)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def encode(self, target):
+        block_size = MIN_BLOCK_SIZE
+        signatures = unpack_signatures(file_signatures(self.path, block_size), len(self.basis), block_size)
+        encoder = DeltaEncoder(signatures, block_size, len(self.basis))
+        instructions = list(encoder.instructions(target))
+        literal = sum(len(payload) for msg_type, payload in instructions if msg_type == MSG_DELTA_DATA)
+        return apply_delta(self.basis, instructions, block_size), literal
+
+    def test_identical_file_is_all_copies(self):
+        result, literal = self.encode(self.basis)
+        self.assertEqual(result, self.basis)
+        self.assertEqual(literal, 0)
+
+    def test_changed_blocks_round_trip(self):
+        target = bytearray(self.basis)
+        target[5000:5100] = self.rng.randbytes(100)
+        target[70000:70010] = b'\0' * 10
+        result, literal = self.encode(bytes(target))
+        self.assertEqual(result, target)
+        self.assertLess(literal, 4 * MIN_BLOCK_SIZE)
+
+    def test_insertion_and_deletion_round_trip(self):
+        target = self.basis[:10000] + b'inserido' + self.basis[10000:90000] + self.basis[95000:]
+        result, literal = self.encode(target)
+        self.assertEqual(result, target)
+        self.assertLess(literal, len(target) // 4)
+
+    def test_unrelated_file_is_all_literal(self):
+        target = self.rng.randbytes(20000)
+        result, literal = self.encode(target)
+        self.assertEqual(result, target)
+        self.assertEqual(literal, len(target))
+
+    def test_empty_target(self):
+        self.assertEqual(self.encode(b''), (b'', 0))
+
+    def test_signature_count_is_checked(self):
+        signatures = file_signatures(self.path, MIN_BLOCK_SIZE)
+        with self.assertRaises(ValueError):
+            unpack_signatures(signatures[:-1], len(self.basis), MIN_BLOCK_SIZE)
+        with self.assertRaises(ValueError):
+            unpack_signatures(signatures, len(self.basis), MIN_BLOCK_SIZE + 1)
+
+    def test_block_size_grows_with_file(self):
+        self.assertEqual(choose_block_size(0), MIN_BLOCK_SIZE)
+        self.assertGreaterEqual(choose_block_size(2 ** 30) ** 2, 2 ** 30)
+
+    def test_block_size_is_capped(self):
+        self.assertEqual(choose_block_size(2 ** 62), MAX_BLOCK_SIZE)
+        self.assertEqual(unpack_signatures(b'', 0, MAX_BLOCK_SIZE), [])
+        with self.assertRaises(ValueError):
+            unpack_signatures(b'', 0, MAX_BLOCK_SIZE * 2)
+
+
+class DeltaServerTest(unittest.TestCase):
+
+    def receive(self, sock, decoder):
+        while True:
+            for msg_type, payload in decoder.frames():
+                return msg_type, bytes(payload)
+            if decoder.recv_into(sock) == 0:
+                return None, None
+
+    def pipelined_request(self, *args):
+        rng = random.Random(2)
+        basis = rng.randbytes(2048 * MIN_BLOCK_SIZE)
+        target = bytearray(basis)
+        target[1000:1100] = rng.randbytes(100)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            basis_path = os.path.join(tmpdir, 'basis.bin')
+            with open(basis_path, 'wb') as f:
+                f.write(basis)
+            os.makedirs(os.path.join(tmpdir, 'arquivos'))
+            with open(os.path.join(tmpdir, 'arquivos', 'alvo.bin'), 'wb') as f:
+                f.write(target)
+            signatures = file_signatures(basis_path, MIN_BLOCK_SIZE)
+
+            port = free_port()
+            server = start_server('server_antigo.py',
+                                  ['--port', str(port), '--dir', os.path.join(tmpdir, 'arquivos')] + list(args), port)
+            try:
+                with socket.create_connection(('127.0.0.1', port), timeout=10) as sock:
+                    decoder = FrameDecoder()
+                    send_message(sock, MSG_HELLO, encode_capabilities({CAP_DELTA}))
+                    msg_type, payload = self.receive(sock, decoder)
+                    self.assertIn(CAP_DELTA, decode_capabilities(payload))
+
+                    request = encode_delta_request('alvo.bin', len(basis), MIN_BLOCK_SIZE, signatures)
+                    self.assertGreater(len(request), 40000)
+                    sock.sendall(Message(MSG_DELTA_REQUEST, request).serialize() +
+                                 Message(MSG_CHAT, 'x' * 30000).serialize())
+
+                    instructions = []
+                    while True:
+                        msg_type, payload = self.receive(sock, decoder)
+                        if msg_type in (MSG_DELTA_COPY, MSG_DELTA_DATA):
+                            instructions.append((msg_type, payload))
+                        elif msg_type in (MSG_DELTA_END, None):
+                            break
+            finally:
+                stop_server(server)
+
+        self.assertEqual(msg_type, MSG_DELTA_END)
+        _, file_hash, error = decode_delta_end(payload)
+        self.assertIsNone(error)
+        self.assertEqual(file_hash, hashlib.sha256(target).digest())
+        self.assertEqual(apply_delta(basis, instructions, MIN_BLOCK_SIZE), bytes(target))
+
+    def test_threaded_server(self):
+        self.pipelined_request()
+
+    def test_async_server(self):
+        self.pipelined_request('--async')
+
+
+if __name__ == '__main__':
+    unittest.main()
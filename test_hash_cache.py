@@ -0,0 +1,99 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from hash_cache import FileHashCache
+from protocol import calculate_block_hashes
+
+
+class FileHashCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.tmpdir.name, 'index.json')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, data, mtime_ns=None):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def test_hit_after_miss(self):
+        path = self.write('a.bin', b'conteudo')
+        cache = FileHashCache()
+        self.assertEqual(cache.get(path), hashlib.sha256(b'conteudo').digest())
+        self.assertEqual(cache.get(path), hashlib.sha256(b'conteudo').digest())
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    def test_modified_file_is_rehashed(self):
+        path = self.write('a.bin', b'antes', mtime_ns=10 ** 18)
+        cache = FileHashCache()
+        cache.get(path)
+        self.write('a.bin', b'depois', mtime_ns=2 * 10 ** 18)
+        self.assertEqual(cache.get(path), hashlib.sha256(b'depois').digest())
+        self.assertEqual(cache.stats()['invalidations'], 1)
+
+    def test_lru_eviction(self):
+        cache = FileHashCache(max_entries=2)
+        paths = [self.write(f'{i}.bin', b'%d' % i) for i in range(3)]
+        for path in paths:
+            cache.get(path)
+        stats = cache.stats()
+        self.assertEqual((stats['entries'], stats['evictions']), (2, 1))
+        self.assertIsNone(cache.peek(paths[0]))
+        self.assertIsNotNone(cache.peek(paths[2]))
+
+    def test_block_hashes_are_cached_with_the_digest(self):
+        path = self.write('a.bin', os.urandom(10000))
+        cache = FileHashCache()
+        expected = calculate_block_hashes(path, 4096)
+        self.assertEqual(cache.get_blocks(path, 4096), expected)
+        self.assertEqual(cache.get_blocks(path, 4096), expected)
+        self.assertEqual(cache.get(path), expected[0])
+        self.assertEqual(cache.stats()['hits'], 2)
+
+    def test_index_is_written_on_close_not_on_put(self):
+        path = self.write('a.bin', b'persistido')
+        cache = FileHashCache(index_path=self.index_path, flush_interval=3600)
+        cache.get(path)
+        self.assertFalse(os.path.exists(self.index_path))
+        cache.close()
+        self.assertTrue(os.path.exists(self.index_path))
+
+        reloaded = FileHashCache(index_path=self.index_path, flush_interval=3600)
+        self.assertEqual(reloaded.peek(path), hashlib.sha256(b'persistido').digest())
+        reloaded.close()
+
+    def test_stale_index_entries_are_ignored(self):
+        path = self.write('a.bin', b'velho', mtime_ns=10 ** 18)
+        cache = FileHashCache(index_path=self.index_path, flush_interval=3600)
+        cache.get(path)
+        cache.close()
+        self.write('a.bin', b'novo', mtime_ns=2 * 10 ** 18)
+
+        reloaded = FileHashCache(index_path=self.index_path, flush_interval=3600)
+        self.assertIsNone(reloaded.peek(path))
+        self.assertEqual(reloaded.stats()['entries'], 0)
+        reloaded.close()
+
+    def test_flush_loop_writes_periodically(self):
+        path = self.write('a.bin', b'periodico')
+        cache = FileHashCache(index_path=self.index_path, flush_interval=0.01)
+        cache.get(path)
+        for _ in range(200):
+            if os.path.exists(self.index_path):
+                break
+            cache.stopped.wait(0.01)
+        self.assertTrue(os.path.exists(self.index_path))
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+
+from history import GLOBAL_CHANNEL, HistoryBuffer, HistoryStore
+from protocol import FrameDecoder, decode_history_entry
+
+
+def sequences(frames):
+    decoder = FrameDecoder()
+    decoder.feed(b''.join(frames))
+    return [decode_history_entry(payload)[0] for _, payload in decoder.frames()]
+
+
+class HistoryBufferTest(unittest.TestCase):
+
+    def test_page_after_count_eviction(self):
+        buffer = HistoryBuffer(max_messages=5)
+        for i in range(12):
+            buffer.append(GLOBAL_CHANNEL, f'mensagem {i}')
+        frames, first, next_seq, more = buffer.page(0)
+        self.assertEqual((first, next_seq, more), (8, 13, False))
+        self.assertEqual(sequences(frames), [8, 9, 10, 11, 12])
+
+    def test_page_from_evicted_sequence_starts_at_first(self):
+        buffer = HistoryBuffer(max_messages=5)
+        for i in range(12):
+            buffer.append(GLOBAL_CHANNEL, 'x')
+        self.assertEqual(sequences(buffer.page(3)[0]), [8, 9, 10, 11, 12])
+        self.assertEqual(buffer.page(13)[0], [])
+        self.assertEqual(buffer.page(100)[2], 13)
+
+    def test_page_negative_since_counts_back(self):
+        buffer = HistoryBuffer(max_messages=5)
+        for i in range(12):
+            buffer.append(GLOBAL_CHANNEL, 'x')
+        self.assertEqual(sequences(buffer.page(-2)[0]), [11, 12])
+        self.assertEqual(sequences(buffer.page(-50)[0]), [8, 9, 10, 11, 12])
+
+    def test_page_limit_and_bytes_set_more(self):
+        buffer = HistoryBuffer(max_messages=10)
+        for i in range(10):
+            buffer.append(GLOBAL_CHANNEL, 'x' * 100)
+        frames, _, next_seq, more = buffer.page(0, limit=4)
+        self.assertEqual((len(frames), next_seq, more), (4, 5, True))
+        frames, _, next_seq, more = buffer.page(0, max_bytes=250)
+        self.assertEqual((len(frames), next_seq, more), (2, 3, True))
+        frames, _, _, more = buffer.page(0, max_bytes=1)
+        self.assertEqual((len(frames), more), (1, True))
+
+    def test_byte_budget_evicts_oldest(self):
+        buffer = HistoryBuffer(max_messages=100, max_bytes=500)
+        for i in range(10):
+            buffer.append(GLOBAL_CHANNEL, 'x' * 100)
+        self.assertLessEqual(buffer.bytes, 500)
+        _, first, next_seq, _ = buffer.page(0)
+        self.assertEqual(next_seq, 11)
+        self.assertEqual(next_seq - first, len(buffer))
+
+    def test_oversize_message_empties_buffer(self):
+        buffer = HistoryBuffer(max_messages=10, max_bytes=100)
+        buffer.append(GLOBAL_CHANNEL, 'curta')
+        buffer.append(GLOBAL_CHANNEL, 'x' * 200)
+        self.assertEqual(buffer.page(0), ([], 3, 3, False))
+        buffer.append(GLOBAL_CHANNEL, 'depois')
+        self.assertEqual(sequences(buffer.page(0)[0]), [3])
+
+
+class HistoryStoreTest(unittest.TestCase):
+
+    def test_global_channel_is_never_evicted(self):
+        store = HistoryStore(max_messages=10, max_channels=1)
+        store.record(GLOBAL_CHANNEL, 'geral')
+        store.record('a', 'x')
+        store.record('b', 'y')
+        self.assertEqual(sequences(store.page(GLOBAL_CHANNEL, 0)[0]), [1])
+        self.assertEqual(store.page('a', 0), ([], 2, 2, False))
+
+    def test_sequences_continue_after_eviction(self):
+        store = HistoryStore(max_messages=10, max_channels=1)
+        for i in range(3):
+            store.record('a', 'x')
+        store.record('b', 'y')
+        store.record('a', 'de volta')
+        self.assertEqual(sequences(store.page('a', 0)[0]), [4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from http_event_loop import HTTPEventLoop
+from metrics import HTTPMetrics
+from response_cache import ResponseCache
+from server import KEEPALIVE_TIMEOUT, MAX_KEEPALIVE_REQUESTS, guess_content_type
+from test_server import read_response
+
+
+class HTTPEventLoopTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.small = b'<html>ola</html>'
+        self.large = os.urandom(1024 * 1024 + 7)
+        with open(os.path.join(self.tmpdir.name, 'index.html'), 'wb') as f:
+            f.write(self.small)
+        with open(os.path.join(self.tmpdir.name, 'grande.bin'), 'wb') as f:
+            f.write(self.large)
+
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.bind(('127.0.0.1', 0))
+        server_socket.listen()
+        self.port = server_socket.getsockname()[1]
+        self.loop = HTTPEventLoop(server_socket, self.tmpdir.name, ResponseCache(guess_content_type),
+                                  HTTPMetrics(), KEEPALIVE_TIMEOUT, MAX_KEEPALIVE_REQUESTS)
+        self.thread = threading.Thread(target=self.loop.run, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.loop.request_stop()
+        self.thread.join(5)
+        self.tmpdir.cleanup()
+
+    def connect(self):
+        sock = socket.create_connection(('127.0.0.1', self.port), timeout=5)
+        self.addCleanup(sock.close)
+        reader = sock.makefile('rb')
+        self.addCleanup(reader.close)
+        return sock, reader
+
+    def test_pipelined_requests_on_one_connection(self):
+        sock, reader = self.connect()
+        sock.sendall(b'GET /index.html HTTP/1.1\r\nHost: x\r\n\r\n'
+                     b'GET /grande.bin HTTP/1.1\r\nHost: x\r\n\r\n'
+                     b'GET /nada.txt HTTP/1.1\r\nHost: x\r\n\r\n')
+        head, _, body = read_response(reader)
+        self.assertTrue(head.startswith(b'HTTP/1.1 200'))
+        self.assertEqual(body, self.small)
+        head, _, body = read_response(reader)
+        self.assertTrue(head.startswith(b'HTTP/1.1 200'))
+        self.assertEqual(body, self.large)
+        head, headers, _ = read_response(reader)
+        self.assertTrue(head.startswith(b'HTTP/1.1 404'))
+        self.assertEqual(headers['connection'], 'keep-alive')
+
+    def test_connection_close(self):
+        sock, reader = self.connect()
+        sock.sendall(b'GET /index.html HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+        head, headers, body = read_response(reader)
+        self.assertEqual(headers['connection'], 'close')
+        self.assertEqual(body, self.small)
+        self.assertEqual(reader.read(), b'')
+
+    def test_request_stop_closes_idle_connections(self):
+        sock, reader = self.connect()
+        sock.sendall(b'GET /index.html HTTP/1.1\r\nHost: x\r\n\r\n')
+        read_response(reader)
+        self.loop.request_stop()
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+        self.assertEqual(reader.read(), b'')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import socket
+import unittest
+
+from metrics import ChatMetrics, CountingSocket, HTTPMetrics, MetricsRegistry
+from protocol import MSG_CHAT
+
+
+def sample_lines(text):
+    return [line for line in text.splitlines() if not line.startswith('#')]
+
+
+class MetricsRegistryTest(unittest.TestCase):
+
+    def test_counter_and_gauge(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('pedidos_total', 'Pedidos')
+        gauge = registry.gauge('abertas', 'Abertas')
+        counter.inc()
+        counter.inc(amount=4)
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        text = registry.render()
+        self.assertIn('# TYPE pedidos_total counter', text)
+        self.assertIn('pedidos_total 5', sample_lines(text))
+        self.assertIn('abertas 1', sample_lines(text))
+
+    def test_unlabelled_metrics_render_zero(self):
+        registry = MetricsRegistry()
+        registry.counter('vazio_total', 'Vazio')
+        registry.counter('rotulado_total', 'Rotulado', ('tipo',))
+        lines = sample_lines(registry.render())
+        self.assertIn('vazio_total 0', lines)
+        self.assertFalse(any(line.startswith('rotulado_total') for line in lines))
+
+    def test_labels_are_escaped(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('mensagens_total', 'Mensagens', ('tipo',))
+        counter.inc(b'CHAT')
+        counter.inc('a"b\\c\nd')
+        lines = sample_lines(registry.render())
+        self.assertIn('mensagens_total{tipo="CHAT"} 1', lines)
+        self.assertIn('mensagens_total{tipo="a\\"b\\\\c\\nd"} 1', lines)
+
+    def test_const_labels_come_first(self):
+        registry = MetricsRegistry({'worker': 2})
+        registry.counter('respostas_total', 'Respostas', ('code',)).inc(200)
+        lines = sample_lines(registry.render())
+        self.assertIn('respostas_total{worker="2",code="200"} 1', lines)
+        self.assertTrue(lines[0].startswith('process_start_time_seconds{worker="2"} '))
+
+    def test_histogram_is_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram('duracao_seconds', 'Duração', buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value)
+        lines = sample_lines(registry.render())
+        self.assertEqual(lines[1:], [
+            'duracao_seconds_bucket{le="0.1"} 2',
+            'duracao_seconds_bucket{le="1.0"} 3',
+            'duracao_seconds_bucket{le="+Inf"} 4',
+            'duracao_seconds_sum 5.65',
+            'duracao_seconds_count 4',
+        ])
+
+    def test_collectors_skip_non_numeric_values(self):
+        registry = MetricsRegistry({'worker': 0})
+        registry.add_collector('cache', lambda: {'hits': 3, 'hit_ratio': '0.750', 'nome': 'lru'}, 'Cache')
+        lines = sample_lines(registry.render())
+        self.assertIn('cache_hits{worker="0"} 3.0', lines)
+        self.assertIn('cache_hit_ratio{worker="0"} 0.75', lines)
+        self.assertFalse(any(line.startswith('cache_nome') for line in lines))
+
+
+class ServerMetricsTest(unittest.TestCase):
+
+    def test_http_metrics(self):
+        metrics = HTTPMetrics(worker=1)
+        metrics.connected()
+        metrics.response(200, 0)
+        metrics.disconnected()
+        lines = sample_lines(metrics.render())
+        self.assertIn('http_connections_total{worker="1"} 1', lines)
+        self.assertIn('http_connections_open{worker="1"} 0', lines)
+        self.assertIn('http_requests_total{worker="1",code="200"} 1', lines)
+
+    def test_chat_metrics_group_unknown_types(self):
+        metrics = ChatMetrics()
+        metrics.frame_received(MSG_CHAT)
+        metrics.frame_received(b'XXXX')
+        lines = sample_lines(metrics.render())
+        self.assertIn('chat_frames_received_total{type="CHAT"} 1', lines)
+        self.assertIn('chat_frames_received_total{type="outro"} 1', lines)
+
+    def test_counting_socket(self):
+        metrics = ChatMetrics()
+        a, b = socket.socketpair()
+        with a, b:
+            counted = CountingSocket(a, metrics.bytes_received, metrics.bytes_sent)
+            counted.sendall(b'12345')
+            self.assertEqual(b.recv(10), b'12345')
+            b.sendall(b'abc')
+            self.assertEqual(counted.recv(10), b'abc')
+        self.assertEqual((metrics.bytes_sent.value(), metrics.bytes_received.value()), (5, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
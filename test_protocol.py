@@ -0,0 +1,203 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from protocol import (
+    MSG_CHAT, MSG_FILE_DATA, MSG_FILE_RAW, HEADER_SIZE, TRANSFER_FRAMED, TRANSFER_SENDFILE,
+    MSG_FILE_OK, MSG_FILE_META,
+    FileStream, FrameDecoder, Message, ReceiveBuffer, decode_stream_payload, receive_file, send_file, send_items
+)
+
+
+def sender(sock, frames):
+    for frame in frames:
+        sock.sendall(frame)
+
+
+class ReceiveBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.a, self.b = socket.socketpair()
+
+    def tearDown(self):
+        self.a.close()
+        self.b.close()
+
+    def send_in_background(self, frames):
+        thread = threading.Thread(target=sender, args=(self.a, frames), daemon=True)
+        thread.start()
+        return thread
+
+    def test_reuses_buffer_between_messages(self):
+        thread = self.send_in_background([Message(MSG_CHAT, f'mensagem {i}').serialize() for i in range(10)])
+        recv_buffer = ReceiveBuffer(size=1024)
+        buffer = recv_buffer.buffer
+        for i in range(10):
+            msg_type, payload = recv_buffer.receive_message(self.b)
+            self.assertEqual((msg_type, bytes(payload)), (MSG_CHAT, f'mensagem {i}'.encode()))
+        self.assertIs(recv_buffer.buffer, buffer)
+        thread.join()
+
+    def test_grows_up_to_max_size(self):
+        payload = b'x' * 5000
+        thread = self.send_in_background([Message(MSG_FILE_DATA, payload).serialize()])
+        recv_buffer = ReceiveBuffer(size=1024, max_size=8192)
+        self.assertEqual(bytes(recv_buffer.receive_message(self.b)[1]), payload)
+        self.assertEqual(len(recv_buffer.buffer), 5000)
+        thread.join()
+
+    def test_payload_over_max_size_gets_its_own_buffer(self):
+        payload = b'y' * 10000
+        thread = self.send_in_background([Message(MSG_FILE_DATA, payload).serialize()])
+        recv_buffer = ReceiveBuffer(size=1024, max_size=8192)
+        self.assertEqual(bytes(recv_buffer.receive_message(self.b)[1]), payload)
+        self.assertEqual(len(recv_buffer.buffer), 1024)
+        thread.join()
+
+    def test_empty_payload(self):
+        self.a.sendall(Message(MSG_CHAT, b'').serialize())
+        self.assertEqual(ReceiveBuffer().receive_message(self.b), (MSG_CHAT, b''))
+
+    def test_closed_connection(self):
+        self.a.sendall(Message(MSG_CHAT, 'cortada').serialize()[:-3])
+        self.a.close()
+        recv_buffer = ReceiveBuffer()
+        self.assertEqual(recv_buffer.receive_message(self.b), (None, None))
+        self.assertEqual(recv_buffer.receive_message(self.b), (None, None))
+
+    def test_receive_stream_yields_chunks(self):
+        thread = self.send_in_background([b'z' * 3000])
+        chunks = [bytes(chunk) for chunk in ReceiveBuffer().receive_stream(self.b, 3000, block_size=1024)]
+        self.assertEqual(b''.join(chunks), b'z' * 3000)
+        self.assertTrue(all(len(chunk) <= 1024 for chunk in chunks))
+        thread.join()
+
+
+class FrameDecoderTest(unittest.TestCase):
+
+    def test_many_frames_in_one_chunk(self):
+        decoder = FrameDecoder()
+        decoder.feed(b''.join(Message(MSG_CHAT, f'mensagem {i}').serialize() for i in range(100)))
+        frames = [(msg_type, bytes(payload)) for msg_type, payload in decoder.frames()]
+        self.assertEqual(frames, [(MSG_CHAT, f'mensagem {i}'.encode()) for i in range(100)])
+        self.assertEqual(decoder.buffered(), 0)
+
+    def test_frame_split_across_feeds(self):
+        decoder = FrameDecoder(buffer_size=16)
+        data = Message(MSG_CHAT, 'x' * 1000).serialize() + Message(MSG_CHAT, 'fim').serialize()
+        frames = []
+        for i in range(0, len(data), 7):
+            decoder.feed(data[i:i + 7])
+            frames += [bytes(payload) for _, payload in decoder.frames()]
+        self.assertEqual(frames, [b'x' * 1000, b'fim'])
+
+    def test_partial_header_waits(self):
+        decoder = FrameDecoder()
+        data = Message(MSG_CHAT, 'oi').serialize()
+        decoder.feed(data[:HEADER_SIZE - 1])
+        self.assertEqual(list(decoder.frames()), [])
+        decoder.feed(data[HEADER_SIZE - 1:])
+        self.assertEqual([bytes(payload) for _, payload in decoder.frames()], [b'oi'])
+
+    def test_oversize_payload_rejected(self):
+        decoder = FrameDecoder(max_payload_size=1024)
+        decoder.feed(Message(MSG_CHAT, 'x' * 1025).serialize()[:HEADER_SIZE])
+        with self.assertRaises(ValueError):
+            list(decoder.frames())
+
+    def test_recv_into_reads_from_socket(self):
+        a, b = socket.socketpair()
+        with a, b:
+            a.sendall(Message(MSG_CHAT, 'um').serialize() + Message(MSG_CHAT, 'dois').serialize())
+            decoder = FrameDecoder()
+            received = 0
+            while received < 2 * HEADER_SIZE + 5:
+                received += decoder.recv_into(b)
+            self.assertEqual([bytes(payload) for _, payload in decoder.frames()], [b'um', b'dois'])
+
+
+class RawTransferTest(unittest.TestCase):
+
+    def test_raw_frame_hands_over_payload(self):
+        decoder = FrameDecoder()
+        decoder.feed((5).to_bytes(8, 'big') + MSG_FILE_RAW + b'abcde')
+        self.assertEqual([msg_type for msg_type, _ in decoder.frames()], [MSG_FILE_RAW])
+        self.assertEqual(decoder.raw_remaining, 5)
+        view = memoryview(bytearray(5))
+        self.assertEqual(decoder.read_raw(None, view), 5)
+        self.assertEqual(bytes(view), b'abcde')
+
+    def test_raw_frame_rejected_when_not_accepted(self):
+        decoder = FrameDecoder(accept_raw=False)
+        decoder.feed((2 ** 40).to_bytes(8, 'big') + MSG_FILE_RAW)
+        with self.assertRaises(ValueError):
+            list(decoder.frames())
+        self.assertEqual(decoder.raw_remaining, 0)
+
+    def test_send_file_round_trip(self):
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = os.path.join(tmpdir, 'origem.bin')
+            with open(source, 'wb') as f:
+                f.write(data)
+            for mode in (TRANSFER_FRAMED, TRANSFER_SENDFILE):
+                a, b = socket.socketpair()
+                with a, b:
+                    thread = threading.Thread(target=send_file, args=(a, source, mode), daemon=True)
+                    thread.start()
+                    save_dir = os.path.join(tmpdir, mode)
+                    ok, message = receive_file(b, save_dir, progress=False)
+                    thread.join()
+                self.assertTrue(ok, message)
+                with open(os.path.join(save_dir, 'origem.bin'), 'rb') as f:
+                    self.assertEqual(f.read(), data)
+
+    def test_raw_stream_sends_file_regions(self):
+        data = os.urandom(200 * 1024 + 5)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = os.path.join(tmpdir, 'origem.bin')
+            with open(source, 'wb') as f:
+                f.write(data)
+            stream = FileStream(7, source, raw=True, send_hash=False)
+            a, b = socket.socketpair()
+            with a, b:
+                def send_stream():
+                    while not stream.done:
+                        send_items(a, stream.next_frames())
+                    stream.close()
+
+                thread = threading.Thread(target=send_stream, daemon=True)
+                thread.start()
+                decoder = FrameDecoder()
+                replies = []
+                received = bytearray()
+                while len(received) < len(data):
+                    for msg_type, payload in decoder.frames():
+                        if msg_type == MSG_FILE_RAW:
+                            self.assertEqual(decoder.read_stream_id(b), 7)
+                            view = memoryview(bytearray(decoder.raw_remaining))
+                            filled = 0
+                            while decoder.raw_remaining:
+                                filled += decoder.read_raw(b, view[filled:])
+                            received += view
+                        else:
+                            replies.append((msg_type, decode_stream_payload(payload)[0]))
+                    if len(received) < len(data):
+                        decoder.recv_into(b)
+                thread.join()
+            self.assertEqual(replies, [(MSG_FILE_OK, 7), (MSG_FILE_META, 7)])
+            self.assertEqual(bytes(received), data)
+            self.assertIsNone(stream.file)
+
+    def test_raw_frame_without_stream_id_rejected(self):
+        decoder = FrameDecoder()
+        decoder.feed((2).to_bytes(8, 'big') + MSG_FILE_RAW + b'ab')
+        list(decoder.frames())
+        with self.assertRaises(ValueError):
+            decoder.read_stream_id(None)
+
+
+if __name__ == '__main__':
+    unittest.main()
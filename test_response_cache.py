@@ -0,0 +1,132 @@
+import gzip
+import os
+import tempfile
+import time
+import unittest
+
+from response_cache import ENCODING_GZIP, ENTRY_OVERHEAD, ResponseCache
+from server import guess_content_type, is_not_modified
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, data, mtime_ns=None):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def test_hit_and_revalidation(self):
+        path = self.write('a.txt', b'conteudo')
+        cache = ResponseCache(guess_content_type, revalidate_interval=0)
+        first = cache.get(path)
+        self.assertEqual(first.body, b'conteudo')
+        self.assertIs(cache.get(path), first)
+        stats = cache.stats()
+        self.assertEqual((stats['misses'], stats['hits'], stats['revalidations']), (1, 1, 1))
+
+    def test_modified_file_gets_new_etag(self):
+        path = self.write('a.txt', b'antes', mtime_ns=10 ** 18)
+        cache = ResponseCache(guess_content_type, revalidate_interval=0)
+        old = cache.get(path)
+        self.write('a.txt', b'depois', mtime_ns=2 * 10 ** 18)
+        new = cache.get(path)
+        self.assertEqual(new.body, b'depois')
+        self.assertNotEqual(new.etag, old.etag)
+        self.assertEqual(cache.stats()['invalidations'], 1)
+
+    def test_deleted_file_is_discarded(self):
+        path = self.write('a.txt', b'x')
+        cache = ResponseCache(guess_content_type, revalidate_interval=0)
+        cache.get(path)
+        os.remove(path)
+        self.assertIsNone(cache.get(path))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_directory_serves_index(self):
+        self.write('index.html', b'<html></html>')
+        entry = ResponseCache(guess_content_type).get(self.tmpdir.name)
+        self.assertEqual(entry.body, b'<html></html>')
+        self.assertTrue(entry.headers['Content-Type'].startswith('text/html'))
+
+    def test_large_files_are_not_held_in_memory(self):
+        path = self.write('grande.bin', b'x' * 2048)
+        entry = ResponseCache(guess_content_type, max_body_size=1024).get(path)
+        self.assertIsNone(entry.body)
+        self.assertEqual(entry.size, 2048)
+
+    def test_lru_eviction_by_bytes(self):
+        cache = ResponseCache(guess_content_type, max_bytes=2 * (ENTRY_OVERHEAD + 100), max_compress_size=0)
+        paths = [self.write(f'{i}.bin', b'x' * 100) for i in range(3)]
+        for path in paths:
+            cache.get(path)
+        stats = cache.stats()
+        self.assertEqual((stats['entries'], stats['evictions']), (2, 1))
+        self.assertNotIn(paths[0], cache.entries)
+
+    def test_gzip_variant_is_built_in_background(self):
+        body = b'texto comprimivel ' * 200
+        path = self.write('a.txt', body)
+        cache = ResponseCache(guess_content_type)
+        entry = cache.get(path)
+        self.assertEqual(entry.headers['Vary'], 'Accept-Encoding')
+        self.assertIsNone(cache.variant(entry, ENCODING_GZIP))
+        deadline = time.monotonic() + 5
+        while ENCODING_GZIP not in entry.variants and time.monotonic() < deadline:
+            time.sleep(0.01)
+        compressed, etag = cache.variant(entry, ENCODING_GZIP)
+        self.assertEqual(gzip.decompress(compressed), body)
+        self.assertNotEqual(etag, entry.etag)
+        self.assertEqual(cache.stats()['variant_hits'], 1)
+
+    def test_binary_files_have_no_variants(self):
+        path = self.write('a.bin', b'\0' * 1000)
+        cache = ResponseCache(guess_content_type)
+        entry = cache.get(path)
+        self.assertNotIn('Vary', entry.headers)
+        self.assertIsNone(cache.variant(entry, ENCODING_GZIP))
+
+
+class NotModifiedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmpdir.name, 'a.txt')
+        with open(path, 'wb') as f:
+            f.write(b'conteudo')
+        self.entry = ResponseCache(guess_content_type).get(path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_if_none_match(self):
+        self.assertTrue(is_not_modified(self.entry, {'if-none-match': self.entry.etag}))
+        self.assertTrue(is_not_modified(self.entry, {'if-none-match': f'"outro", W/{self.entry.etag}'}))
+        self.assertTrue(is_not_modified(self.entry, {'if-none-match': '*'}))
+        self.assertFalse(is_not_modified(self.entry, {'if-none-match': '"outro"'}))
+
+    def test_if_none_match_takes_precedence(self):
+        headers = {'if-none-match': '"outro"', 'if-modified-since': self.entry.last_modified}
+        self.assertFalse(is_not_modified(self.entry, headers))
+
+    def test_if_modified_since(self):
+        self.assertTrue(is_not_modified(self.entry, {'if-modified-since': self.entry.last_modified}))
+        self.assertFalse(is_not_modified(self.entry, {'if-modified-since': 'Thu, 01 Jan 1970 00:00:00 GMT'}))
+        self.assertFalse(is_not_modified(self.entry, {'if-modified-since': 'ontem'}))
+
+    def test_variant_etag(self):
+        etag = f'{self.entry.etag[:-1]}-gzip"'
+        self.assertTrue(is_not_modified(self.entry, {'if-none-match': etag}, etag))
+        self.assertFalse(is_not_modified(self.entry, {'if-none-match': self.entry.etag}, etag))
+
+
+if __name__ == '__main__':
+    unittest.main()
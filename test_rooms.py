@@ -0,0 +1,138 @@
+import socket
+import tempfile
+import threading
+import unittest
+
+from bench.common import free_port, start_server, stop_server
+from protocol import (
+    MSG_CHAT, MSG_HELLO, MSG_JOIN, MSG_LEAVE, MSG_ROOM, CAP_ROOMS,
+    FrameDecoder, decode_capabilities, decode_room_message, encode_capabilities, encode_room_message, send_message
+)
+from rooms import MAX_ROOM_NAME_SIZE, RoomIndex, valid_room_name
+
+
+class RoomIndexTest(unittest.TestCase):
+
+    def test_join_and_leave(self):
+        index = RoomIndex(stripes=4)
+        self.assertEqual(index.join('sala', 1, 'a'), 1)
+        self.assertEqual(index.join('sala', 2, 'b'), 2)
+        self.assertEqual(index.join('sala', 2, 'b'), 2)
+        self.assertEqual(index.members('sala'), {1: 'a', 2: 'b'})
+        self.assertTrue(index.leave('sala', 1))
+        self.assertFalse(index.leave('sala', 1))
+        self.assertFalse(index.leave('outra', 2))
+        self.assertEqual(index.members('sala'), {2: 'b'})
+
+    def test_empty_room_is_removed(self):
+        index = RoomIndex(stripes=4)
+        index.join('sala', 1, 'a')
+        index.leave('sala', 1)
+        self.assertEqual(index.members('sala'), {})
+        self.assertEqual(index.stats()['rooms'], 0)
+
+    def test_members_snapshot_is_not_mutated(self):
+        index = RoomIndex(stripes=4)
+        index.join('sala', 1, 'a')
+        snapshot = index.members('sala')
+        index.join('sala', 2, 'b')
+        index.leave('sala', 1)
+        self.assertEqual(snapshot, {1: 'a'})
+
+    def test_stats(self):
+        index = RoomIndex(stripes=2)
+        for client_id in range(5):
+            index.join('grande', client_id, None)
+        index.join('pequena', 0, None)
+        self.assertEqual(index.stats(), {'rooms': 2, 'memberships': 6, 'largest': 5})
+
+    def test_concurrent_joins(self):
+        index = RoomIndex(stripes=4)
+
+        def join_many(offset):
+            for client_id in range(offset, offset + 200):
+                index.join(f'sala{client_id % 3}', client_id, None)
+
+        threads = [threading.Thread(target=join_many, args=(i * 200,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(index.stats()['memberships'], 800)
+
+    def test_valid_room_name(self):
+        self.assertTrue(valid_room_name('geral'))
+        self.assertTrue(valid_room_name('ç' * (MAX_ROOM_NAME_SIZE // 2)))
+        self.assertFalse(valid_room_name(''))
+        self.assertFalse(valid_room_name('x' * (MAX_ROOM_NAME_SIZE + 1)))
+        self.assertFalse(valid_room_name('linha\nnova'))
+
+
+class RoomClient:
+
+    def __init__(self, port):
+        self.socket = socket.create_connection(('127.0.0.1', port), timeout=5)
+        self.decoder = FrameDecoder()
+        send_message(self.socket, MSG_HELLO, encode_capabilities({CAP_ROOMS}))
+        msg_type, payload = self.receive()
+        assert msg_type == MSG_HELLO and CAP_ROOMS in decode_capabilities(payload)
+
+    def receive(self):
+        while True:
+            for msg_type, payload in self.decoder.frames():
+                return msg_type, bytes(payload)
+            if self.decoder.recv_into(self.socket) == 0:
+                return None, None
+
+    def send(self, msg_type, room, message=''):
+        send_message(self.socket, msg_type, encode_room_message(room, message))
+
+    def close(self):
+        self.socket.close()
+
+
+class RoomServerTest(unittest.TestCase):
+
+    def round_trip(self, *args):
+        port = free_port()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            server = start_server('server_antigo.py', ['--port', str(port), '--dir', tmpdir] + list(args), port)
+            clients = [RoomClient(port) for _ in range(3)]
+            try:
+                alice, bob, carol = clients
+                alice.send(MSG_JOIN, 'sala')
+                self.assertEqual(alice.receive(), (MSG_JOIN, encode_room_message('sala', '1').encode()))
+                bob.send(MSG_JOIN, 'sala')
+                self.assertEqual(bob.receive(), (MSG_JOIN, encode_room_message('sala', '2').encode()))
+
+                bob.send(MSG_ROOM, 'sala', 'oi')
+                msg_type, payload = alice.receive()
+                self.assertEqual(msg_type, MSG_ROOM)
+                self.assertEqual(decode_room_message(payload)[0], 'sala')
+                self.assertTrue(decode_room_message(payload)[1].endswith(': oi'))
+
+                carol.send(MSG_ROOM, 'sala', 'intrusa')
+                self.assertEqual(carol.receive()[0], MSG_CHAT)
+
+                alice.send(MSG_LEAVE, 'sala')
+                self.assertEqual(alice.receive()[0], MSG_LEAVE)
+                bob.send(MSG_ROOM, 'sala', 'sozinho')
+                carol.send(MSG_JOIN, 'sala')
+                self.assertEqual(carol.receive(), (MSG_JOIN, encode_room_message('sala', '2').encode()))
+                alice.socket.settimeout(0.3)
+                with self.assertRaises(socket.timeout):
+                    alice.receive()
+            finally:
+                for client in clients:
+                    client.close()
+                stop_server(server)
+
+    def test_threaded_server(self):
+        self.round_trip()
+
+    def test_async_server(self):
+        self.round_trip('--async')
+
+
+if __name__ == '__main__':
+    unittest.main()
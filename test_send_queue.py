@@ -0,0 +1,102 @@
+import unittest
+
+from send_queue import (
+    POLICY_DROP, POLICY_DISCONNECT, POLICY_DROP_OLDEST, SendQueue, SendQueueStats
+)
+
+
+def make_queue(policy, max_frames=3, max_bytes=1024):
+    stats = SendQueueStats()
+    return SendQueue(max_frames, max_bytes, policy, stats=stats), stats
+
+
+class SendQueueTest(unittest.TestCase):
+
+    def test_drop_discards_new_frames(self):
+        queue, stats = make_queue(POLICY_DROP)
+        for i in range(5):
+            self.assertTrue(queue.put(b'%d' % i))
+        self.assertEqual(queue.pop_all(), [b'0', b'1', b'2'])
+        counters = stats.snapshot()
+        self.assertEqual((counters['dropped_new'], counters['dropped_oldest']), (2, 0))
+
+    def test_disconnect_closes_queue(self):
+        queue, stats = make_queue(POLICY_DISCONNECT)
+        for i in range(3):
+            self.assertTrue(queue.put(b'%d' % i))
+        self.assertFalse(queue.put(b'3'))
+        self.assertTrue(queue.closed)
+        self.assertIsNone(queue.wait_batch(0))
+        counters = stats.snapshot()
+        self.assertEqual((counters['disconnected'], counters['dropped_on_disconnect']), (1, 4))
+        self.assertEqual(counters['dropped_new'], 0)
+
+    def test_drop_oldest_keeps_newest_frames(self):
+        queue, stats = make_queue(POLICY_DROP_OLDEST)
+        for i in range(5):
+            self.assertTrue(queue.put(b'%d' % i))
+        self.assertEqual(queue.pop_all(), [b'2', b'3', b'4'])
+        counters = stats.snapshot()
+        self.assertEqual((counters['dropped_oldest'], counters['dropped_new']), (2, 0))
+
+    def test_drop_oldest_respects_byte_budget(self):
+        queue, _ = make_queue(POLICY_DROP_OLDEST, max_frames=100, max_bytes=10)
+        for frame in (b'aaaa', b'bbbb', b'cccccc'):
+            queue.put(frame)
+        self.assertEqual(queue.pop_all(), [b'bbbb', b'cccccc'])
+        self.assertEqual(queue.pending_bytes, 0)
+
+    def test_oversize_frame_is_rejected_without_flushing(self):
+        for policy in (POLICY_DROP, POLICY_DISCONNECT, POLICY_DROP_OLDEST):
+            queue, stats = make_queue(policy, max_bytes=10)
+            queue.put(b'aaaa')
+            self.assertTrue(queue.put(b'x' * 11))
+            self.assertFalse(queue.closed)
+            self.assertEqual(queue.pop_all(), [b'aaaa'])
+            self.assertEqual(stats.snapshot()['dropped_oversize'], 1)
+
+    def test_control_frames_are_never_dropped(self):
+        for policy in (POLICY_DROP, POLICY_DROP_OLDEST):
+            queue, stats = make_queue(policy)
+            for i in range(5):
+                queue.put(b'%d' % i)
+            self.assertTrue(queue.put(b'resposta', control=True))
+            frames = queue.pop_all()
+            self.assertEqual(frames[0], b'resposta')
+            self.assertEqual(len(frames), 4)
+            self.assertEqual(stats.snapshot()['control'], 1)
+
+    def test_control_backlog_disconnects(self):
+        queue, stats = make_queue(POLICY_DROP, max_frames=2)
+        self.assertTrue(queue.put(b'a', control=True))
+        self.assertTrue(queue.put(b'b', control=True))
+        self.assertFalse(queue.put(b'c', control=True))
+        self.assertTrue(queue.closed)
+        self.assertEqual(stats.snapshot()['disconnected'], 1)
+
+    def test_large_control_frame_on_empty_queue_is_accepted(self):
+        queue, _ = make_queue(POLICY_DROP, max_bytes=10)
+        self.assertTrue(queue.put(b'x' * 100, control=True))
+        self.assertEqual(queue.wait_batch(0), [b'x' * 100])
+
+    def test_put_after_close_is_ignored(self):
+        queue, stats = make_queue(POLICY_DISCONNECT)
+        queue.close()
+        self.assertTrue(queue.put(b'x'))
+        self.assertEqual(queue.pop_all(), [])
+        self.assertEqual(stats.snapshot()['disconnected'], 0)
+
+    def test_wait_batch_returns_queued_frames(self):
+        queue, _ = make_queue(POLICY_DROP)
+        self.assertEqual(queue.wait_batch(0), [])
+        queue.put(b'a')
+        queue.put(b'b')
+        self.assertEqual(queue.wait_batch(0), [b'a', b'b'])
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            SendQueue(policy='coalesce')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import gzip
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from metrics import HTTPMetrics
+from response_cache import ResponseCache
+from server import (
+    MAX_DISCARD_BODY, MAX_RANGES, HTTPClientHandler, MetricsPortHandler, guess_content_type, negotiate_encoding,
+    parse_range
+)
+
+
+def read_response(reader):
+    head = reader.readline()
+    headers = {}
+    while True:
+        line = reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, value = line.decode().split(':', 1)
+        headers[name.strip().lower()] = value.strip()
+    return head, headers, reader.read(int(headers.get('content-length', 0)))
+
+
+class ParseRangeTest(unittest.TestCase):
+
+    def test_simple_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), [(0, 99)])
+        self.assertEqual(parse_range('bytes=900-', 1000), [(900, 999)])
+        self.assertEqual(parse_range('bytes=-100', 1000), [(900, 999)])
+
+    def test_end_is_clamped_to_file(self):
+        self.assertEqual(parse_range('bytes=500-5000', 1000), [(500, 999)])
+        self.assertEqual(parse_range('bytes=-5000', 1000), [(0, 999)])
+
+    def test_overlapping_ranges_are_merged(self):
+        self.assertEqual(parse_range('bytes=0-9, 5-19, 20-29, 100-109', 1000), [(0, 29), (100, 109)])
+        self.assertEqual(parse_range('bytes=100-109,0-9', 1000), [(0, 9), (100, 109)])
+
+    def test_unsatisfiable_ranges_are_dropped(self):
+        self.assertEqual(parse_range('bytes=1000-', 1000), [])
+        self.assertEqual(parse_range('bytes=-0', 1000), [])
+        self.assertEqual(parse_range('bytes=0-9,2000-2010', 1000), [(0, 9)])
+
+    def test_malformed_headers(self):
+        for header in ('items=0-9', 'bytes=', 'bytes=abc', 'bytes=5', 'bytes=9-5', 'bytes=x-9', '0-9'):
+            self.assertIsNone(parse_range(header, 1000), header)
+
+    def test_too_many_ranges(self):
+        header = 'bytes=' + ','.join(f'{i * 10}-{i * 10}' for i in range(MAX_RANGES + 1))
+        self.assertIsNone(parse_range(header, 10000))
+
+
+
+class NegotiateEncodingTest(unittest.TestCase):
+
+    def test_missing_or_empty_header_means_identity(self):
+        self.assertEqual(negotiate_encoding(None, ('br', 'gzip')), 'identity')
+        self.assertEqual(negotiate_encoding('', ('br', 'gzip')), 'identity')
+
+    def test_highest_quality_wins(self):
+        self.assertEqual(negotiate_encoding('gzip', ('br', 'gzip')), 'gzip')
+        self.assertEqual(negotiate_encoding('br;q=0.8, gzip;q=0.9', ('br', 'gzip')), 'gzip')
+        self.assertEqual(negotiate_encoding('GZIP;Q=0.7', ('gzip',)), 'gzip')
+
+    def test_identity_quality_is_compared(self):
+        self.assertEqual(negotiate_encoding('gzip;q=0.5, identity', ('gzip',)), 'identity')
+        self.assertEqual(negotiate_encoding('gzip, identity', ('gzip',)), 'gzip')
+        self.assertEqual(negotiate_encoding('gzip;q=0', ('gzip',)), 'identity')
+
+    def test_wildcard(self):
+        self.assertEqual(negotiate_encoding('*', ('br', 'gzip')), 'br')
+        self.assertEqual(negotiate_encoding('br;q=0, *;q=0.5', ('br', 'gzip')), 'gzip')
+        self.assertEqual(negotiate_encoding('*;q=0, identity', ('gzip',)), 'identity')
+        self.assertIsNone(negotiate_encoding('*;q=0', ('gzip',)))
+
+    def test_refused_identity(self):
+        self.assertEqual(negotiate_encoding('identity;q=0, gzip;q=0.1', ('gzip',)), 'gzip')
+        self.assertIsNone(negotiate_encoding('identity;q=0', ('gzip',)))
+        self.assertIsNone(negotiate_encoding('identity;q=0, gzip', ()))
+
+
+class HandlerTestCase(unittest.TestCase):
+
+    handler_class = HTTPClientHandler
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmpdir.name, 'index.html'), 'wb') as f:
+            f.write(b'<html>ola</html>')
+        self.client, server_socket = socket.socketpair()
+        self.client.settimeout(5)
+        self.reader = self.client.makefile('rb')
+        cache = ResponseCache(guess_content_type)
+        self.handler = self.handler_class(server_socket, ('teste', 0), self.tmpdir.name, cache, HTTPMetrics(),
+                                          threading.Event())
+        self.handler.start()
+
+    def tearDown(self):
+        self.reader.close()
+        self.client.close()
+        self.handler.join(5)
+        self.tmpdir.cleanup()
+
+
+class HTTPHandlerTest(HandlerTestCase):
+
+    def test_small_body_is_drained_and_connection_kept(self):
+        self.client.sendall(b'POST / HTTP/1.1\r\nHost: x\r\nContent-Length: 5\r\n\r\nabcde'
+                            b'GET /index.html HTTP/1.1\r\nHost: x\r\n\r\n')
+        head, headers, _ = read_response(self.reader)
+        self.assertTrue(head.startswith(b'HTTP/1.1 405'))
+        self.assertEqual(headers['connection'], 'keep-alive')
+        head, _, body = read_response(self.reader)
+        self.assertTrue(head.startswith(b'HTTP/1.1 200'))
+        self.assertEqual(body, b'<html>ola</html>')
+
+    def test_large_body_closes_instead_of_draining(self):
+        length = MAX_DISCARD_BODY + 1
+        self.client.sendall(b'POST / HTTP/1.1\r\nHost: x\r\nContent-Length: %d\r\n\r\n' % length)
+        head, headers, _ = read_response(self.reader)
+        self.assertTrue(head.startswith(b'HTTP/1.1 405'))
+        self.assertEqual(headers['connection'], 'close')
+        self.handler.join(5)
+        self.assertFalse(self.handler.is_alive())
+
+    def test_range_request(self):
+        self.client.sendall(b'GET /index.html HTTP/1.1\r\nHost: x\r\nRange: bytes=6-8\r\n\r\n'
+                            b'GET /index.html HTTP/1.1\r\nHost: x\r\nRange: bytes=100-\r\n\r\n')
+        head, headers, body = read_response(self.reader)
+        self.assertTrue(head.startswith(b'HTTP/1.1 206'))
+        self.assertEqual(headers['content-range'], 'bytes 6-8/16')
+        self.assertEqual(body, b'ola')
+        head, headers, _ = read_response(self.reader)
+        self.assertTrue(head.startswith(b'HTTP/1.1 416'))
+        self.assertEqual(headers['content-range'], 'bytes */16')
+
+    def test_conditional_request_gets_304(self):
+        self.client.sendall(b'GET /index.html HTTP/1.1\r\nHost: x\r\n\r\n')
+        _, headers, _ = read_response(self.reader)
+        etag = headers['etag'].encode()
+        self.client.sendall(b'GET /index.html HTTP/1.1\r\nHost: x\r\nIf-None-Match: ' + etag + b'\r\n\r\n')
+        head, headers, body = read_response(self.reader)
+        self.assertTrue(head.startswith(b'HTTP/1.1 304'))
+        self.assertEqual(headers['etag'].encode(), etag)
+        self.assertEqual(headers['vary'], 'Accept-Encoding')
+        self.assertEqual(body, b'')
+
+    def test_refused_identity_is_compressed_or_rejected(self):
+        text = b'texto comprimivel ' * 200
+        with open(os.path.join(self.tmpdir.name, 'texto.txt'), 'wb') as f:
+            f.write(text)
+        self.client.sendall(b'GET /texto.txt HTTP/1.1\r\nHost: x\r\nAccept-Encoding: identity;q=0, gzip\r\n\r\n'
+                            b'GET /texto.txt HTTP/1.1\r\nHost: x\r\nAccept-Encoding: gzip;q=0.5, identity\r\n\r\n'
+                            b'GET /index.html HTTP/1.1\r\nHost: x\r\nAccept-Encoding: identity;q=0\r\n\r\n')
+        head, headers, body = read_response(self.reader)
+        self.assertTrue(head.startswith(b'HTTP/1.1 200'))
+        self.assertEqual(headers['content-encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), text)
+        head, headers, body = read_response(self.reader)
+        self.assertNotIn('content-encoding', headers)
+        self.assertEqual(body, text)
+        head, _, _ = read_response(self.reader)
+        self.assertTrue(head.startswith(b'HTTP/1.1 406'))
+
+
+class MetricsPortHandlerTest(HandlerTestCase):
+
+    handler_class = MetricsPortHandler
+
+    def test_only_metrics_are_served(self):
+        self.client.sendall(b'GET /metrics HTTP/1.1\r\nHost: x\r\n\r\n'
+                            b'GET /index.html HTTP/1.1\r\nHost: x\r\n\r\n'
+                            b'GET / HTTP/1.1\r\nHost: x\r\n\r\n')
+        head, headers, body = read_response(self.reader)
+        self.assertTrue(head.startswith(b'HTTP/1.1 200'))
+        self.assertIn(b'http_requests_total', body)
+        for _ in range(2):
+            head, _, _ = read_response(self.reader)
+            self.assertTrue(head.startswith(b'HTTP/1.1 404'))
+
+
+if __name__ == '__main__':
+    unittest.main()
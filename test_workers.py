@@ -0,0 +1,74 @@
+import os
+import signal
+import tempfile
+import threading
+import time
+import unittest
+
+from workers import WorkerSupervisor
+
+
+class WorkerSupervisorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.tmpdir.name, 'workers.log')
+        self.handlers = (signal.getsignal(signal.SIGTERM), signal.getsignal(signal.SIGINT))
+
+    def tearDown(self):
+        signal.signal(signal.SIGTERM, self.handlers[0])
+        signal.signal(signal.SIGINT, self.handlers[1])
+        self.tmpdir.cleanup()
+
+    def started(self):
+        if not os.path.exists(self.log_path):
+            return []
+        with open(self.log_path) as f:
+            return [int(line.split()[0]) for line in f]
+
+    def log_start(self, index):
+        with open(self.log_path, 'a') as f:
+            f.write(f'{index} {os.getpid()}\n')
+
+    def stop_when(self, supervisor, condition, timeout=10):
+        def watch():
+            deadline = time.monotonic() + timeout
+            while not condition() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            supervisor.stop()
+
+        thread = threading.Thread(target=watch, daemon=True)
+        thread.start()
+        return thread
+
+    def test_crashed_worker_is_restarted(self):
+        def start_worker(index):
+            self.log_start(index)
+            if index == 0 and self.started().count(0) == 1:
+                return 3
+            time.sleep(60)
+
+        supervisor = WorkerSupervisor(2, start_worker)
+        watcher = self.stop_when(supervisor, lambda: self.started().count(0) == 2 and 1 in self.started())
+        supervisor.run()
+        watcher.join()
+        self.assertEqual(sorted(self.started()), [0, 0, 1])
+        self.assertEqual(supervisor.workers, {})
+
+    def test_stubborn_workers_are_killed_after_timeout(self):
+        def start_worker(index):
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            self.log_start(index)
+            time.sleep(60)
+
+        supervisor = WorkerSupervisor(1, start_worker, shutdown_timeout=0.2)
+        watcher = self.stop_when(supervisor, lambda: self.started() == [0])
+        started = time.monotonic()
+        supervisor.run()
+        watcher.join()
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(supervisor.workers, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
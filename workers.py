@@ -0,0 +1,93 @@
+import os
+import signal
+import sys
+import time
+import traceback
+
+SHUTDOWN_TIMEOUT = 10.0
+RESTART_WINDOW = 1.0
+RESTART_DELAY = 1.0
+SUPERVISE_INTERVAL = 0.2
+
+
+class WorkerSupervisor:
+
+    def __init__(self, count, start_worker, shutdown_timeout=SHUTDOWN_TIMEOUT):
+        self.count = count
+        self.start_worker = start_worker
+        self.shutdown_timeout = shutdown_timeout
+        self.workers = {}
+        self.restarts = []
+        self.stopping = False
+        self.deadline = None
+
+    def spawn(self, index):
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 1
+            try:
+                code = self.start_worker(index) or 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                os._exit(code)
+        self.workers[pid] = (index, time.monotonic())
+        print(f"[Master] Worker {index} iniciado (pid {pid})")
+
+    def stop(self, signum=None, frame=None):
+        if not self.stopping:
+            self.stopping = True
+            self.deadline = time.monotonic() + self.shutdown_timeout
+            print("[Master] Encerrando workers...")
+        self.signal_workers(signal.SIGTERM)
+
+    def signal_workers(self, signum):
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def reap(self):
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return False
+        if not pid:
+            return False
+
+        index, started = self.workers.pop(pid)
+        if self.stopping:
+            return True
+
+        print(f"[Master] Worker {index} (pid {pid}) terminou com código {os.waitstatus_to_exitcode(status)}, reiniciando")
+        delay = RESTART_DELAY if time.monotonic() - started < RESTART_WINDOW else 0
+        self.restarts.append((time.monotonic() + delay, index))
+        return True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for index in range(self.count):
+            self.spawn(index)
+
+        while self.workers or (self.restarts and not self.stopping):
+            if self.reap():
+                continue
+
+            now = time.monotonic()
+            if self.stopping:
+                if now > self.deadline:
+                    print("[Master] Workers não encerraram a tempo, forçando")
+                    self.signal_workers(signal.SIGKILL)
+                    self.deadline = float('inf')
+            else:
+                for restart in [r for r in self.restarts if r[0] <= now]:
+                    self.restarts.remove(restart)
+                    self.spawn(restart[1])
+            time.sleep(SUPERVISE_INTERVAL)
+        print("[Master] Todos os workers encerrados")